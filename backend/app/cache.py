@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Protocol
+
+# Returned by TTLCache.get for keys that are absent or expired
+MISSING = object()
+
+
+class CacheBackend(Protocol):
+    """Storage used by ResponseCache; TTLCache is the in-process default"""
+
+    max_entries: int
+
+    def get(self, key: Hashable) -> Any: ...
+
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, or MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry when full"""
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls: one load runs per key, and every caller awaits its result
+
+    The load runs in its own task, so a caller that is cancelled (a client
+    disconnecting) does not cancel it for the others. Exceptions reach every
+    caller waiting on that load; nothing is remembered once it finishes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed: Dict[str, int] = Counter()
+        self.coalesced: Dict[str, int] = Counter()
+
+    async def do(self, operation: str, key: Hashable, load: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Return load()'s result and whether it was shared with a call already in flight"""
+        call_key = (operation, key)
+        task = self._calls.get(call_key)
+        shared = task is not None
+        if shared:
+            self.coalesced[operation] += 1
+        else:
+            self.executed[operation] += 1
+            task = asyncio.ensure_future(load())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda done: self._finish(call_key, done))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, call_key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(call_key) is task:
+            del self._calls[call_key]
+        # Retrieve the exception so a load whose callers all went away is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Executed and coalesced call counts, overall and per operation, and the calls in flight"""
+        return {
+            "in_flight": len(self._calls),
+            "executed": sum(self.executed.values()),
+            "coalesced": sum(self.coalesced.values()),
+            "operations": {
+                operation: {"executed": self.executed[operation], "coalesced": self.coalesced[operation]}
+                for operation in sorted(set(self.executed) | set(self.coalesced))
+            }
+        }
+
+
+class ResponseCache:
+    """Read-through cache of service results, counting hits and misses per operation
+
+    Concurrent misses for the same key share one load through ``flights``.
+    """
+
+    def __init__(self, backend: CacheBackend, flights: Optional[SingleFlight] = None):
+        self.backend = backend
+        self.flights = flights or SingleFlight()
+        self.hits: Dict[str, int] = Counter()
+        self.misses: Dict[str, int] = Counter()
+
+    async def get_or_load(self, operation: str, key: Hashable, load: Callable[[], Awaitable[Any]]) -> tuple[Any, str]:
+        """Return the result for (operation, key) and where it came from, calling load() on a miss
+
+        The source is ``"cache"`` for a hit, ``"load"`` when this call ran
+        load() and ``"coalesced"`` when it joined a load already in flight.
+        Exceptions from load() propagate and are not cached.
+        """
+        value = self.backend.get((operation, key))
+        if value is not MISSING:
+            self.hits[operation] += 1
+            return value, "cache"
+        self.misses[operation] += 1
+        value, shared = await self.flights.do(operation, key, partial(self._load, operation, key, load))
+        return value, "coalesced" if shared else "load"
+
+    async def _load(self, operation: str, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        value = await load()
+        self.backend.set((operation, key), value)
+        return value
+
+    def clear(self) -> None:
+        """Drop every cached result (the hit and miss counts are kept)"""
+        self.backend.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit and miss counts, overall and per operation, and the cache's fill level"""
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "entries": len(self.backend),
+            "max_entries": self.backend.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "operations": {
+                operation: {"hits": self.hits[operation], "misses": self.misses[operation]}
+                for operation in sorted(set(self.hits) | set(self.misses))
+            }
+        }
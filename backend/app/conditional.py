@@ -0,0 +1,99 @@
+import hashlib
+import logging
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# GET endpoints whose responses only change when an ingestion changes the data
+CONDITIONAL_PATH_PREFIXES = (
+    "/api/v1/attack-patterns",
+    "/api/v1/stats",
+    "/api/v1/dashboard-data",
+    "/api/v1/technique-graph",
+)
+
+# Clients may reuse a stored response, but must revalidate it with its ETag first
+CACHE_CONTROL = "no-cache"
+
+
+def entity_tag(version: int, accept: str, accept_encoding: str = "") -> str:
+    """Strong ETag for a response built from dataset ``version``; the representation also varies by Accept and Accept-Encoding"""
+    variant = hashlib.sha1(f"{accept}\n{accept_encoding}".encode("latin-1")).hexdigest()[:8]
+    return f'"v{version}-{variant}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (compared weakly, as RFC 9110 requires for this header)
+
+    ``*`` never matches: it asks whether the resource exists, which only the
+    endpoint knows, so the request is passed through instead.
+    """
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """Whether the data is unchanged since an If-Modified-Since date (HTTP dates have one-second precision)"""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+class ConditionalGetMiddleware:
+    """Tag data responses with the dataset version and answer revalidations with 304 Not Modified
+
+    ``stamp`` returns the current {"version", "updated_at"} without querying
+    MongoDB while the cached dataset version is fresh, so a matching
+    If-None-Match (or, without one, If-Modified-Since) is answered before
+    any endpoint runs.
+    """
+
+    def __init__(self, app: ASGIApp, stamp: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.app = app
+        self.stamp = stamp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(CONDITIONAL_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        try:
+            stamp = await self.stamp()
+        except Exception as e:
+            # The endpoint reports the underlying failure itself
+            logger.warning(f"Dataset version unavailable, serving without validators: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        etag = entity_tag(stamp["version"], headers.get("accept", ""), headers.get("accept-encoding", ""))
+        last_modified: Optional[datetime] = stamp.get("updated_at")
+        validators = [(b"etag", etag.encode("latin-1")), (b"cache-control", CACHE_CONTROL.encode("latin-1"))]
+        if last_modified is not None:
+            validators.append((b"last-modified", format_datetime(last_modified, usegmt=True).encode("latin-1")))
+
+        # If-None-Match takes precedence over If-Modified-Since
+        if "if-none-match" in headers:
+            fresh = etag_matches(headers["if-none-match"], etag)
+        else:
+            fresh = last_modified is not None and not_modified_since(headers.get("if-modified-since", ""), last_modified)
+        if fresh:
+            not_modified_headers = [*validators, (b"vary", b"Accept, Accept-Encoding")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = list(message.get("headers", []))
+                if not any(name.lower() == b"vary" for name, _ in response_headers):
+                    response_headers.append((b"vary", b"Accept"))
+                message["headers"] = [*response_headers, *validators]
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
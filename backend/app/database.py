@@ -1,7 +1,8 @@
 import os
+from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
-from typing import Optional
+from pymongo import IndexModel, MongoClient, ReturnDocument
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,9 @@ class Database:
 
 db = Database()
 
+# Document in the metadata collection tracking the attack pattern dataset version
+DATASET_METADATA_ID = "attack_patterns"
+
 
 async def get_database() -> AsyncIOMotorClient:
     """Get database connection"""
@@ -49,51 +53,173 @@ async def close_mongo_connection():
         logger.info("Disconnected from MongoDB")
 
 
-async def create_search_indexes():
-    """Create indexes for better search performance"""
-    try:
-        collection = db.database.attack_patterns
-        
+def search_index_models() -> List[IndexModel]:
+    """Index definitions shared by the live collection and ingestion staging collections"""
+    return [
         # Create text index for full-text search on main searchable fields
-        await collection.create_index([
+        IndexModel([
             ("name", "text"),
             ("description", "text"),
             ("x_mitre_platforms", "text"),
             ("x_mitre_detection", "text"),
             ("phase_name", "text"),
             ("external_id", "text")
-        ])
+        ]),
         
         # Create individual indexes for regex searches and filtering
-        await collection.create_index("name")
-        await collection.create_index("description")
-        await collection.create_index("x_mitre_platforms")
-        await collection.create_index("x_mitre_detection")
-        await collection.create_index("phase_name")
-        await collection.create_index("external_id")
-        await collection.create_index("kill_chain_phases.phase_name")
-        await collection.create_index("external_references.source_name")
-        await collection.create_index("external_references.external_id")
+        IndexModel("id"),
+        IndexModel("name"),
+        IndexModel("description"),
+        IndexModel("x_mitre_platforms"),
+        IndexModel("x_mitre_detection"),
+        IndexModel("phase_name"),
+        IndexModel("external_id"),
+        IndexModel("kill_chain_phases.phase_name"),
+        IndexModel("external_references.source_name"),
+        IndexModel("external_references.external_id"),
         
         # Create indexes for additional MITRE fields
-        await collection.create_index("x_mitre_domains")
-        await collection.create_index("x_mitre_data_sources")
-        await collection.create_index("x_mitre_version")
-        await collection.create_index("x_mitre_is_subtechnique")
-        await collection.create_index("x_mitre_deprecated")
-        await collection.create_index("created")
-        await collection.create_index("modified")
+        IndexModel("x_mitre_domains"),
+        IndexModel("x_mitre_data_sources"),
+        IndexModel("x_mitre_version"),
+        IndexModel("x_mitre_is_subtechnique"),
+        IndexModel("x_mitre_deprecated"),
+        IndexModel("created"),
+        IndexModel("modified"),
         
         # Create compound indexes for common queries
-        await collection.create_index([("x_mitre_platforms", 1), ("phase_name", 1)])
-        await collection.create_index([("x_mitre_domains", 1), ("x_mitre_platforms", 1)])
-        await collection.create_index([("x_mitre_is_subtechnique", 1), ("x_mitre_deprecated", 1)])
+        IndexModel([("x_mitre_platforms", 1), ("phase_name", 1)]),
+        IndexModel([("x_mitre_domains", 1), ("x_mitre_platforms", 1)]),
+        IndexModel([("x_mitre_is_subtechnique", 1), ("x_mitre_deprecated", 1)]),
+    ]
+
+
+async def create_search_indexes(collection=None):
+    """Create indexes for better search performance"""
+    try:
+        if collection is None:
+            collection = db.database.attack_patterns
+        
+        await collection.create_indexes(search_index_models())
         
         logger.info("Search indexes created successfully")
     except Exception as e:
         logger.warning(f"Failed to create search indexes: {e}")
 
 
+def create_search_indexes_sync(collection):
+    """Create the search indexes through a synchronous (ingestion) connection"""
+    collection.create_indexes(search_index_models())
+    logger.info(f"Search indexes created on {collection.name}")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """A datetime read back from MongoDB, made timezone-aware"""
+    if value is not None and value.tzinfo is None:
+        # MongoDB stores UTC; the driver returns naive datetimes unless tz_aware is set
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def get_dataset_metadata(database) -> dict:
+    """Current dataset version and when it was bumped (version 0 and no time before the first ingestion)"""
+    metadata = await database.metadata.find_one({"_id": DATASET_METADATA_ID}, {"version": 1, "updated_at": 1}) or {}
+    return {"version": metadata.get("version", 0), "updated_at": _as_utc(metadata.get("updated_at"))}
+
+
+async def get_dataset_version(database) -> int:
+    """Current dataset version, bumped by every ingestion that changes data (0 before the first)"""
+    return (await get_dataset_metadata(database))["version"]
+
+
+def bump_dataset_version(database) -> int:
+    """Record a data change through a synchronous (ingestion) connection, returning the new version"""
+    metadata = database.metadata.find_one_and_update(
+        {"_id": DATASET_METADATA_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    logger.info(f"Dataset version is now {metadata['version']}")
+    return metadata["version"]
+
+
+def _distinct(path: str) -> dict:
+    """Expression for the distinct non-null values at ``path``, as a possibly empty array"""
+    # $setDifference returns a set, so values repeated within one technique are counted once
+    return {"$setDifference": [{"$ifNull": [f"${path}", []]}, [None]]}
+
+
+def _distribution(path: str) -> List[dict]:
+    """Count of techniques per value at ``path``"""
+    return [
+        {"$project": {"value": _distinct(path)}},
+        {"$unwind": "$value"},
+        {"$group": {"_id": "$value", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+
+
+def stats_pipeline(search_filter: Optional[dict] = None) -> List[dict]:
+    """Single aggregation computing every /stats figure in one pass over (matching) attack_patterns"""
+    stages: List[dict] = [{"$match": search_filter}] if search_filter else []
+    return stages + [{"$facet": {
+        "total": [{"$count": "count"}],
+        # Counted per technique, so techniques in several tactics count in each
+        "phase_distribution": _distribution("kill_chain_phases.phase_name"),
+        "platform_distribution": _distribution("x_mitre_platforms"),
+        "domain_distribution": _distribution("x_mitre_domains"),
+        "data_source_distribution": _distribution("x_mitre_data_sources"),
+        "tactic_platform_matrix": [
+            {"$project": {"tactic": _distinct("kill_chain_phases.phase_name"), "platform": _distinct("x_mitre_platforms")}},
+            {"$unwind": "$tactic"},
+            {"$unwind": "$platform"},
+            {"$group": {"_id": {"tactic": "$tactic", "platform": "$platform"}, "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "tactic": "$_id.tactic", "platform": "$_id.platform", "count": 1}},
+            {"$sort": {"tactic": 1, "platform": 1}}
+        ],
+        "flags": [{"$group": {
+            "_id": None,
+            "subtechnique_count": {"$sum": {"$cond": ["$x_mitre_is_subtechnique", 1, 0]}},
+            "deprecated_count": {"$sum": {"$cond": ["$x_mitre_deprecated", 1, 0]}}
+        }}]
+    }}]
+
+
+def stats_document(facet: dict, version: int) -> dict:
+    """Flatten the stats_pipeline output into the stored stats document"""
+    flags = facet["flags"][0] if facet.get("flags") else {}
+    return {
+        "version": version,
+        "computed_at": datetime.now(timezone.utc),
+        "total_patterns": facet["total"][0]["count"] if facet.get("total") else 0,
+        "phase_distribution": facet.get("phase_distribution", []),
+        "platform_distribution": facet.get("platform_distribution", []),
+        "domain_distribution": facet.get("domain_distribution", []),
+        "data_source_distribution": facet.get("data_source_distribution", []),
+        "tactic_platform_matrix": facet.get("tactic_platform_matrix", []),
+        "subtechnique_count": flags.get("subtechnique_count", 0),
+        "deprecated_count": flags.get("deprecated_count", 0)
+    }
+
+
+def materialize_stats(database, version: int) -> dict:
+    """Recompute statistics for a dataset version and store them, through a synchronous (ingestion) connection"""
+    facet = next(database.attack_patterns.aggregate(stats_pipeline()), {})
+    document = stats_document(facet, version)
+    database.stats.replace_one({"_id": DATASET_METADATA_ID}, document, upsert=True)
+    logger.info(f"Materialized statistics for dataset version {version}")
+    return document
+
+
+async def get_materialized_stats(database) -> Optional[dict]:
+    """Stored statistics document, or None before the first ingestion materializes one"""
+    document = await database.stats.find_one({"_id": DATASET_METADATA_ID})
+    if document is not None and "computed_at" in document:
+        document["computed_at"] = _as_utc(document["computed_at"])
+    return document
+
+
 def get_sync_database():
     """Get synchronous database connection for data ingestion"""
     mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -0,0 +1,106 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Mapping, Optional
+from bson import ObjectId
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.serialization import dumps
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    # MessagePack responses are only offered when the optional msgpack package is installed
+    MSGPACK_AVAILABLE = False
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Accept header of the request being handled, set by AcceptNegotiationMiddleware
+_request_accept: ContextVar[str] = ContextVar("request_accept", default="")
+
+# Response body encoders by media type; the first is the default
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {JSON_MEDIA_TYPE: dumps}
+
+
+def register_encoder(media_type: str, encode: Callable[[Any], bytes]) -> None:
+    """Offer another response media type to clients that ask for it in Accept"""
+    ENCODERS[media_type] = encode
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        # msgpack only packs aware datetimes; naive ones in this app are UTC, as MongoDB returns them
+        return value.replace(tzinfo=timezone.utc)
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def msgpack_dumps(content: Any) -> bytes:
+    """Serialize response content to MessagePack bytes"""
+    return msgpack.packb(content, default=_msgpack_default, datetime=True)
+
+
+if MSGPACK_AVAILABLE:
+    register_encoder(MSGPACK_MEDIA_TYPE, msgpack_dumps)
+
+
+def negotiate(accept: str) -> str:
+    """Pick the registered media type the client prefers, falling back to JSON"""
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for entry in accept.split(","):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # Earlier entries win ties, as listed by the client
+        if media_type.lower() in ENCODERS and quality > best_quality:
+            best, best_quality = media_type.lower(), quality
+    return best
+
+
+class NegotiatedResponse(Response):
+    """Response encoded as JSON (orjson) or another registered media type, chosen from the request's Accept header"""
+    
+    media_type = JSON_MEDIA_TYPE
+    
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        if media_type is None:
+            media_type = negotiate(_request_accept.get())
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers["Vary"] = "Accept"
+    
+    def render(self, content: Any) -> bytes:
+        return ENCODERS.get(self.media_type, dumps)(content)
+
+
+class AcceptNegotiationMiddleware:
+    """Expose each request's Accept header to NegotiatedResponse"""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), "")
+        token = _request_accept.set(accept)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_accept.reset(token)
@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 import os
+import inspect
 from dotenv import load_dotenv
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import router
+from app.conditional import ConditionalGetMiddleware
+from app.encoding import AcceptNegotiationMiddleware, NegotiatedResponse
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.routers import get_attack_service, router
+from app.services import READ_REPLICA_ENABLED, AttackPatternService, ReplicaAttackPatternService, keep_replica_fresh
 
 # Load environment variables
 load_dotenv()
@@ -17,9 +22,24 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Cybersecurity Intelligence API",
     description="API for managing MITRE ATT&CK attack patterns",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson by default, MessagePack for clients sending Accept: application/msgpack
+    default_response_class=NegotiatedResponse
 )
 
+
+async def dataset_stamp():
+    """Current dataset version and modification time, from the same service the endpoints use"""
+    service = app.dependency_overrides.get(get_attack_service, get_attack_service)()
+    if inspect.isawaitable(service):
+        service = await service
+    return await service.get_data_stamp()
+
+
+# ETag / Last-Modified on data endpoints, and 304 for unchanged data
+# (added before CORS, which wraps it, so 304 responses carry CORS headers too)
+app.add_middleware(ConditionalGetMiddleware, stamp=dataset_stamp)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,15 +49,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(AcceptNegotiationMiddleware)
+
 # Include routers
 app.include_router(router, prefix="/api/v1")
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection on startup"""
+    """Initialize database connection, the search index (or read replica) and the similarity model on startup"""
     try:
         await connect_to_mongo()
+        # Build the in-memory search index (the replica, in read replica mode) and similarity model now rather than on first use
+        service_class = ReplicaAttackPatternService if READ_REPLICA_ENABLED else AttackPatternService
+        service = service_class(await get_database())
+        await service.warm_up()
+        if READ_REPLICA_ENABLED:
+            # Reload the replica in the background whenever the dataset version changes
+            app.state.replica_refresh = asyncio.create_task(
+                keep_replica_fresh(service, float(os.getenv("DATASET_VERSION_CHECK_INTERVAL", 5)))
+            )
         logger.info("Application startup completed")
     except Exception as e:
         logger.error(f"Failed to start application: {e}")
@@ -46,8 +77,10 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown"""
+    """Stop the read replica refresh and close database connection on shutdown"""
     try:
+        if getattr(app.state, "replica_refresh", None) is not None:
+            app.state.replica_refresh.cancel()
         await close_mongo_connection()
         logger.info("Application shutdown completed")
     except Exception as e:
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 from datetime import datetime
 
 
@@ -16,6 +16,13 @@ class AttackPattern(BaseModel):
     external_references: List[dict] = Field(default_factory=list, description="External references")
     created_at: str = Field(default="N/A", description="Creation date")
     modified_at: str = Field(default="N/A", description="Last modification date")
+    # Additional MITRE fields
+    x_mitre_domains: List[str] = Field(default_factory=list, description="ATT&CK domains")
+    x_mitre_data_sources: List[str] = Field(default_factory=list, description="Data sources for detection")
+    x_mitre_version: str = Field(default="N/A", description="Object version")
+    x_mitre_is_subtechnique: bool = Field(default=False, description="Whether this is a sub-technique")
+    x_mitre_deprecated: bool = Field(default=False, description="Whether this technique is deprecated")
+    x_mitre_attack_spec_version: str = Field(default="N/A", description="ATT&CK spec version")
 
     class Config:
         pass
@@ -36,16 +43,128 @@ class AttackPatternResponse(BaseModel):
     modified_at: str
 
 
+class AttackPatternSummary(BaseModel):
+    """Slim response model for attack pattern lists, grids and tables"""
+    id: str
+    name: str
+    external_id: str
+    phase_name: str
+    x_mitre_platforms: List[str]
+    kill_chain_phases: List[dict]
+
+
+# Fields selectable with ``fields=`` and the fields of the summary view
+RESPONSE_FIELDS = list(AttackPatternResponse.model_fields)
+SUMMARY_FIELDS = list(AttackPatternSummary.model_fields)
+
+
 class SearchRequest(BaseModel):
     """Request model for search functionality"""
     query: str = Field(..., description="Search query")
     limit: int = Field(default=50, description="Maximum number of results")
     offset: int = Field(default=0, description="Number of results to skip")
+    cursor: Optional[str] = Field(default=None, description="Cursor from a previous response's next_cursor; overrides offset")
+    include_total: bool = Field(default=True, description="Whether to compute the total number of results")
+    view: Literal["summary", "full"] = Field(default="full", description="Representation of each result")
+    fields: Optional[List[str]] = Field(default=None, description="Only return these fields (overrides view)")
 
 
 class SearchResponse(BaseModel):
     """Response model for search results"""
-    results: List[AttackPatternResponse]
-    total: int
+    # Full patterns, summaries (view=summary) or the requested subset of fields (fields=...)
+    results: List[Union[AttackPatternResponse, AttackPatternSummary, Dict[str, Any]]]
+    total: Optional[int] = Field(default=None, description="Total number of results, null when not requested")
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+
+
+class LookupRequest(BaseModel):
+    """Request model for resolving many technique IDs in one request"""
+    ids: List[str] = Field(
+        ..., min_length=1, max_length=5000, description="Technique or sub-technique IDs, e.g. T1055 or T1055.001"
+    )
+    view: Literal["summary", "full"] = Field(default="full", description="Representation of each result")
+    fields: Optional[List[str]] = Field(default=None, description="Only return these fields (overrides view)")
+
+
+class LookupResponse(BaseModel):
+    """Response model for bulk lookups: found patterns keyed by requested ID, and the IDs not found"""
+    results: Dict[str, Union[AttackPatternResponse, AttackPatternSummary, Dict[str, Any]]]
+    missing: List[str]
+
+
+class CountResponse(BaseModel):
+    """Response model for lazily requested totals"""
+    total: int
+
+
+class Suggestion(BaseModel):
+    """A single typeahead suggestion"""
+    kind: str = Field(..., description="technique, platform or phase")
+    value: str
+    external_id: Optional[str] = Field(default=None, description="Technique ID, for technique suggestions")
+
+
+class SuggestResponse(BaseModel):
+    """Response model for typeahead suggestions"""
+    suggestions: List[Suggestion]
+
+
+class Neighbor(BaseModel):
+    """A similar technique and the weighted components of its similarity score"""
+    id: str
+    name: str
+    score: float = Field(..., description="phase + platform + keyword, between 0 and 1")
+    type: Literal["phase", "platform", "keyword"] = Field(..., description="Component contributing most to the score")
+    phase: float = Field(..., description="Weighted Jaccard similarity of kill chain phases")
+    platform: float = Field(..., description="Weighted Jaccard similarity of platforms")
+    keyword: float = Field(..., description="Weighted TF-IDF cosine similarity of descriptions")
+
+
+class NeighborsResponse(BaseModel):
+    """Response model for a technique's nearest neighbors"""
+    id: str
+    neighbors: List[Neighbor]
+
+
+class SimilarTechnique(BaseModel):
+    """A technique and the cosine similarity of its description to the query"""
+    id: str
+    name: str
+    score: float
+
+
+class SimilarRequest(BaseModel):
+    """Request model for similar techniques to several technique IDs and/or free texts, answered together"""
+    ids: List[str] = Field(default_factory=list, max_length=100, description="Technique IDs to find similar techniques for")
+    texts: List[str] = Field(default_factory=list, max_length=100, description="Free texts to find similar techniques for")
+    k: int = Field(default=10, ge=1, le=50, description="Similar techniques per query")
+
+
+class SimilarResult(BaseModel):
+    """Similar techniques for one technique ID or free text"""
+    query: str
+    kind: Literal["id", "text"]
+    found: bool = Field(..., description="False for technique IDs that do not exist")
+    similar: List[SimilarTechnique]
+
+
+class SimilarResponse(BaseModel):
+    """Response model for similar technique queries, in request order (IDs first)"""
+    results: List[SimilarResult]
+
+
+class TechniqueGraphEdge(BaseModel):
+    """Directed edge from a technique to one of its nearest neighbors"""
+    source: str
+    target: str
+    type: Literal["phase", "platform", "keyword"]
+    strength: float
+
+
+class TechniqueGraphResponse(BaseModel):
+    """Response model for the technique relationship graph"""
+    version: int
+    k: int
+    edges: List[TechniqueGraphEdge]
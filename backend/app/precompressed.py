@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import os
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from starlette.responses import Response
+from app.cache import MISSING, SingleFlight, TTLCache
+from app.encoding import ENCODERS
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    # Brotli encodings are only built when the optional brotli package is installed
+    BROTLI_AVAILABLE = False
+
+# Compression levels; payloads are compressed once per dataset version, so favour size over speed
+GZIP_LEVEL = int(os.getenv("PRECOMPRESSED_GZIP_LEVEL", 9))
+BROTLI_QUALITY = int(os.getenv("PRECOMPRESSED_BROTLI_QUALITY", 9))
+
+# Serve the dashboard and statistics payloads from bodies built and compressed once per dataset version
+PRECOMPRESSED_RESPONSES_ENABLED = os.getenv("PRECOMPRESSED_RESPONSES_ENABLED", "true").lower() == "true"
+
+# Content codings offered to clients, most preferred first when the client ranks them equally
+CONTENT_CODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    """Encode a response body with a content coding from CONTENT_CODINGS"""
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_coding(accept_encoding: str) -> Optional[str]:
+    """Content coding from CONTENT_CODINGS the client prefers, or None for the identity body"""
+    qualities: Dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in CONTENT_CODINGS:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class EncodedPayload:
+    """A response body with every content coding built up front"""
+    
+    __slots__ = ("media_type", "body", "encodings")
+    
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.body = body
+        self.encodings = {coding: compress(body, coding) for coding in CONTENT_CODINGS}
+    
+    def response(self, accept_encoding: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Response with the encoding the client accepts, sent as stored"""
+        coding = choose_coding(accept_encoding)
+        response_headers = {"Vary": "Accept, Accept-Encoding", **(headers or {})}
+        if coding is None:
+            return Response(self.body, media_type=self.media_type, headers=response_headers)
+        response_headers["Content-Encoding"] = coding
+        return Response(self.encodings[coding], media_type=self.media_type, headers=response_headers)
+
+
+# Encoded payloads, keyed by dataset version, payload name and media type
+_payloads = TTLCache(ttl=float("inf"), max_entries=int(os.getenv("PRECOMPRESSED_MAX_ENTRIES", 8)))
+
+
+# Payloads being built; concurrent requests for one wait for it instead of compressing it again
+_payload_flights = SingleFlight()
+
+
+async def get_payload(
+    version: int,
+    name: str,
+    media_type: str,
+    build: Callable[[], Awaitable[Any]],
+    variant: Hashable = ()
+) -> EncodedPayload:
+    """The ``name`` payload (``variant`` of it) for a dataset version, built, serialized and compressed on first use"""
+    key = (version, name, variant, media_type)
+    payload = _payloads.get(key)
+    if payload is MISSING:
+        payload, _ = await _payload_flights.do(f"payload:{name}", key, partial(_build_payload, key, media_type, build))
+    return payload
+
+
+async def _build_payload(key: Hashable, media_type: str, build: Callable[[], Awaitable[Any]]) -> EncodedPayload:
+    body = ENCODERS[media_type](await build())
+    # Compression is CPU-bound; keep it off the event loop
+    payload = await asyncio.to_thread(EncodedPayload, body, media_type)
+    _payloads.set(key, payload)
+    return payload
+
+
+def payload_flight_metrics() -> Dict[str, Any]:
+    """Executed and coalesced payload builds"""
+    return _payload_flights.metrics()
+
+
+def clear_payloads() -> None:
+    """Forget every encoded payload"""
+    _payloads.clear()
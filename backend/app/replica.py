@@ -0,0 +1,209 @@
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from bson import ObjectId
+from app.database import stats_document
+from app.search_index import SearchIndex
+
+# List fields whose values repeat across techniques; each distinct string is stored once
+INTERNED_FIELDS = ("x_mitre_platforms", "x_mitre_domains", "x_mitre_data_sources")
+
+# Fields of a stored pattern in the order ingestion writes them: _id, the AttackPattern fields, the content hash
+RECORD_FIELDS = (
+    "_id", "id", "name", "description", "x_mitre_platforms", "x_mitre_detection", "phase_name", "external_id",
+    "kill_chain_phases", "external_references", "created_at", "modified_at", "x_mitre_domains",
+    "x_mitre_data_sources", "x_mitre_version", "x_mitre_is_subtechnique", "x_mitre_deprecated",
+    "x_mitre_attack_spec_version", "content_hash"
+)
+_RECORD_SLOTS = frozenset(RECORD_FIELDS)
+_record_values = attrgetter(*RECORD_FIELDS)
+
+# Slot value of a field the stored document did not have
+_ABSENT = object()
+
+
+class PatternRecord(Mapping):
+    """A stored pattern held in slots instead of a dict
+
+    A field the document did not have is marked absent, and fields outside
+    RECORD_FIELDS go to ``extra``, so the record has exactly the document's
+    keys. Records are read-only; to_document copies one into the plain dict
+    that responses are built from.
+    """
+
+    __slots__ = RECORD_FIELDS + ("extra",)
+
+    def __init__(self, document: Dict[str, Any]):
+        for field in RECORD_FIELDS:
+            setattr(self, field, _ABSENT)
+        extra = None
+        for key, value in document.items():
+            if key in _RECORD_SLOTS:
+                setattr(self, key, value)
+            else:
+                extra = extra or {}
+                extra[key] = value
+        self.extra: Optional[Dict[str, Any]] = extra
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _RECORD_SLOTS:
+            value = getattr(self, key)
+            if value is _ABSENT:
+                raise KeyError(key)
+            return value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (field for field, value in zip(RECORD_FIELDS, _record_values(self)) if value is not _ABSENT)
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_document(self) -> Dict[str, Any]:
+        """The stored document as a dict, sharing the record's values"""
+        document = {field: value for field, value in zip(RECORD_FIELDS, _record_values(self)) if value is not _ABSENT}
+        if self.extra is not None:
+            document.update(self.extra)
+        return document
+
+
+def _raw_values(document: Mapping[str, Any], path: str) -> Iterable[Any]:
+    """Values at a dotted path, descending into lists like MongoDB does (unlike field_values, not stringified)"""
+    values: List[Any] = [document]
+    for key in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                next_values.extend(item.get(key) for item in value if isinstance(item, dict))
+            elif isinstance(value, Mapping):
+                next_values.append(value.get(key))
+        values = next_values
+    for value in values:
+        if isinstance(value, list):
+            yield from (item for item in value if item is not None)
+        elif value is not None:
+            yield value
+
+
+def _intern(document: Dict[str, Any]) -> Dict[str, Any]:
+    for field in INTERNED_FIELDS:
+        values = document.get(field)
+        if isinstance(values, list):
+            document[field] = [sys.intern(value) if isinstance(value, str) else value for value in values]
+    for phase in document.get("kill_chain_phases") or []:
+        if isinstance(phase, dict):
+            for key in ("kill_chain_name", "phase_name"):
+                if isinstance(phase.get(key), str):
+                    phase[key] = sys.intern(phase[key])
+    if isinstance(document.get("phase_name"), str):
+        document["phase_name"] = sys.intern(document["phase_name"])
+    return document
+
+
+def _distribution(bitmaps: Dict[Any, int], selection: int) -> List[Dict[str, Any]]:
+    counts = [(value, (bitmap & selection).bit_count()) for value, bitmap in bitmaps.items()]
+    return [
+        {"_id": value, "count": count}
+        for value, count in sorted(counts, key=lambda item: (-item[1], str(item[0])))
+        if count
+    ]
+
+
+class ReadReplica:
+    """Immutable in-memory copy of the attack_patterns collection for one dataset version
+
+    Documents are held as PatternRecords in _id order, as MongoDB returns
+    them, with their platform, domain, data source and phase strings
+    interned; the search index is built over the same records. Every value of
+    every facet has a bitmap: a Python int with bit i set when document i has
+    that value. A filter is then an OR of bitmaps within a facet and an AND
+    across facets, and a count is a popcount, so statistics for any filter
+    never touch the documents themselves.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]], version: int, facets: Dict[str, str]):
+        self.version = version
+        self.records = [PatternRecord(_intern(document)) for document in documents]
+        self.object_ids: List[ObjectId] = [record["_id"] for record in self.records]
+        # Pattern ID -> position; the first stored document wins if an ID repeats, as find_one does
+        self.positions: Dict[str, int] = {}
+        for position, record in enumerate(self.records):
+            self.positions.setdefault(record.get("id"), position)
+
+        self.all = (1 << len(self.records)) - 1
+        self.bitmaps: Dict[str, Dict[Any, int]] = {}
+        for name, path in facets.items():
+            bitmaps: Dict[Any, int] = defaultdict(int)
+            for position, record in enumerate(self.records):
+                for value in set(_raw_values(record, path)):
+                    bitmaps[value] |= 1 << position
+            self.bitmaps[name] = dict(bitmaps)
+
+        self.search_index = SearchIndex(self.records, version)
+        self.stats = self.statistics({})
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, pattern_id: str) -> Optional[Dict[str, Any]]:
+        """The document with pattern ID ``pattern_id``, or None"""
+        position = self.positions.get(pattern_id)
+        return None if position is None else self.records[position].to_document()
+
+    def page(self, limit: int, offset: int = 0, after: Optional[ObjectId] = None) -> List[Dict[str, Any]]:
+        """One page of documents in _id order, starting after the ``after`` _id when given, otherwise at ``offset``"""
+        start = bisect_right(self.object_ids, after) if after is not None else offset
+        return [record.to_document() for record in self.records[start:start + limit]]
+
+    def select(self, filters: Dict[str, Any]) -> int:
+        """Bitmap of the documents matching every filter; a list matches any of its values"""
+        selection = self.all
+        for name, value in filters.items():
+            if value is None or value == []:
+                continue
+            if name not in self.bitmaps:
+                raise ValueError(f"Unknown statistics filter {name!r}")
+            bitmaps = self.bitmaps[name]
+            matching = 0
+            for wanted in value if isinstance(value, list) else [value]:
+                matching |= bitmaps.get(wanted, 0)
+            selection &= matching
+        return selection
+
+    def statistics(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """The stats_document for the documents matching ``filters``, computed from the bitmaps
+
+        A value repeated within one technique counts once for it.
+        """
+        selection = self.select(filters)
+        phases, platforms = self.bitmaps.get("phase", {}), self.bitmaps.get("platform", {})
+        matrix = []
+        for tactic in sorted(phases, key=str):
+            in_tactic = phases[tactic] & selection
+            if not in_tactic:
+                continue
+            for platform in sorted(platforms, key=str):
+                count = (in_tactic & platforms[platform]).bit_count()
+                if count:
+                    matrix.append({"tactic": tactic, "platform": platform, "count": count})
+        flags = {
+            "subtechnique_count": (self.bitmaps.get("subtechnique", {}).get(True, 0) & selection).bit_count(),
+            "deprecated_count": (self.bitmaps.get("deprecated", {}).get(True, 0) & selection).bit_count()
+        }
+        total = selection.bit_count()
+        return stats_document({
+            "total": [{"count": total}] if total else [],
+            "phase_distribution": _distribution(phases, selection),
+            "platform_distribution": _distribution(platforms, selection),
+            "domain_distribution": _distribution(self.bitmaps.get("domain", {}), selection),
+            "data_source_distribution": _distribution(self.bitmaps.get("data_source", {}), selection),
+            "tactic_platform_matrix": matrix,
+            "flags": [{"_id": None, **flags}] if total else []
+        }, self.version)
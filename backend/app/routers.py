@@ -1,60 +1,131 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 import logging
-from app.models import AttackPatternResponse, SearchRequest, SearchResponse
+import time
+from app.models import (
+    AttackPatternResponse, CountResponse, LookupRequest, LookupResponse, NeighborsResponse, RESPONSE_FIELDS, SUMMARY_FIELDS,
+    SearchRequest, SearchResponse, SimilarRequest, SimilarResponse, SimilarResult, SuggestResponse,
+    TechniqueGraphResponse
+)
 from app.database import get_database
-from app.services import AttackPatternService
+from app.encoding import NegotiatedResponse, negotiate
+from app.precompressed import PRECOMPRESSED_RESPONSES_ENABLED, get_payload
+from app.serialization import dumps, response_dict, search_response_content
+from app.services import (
+    READ_REPLICA_ENABLED, RESPONSE_CACHE_ENABLED, AttackPatternService, CachedAttackPatternService, InvalidCursorError,
+    ReplicaAttackPatternService, coalescing_metrics, next_page_cursor, response_cache_metrics
+)
+from app.similarity import GRAPH_NEIGHBORS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Streamed responses are flushed once this many bytes are buffered
+STREAM_FLUSH_BYTES = 64 * 1024
+
 
 async def get_attack_service():
-    """Dependency to get attack pattern service"""
+    """Dependency to get attack pattern service (the read replica when enabled, else reading through the response cache)"""
     database = await get_database()
+    if READ_REPLICA_ENABLED:
+        return ReplicaAttackPatternService(database)
+    if RESPONSE_CACHE_ENABLED:
+        return CachedAttackPatternService(database)
     return AttackPatternService(database)
 
 
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format per-stage durations (milliseconds) as a Server-Timing header value"""
+    return ", ".join(f"{stage};dur={duration:.2f}" for stage, duration in timings.items())
+
+
+def resolve_fields(view: str, fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Fields to return for a view or explicit field list, or None for full patterns"""
+    if fields:
+        unknown = sorted(set(fields) - set(RESPONSE_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # The id is always returned so results can be fetched in full later
+        return list(dict.fromkeys(["id", *fields]))
+    if view == "summary":
+        return SUMMARY_FIELDS
+    return None
+
+
+def split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields query parameter"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+async def ndjson_stream(patterns: AsyncIterator[Dict[str, Any]], fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """Encode patterns as newline-delimited JSON, flushed in chunks of about STREAM_FLUSH_BYTES"""
+    buffer = bytearray()
+    try:
+        async for pattern in patterns:
+            buffer += dumps(response_dict(pattern, fields))
+            buffer += b"\n"
+            if len(buffer) >= STREAM_FLUSH_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    except Exception as e:
+        # Headers are already sent; aborting leaves the client with a visibly truncated stream
+        logger.error(f"Failed to stream attack patterns: {e}")
+        raise
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Cybersecurity Intelligence API is running"}
 
 
+@router.get("/metrics/cache")
+async def get_cache_metrics():
+    """Get response cache hit/miss counts, overall and per service operation"""
+    return response_cache_metrics()
+
+
+@router.get("/metrics/coalescing")
+async def get_coalescing_metrics():
+    """Get how many reads ran and how many were coalesced into an identical read already in flight"""
+    return coalescing_metrics()
+
+
 @router.get("/attack-patterns", response_model=SearchResponse)
 async def get_attack_patterns(
     limit: int = Query(10, ge=1, le=100, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor; overrides offset"),
+    include_total: bool = Query(True, description="Whether to compute the total number of patterns"),
+    view: Literal["summary", "full"] = Query("full", description="Representation of each result"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (overrides view)"),
     service: AttackPatternService = Depends(get_attack_service)
 ):
-    """Get all attack patterns with pagination"""
+    """Get all attack patterns with offset or cursor pagination"""
+    fields = resolve_fields(view, split_fields(fields))
     try:
-        patterns, total = await service.get_all_patterns(limit=limit, offset=offset)
-        
-        # Convert to response format
-        response_patterns = []
-        for pattern in patterns:
-            response_patterns.append(AttackPatternResponse(
-                id=pattern["id"],
-                name=pattern["name"],
-                description=pattern["description"],
-                x_mitre_platforms=pattern["x_mitre_platforms"],
-                x_mitre_detection=pattern["x_mitre_detection"],
-                phase_name=pattern["phase_name"],
-                external_id=pattern["external_id"],
-                kill_chain_phases=pattern["kill_chain_phases"],
-                external_references=pattern.get("external_references", []),
-                created_at=pattern.get("created_at", ""),
-                modified_at=pattern.get("modified_at", "")
-            ))
-        
-        return SearchResponse(
-            results=response_patterns,
-            total=total,
+        patterns, total = await service.get_all_patterns(
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            include_total=include_total,
+            fields=fields
         )
+        
+        # Convert to response format; returning a response directly skips response_model re-validation
+        return NegotiatedResponse(search_response_content(
+            patterns, total, limit, offset, next_page_cursor(patterns, limit), fields
+        ))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get attack patterns: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -66,41 +137,93 @@ async def search_attack_patterns(
     service: AttackPatternService = Depends(get_attack_service)
 ):
     """Search attack patterns by description"""
+    fields = resolve_fields(request.view, request.fields)
     try:
         patterns, total = await service.search_patterns(
             query=request.query,
             limit=request.limit,
-            offset=request.offset
+            offset=request.offset,
+            cursor=request.cursor,
+            include_total=request.include_total,
+            fields=fields
         )
         
-        # Convert to response format
-        response_patterns = []
-        for pattern in patterns:
-            response_patterns.append(AttackPatternResponse(
-                id=pattern["id"],
-                name=pattern["name"],
-                description=pattern["description"],
-                x_mitre_platforms=pattern["x_mitre_platforms"],
-                x_mitre_detection=pattern["x_mitre_detection"],
-                phase_name=pattern["phase_name"],
-                external_id=pattern["external_id"],
-                kill_chain_phases=pattern["kill_chain_phases"],
-                external_references=pattern.get("external_references", []),
-                created_at=pattern.get("created_at", ""),
-                modified_at=pattern.get("modified_at", "")
-            ))
-        
-        return SearchResponse(
-            results=response_patterns,
-            total=total,
-            limit=request.limit,
-            offset=request.offset
-        )
+        # Convert to response format (the response body is serialized when it is constructed)
+        convert_start = time.perf_counter()
+        response = NegotiatedResponse(search_response_content(
+            patterns, total, request.limit, request.offset, next_page_cursor(patterns, request.limit), fields
+        ))
+        service.timings["convert"] = (time.perf_counter() - convert_start) * 1000
+        response.headers["Server-Timing"] = server_timing_header(service.timings)
+        return response
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to search attack patterns: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/attack-patterns/lookup", response_model=LookupResponse)
+async def lookup_attack_patterns(
+    request: LookupRequest,
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Resolve many technique IDs in one request, reporting the IDs that do not exist"""
+    fields = resolve_fields(request.view, request.fields)
+    try:
+        found, missing = await service.get_patterns_by_ids(request.ids, fields)
+        
+        # Convert to response format (the response body is serialized when it is constructed)
+        convert_start = time.perf_counter()
+        response = NegotiatedResponse({
+            "results": {pattern_id: response_dict(pattern, fields) for pattern_id, pattern in found.items()},
+            "missing": missing
+        })
+        service.timings["convert"] = (time.perf_counter() - convert_start) * 1000
+        response.headers["Server-Timing"] = server_timing_header(service.timings)
+        return response
+    except Exception as e:
+        logger.error(f"Failed to look up attack patterns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/attack-patterns/count", response_model=CountResponse)
+async def count_attack_patterns(service: AttackPatternService = Depends(get_attack_service)):
+    """Get the total number of attack patterns"""
+    try:
+        return CountResponse(total=await service.count_patterns())
+    except Exception as e:
+        logger.error(f"Failed to count attack patterns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/attack-patterns/search/count", response_model=CountResponse)
+async def count_search_results(
+    request: SearchRequest,
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Get the total number of results for a search (for requests made with include_total=false)"""
+    try:
+        return CountResponse(total=await service.count_search_results(request.query))
+    except Exception as e:
+        logger.error(f"Failed to count search results: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/attack-patterns/suggest", response_model=SuggestResponse)
+async def suggest_attack_patterns(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=25, description="Maximum number of suggestions"),
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Typeahead suggestions for technique names and IDs, platforms and phases"""
+    try:
+        return SuggestResponse(suggestions=await service.suggest(q, limit))
+    except Exception as e:
+        logger.error(f"Failed to suggest attack patterns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/attack-patterns/{pattern_id}", response_model=AttackPatternResponse)
 async def get_attack_pattern(
     pattern_id: str,
@@ -129,68 +252,162 @@ async def get_attack_pattern(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/attack-patterns/similar", response_model=SimilarResponse)
+async def find_similar_attack_patterns(
+    request: SimilarRequest,
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Find the techniques whose descriptions are most similar to each technique ID and free text"""
+    if not request.ids and not request.texts:
+        raise HTTPException(status_code=400, detail="Provide at least one technique ID or text")
+    try:
+        results = await service.find_similar(request.k, ids=request.ids, texts=request.texts)
+        response = NegotiatedResponse({"results": results})
+        response.headers["Server-Timing"] = server_timing_header(service.timings)
+        return response
+    except Exception as e:
+        logger.error(f"Failed to find similar attack patterns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/attack-patterns/{pattern_id}/similar", response_model=SimilarResult)
+async def get_similar_attack_patterns(
+    pattern_id: str,
+    k: int = Query(10, ge=1, le=50, description="Number of similar techniques"),
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Get the techniques whose descriptions are most similar to an attack pattern's"""
+    try:
+        return NegotiatedResponse(await service.get_similar(pattern_id, k))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get techniques similar to {pattern_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/attack-patterns/{pattern_id}/neighbors", response_model=NeighborsResponse)
+async def get_attack_pattern_neighbors(
+    pattern_id: str,
+    k: int = Query(10, ge=1, le=GRAPH_NEIGHBORS, description="Number of neighbors"),
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Get the techniques most similar to an attack pattern by phase, platform and description"""
+    try:
+        return NegotiatedResponse({"id": pattern_id, "neighbors": await service.get_neighbors(pattern_id, k)})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get neighbors of attack pattern {pattern_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/technique-graph", response_model=TechniqueGraphResponse)
+async def get_technique_graph(
+    k: int = Query(10, ge=1, le=GRAPH_NEIGHBORS, description="Neighbors per technique"),
+    min_score: float = Query(0.3, ge=0, le=1, description="Minimum similarity for an edge"),
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Get the technique relationship graph: edges to each technique's most similar techniques"""
+    try:
+        return NegotiatedResponse(await service.get_technique_graph(k, min_score))
+    except Exception as e:
+        logger.error(f"Failed to get technique graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/stats")
-async def get_stats(service: AttackPatternService = Depends(get_attack_service)):
+async def get_stats(
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    service: AttackPatternService = Depends(get_attack_service)
+):
     """Get statistics about attack patterns"""
     try:
-        patterns, total = await service.get_all_patterns(limit=1, offset=0)
-        
-        # Get phase statistics
-        database = await get_database()
-        phase_stats = await database.attack_patterns.aggregate([
-            {"$group": {"_id": "$phase_name", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]).to_list(length=None)
-        
-        # Get platform statistics
-        platform_stats = await database.attack_patterns.aggregate([
-            {"$unwind": "$x_mitre_platforms"},
-            {"$group": {"_id": "$x_mitre_platforms", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]).to_list(length=None)
-        
-        return {
-            "total_patterns": total,
-            "phase_distribution": phase_stats,
-            "platform_distribution": platform_stats
-        }
+        if PRECOMPRESSED_RESPONSES_ENABLED:
+            payload = await get_payload(
+                await service.get_data_version(), "stats", negotiate(accept or ""), service.get_stats
+            )
+            return payload.response(accept_encoding or "")
+        return await service.get_stats()
     except Exception as e:
         logger.error(f"Failed to get stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dashboard-data", response_model=SearchResponse)
+@router.get("/stats/breakdown")
+async def get_stats_breakdown(
+    phase: Optional[List[str]] = Query(None, description="Kill chain phase(s) a technique belongs to"),
+    platform: Optional[List[str]] = Query(None, description="Platform(s)"),
+    domain: Optional[List[str]] = Query(None, description="ATT&CK domain(s)"),
+    data_source: Optional[List[str]] = Query(None, description="Data source(s)"),
+    subtechnique: Optional[bool] = Query(None, description="Only sub-techniques (true) or only techniques (false)"),
+    deprecated: Optional[bool] = Query(None, description="Only deprecated (true) or only current (false) techniques"),
+    service: AttackPatternService = Depends(get_attack_service)
+):
+    """Get phase, platform, domain and data source breakdowns for the patterns matching the filters"""
+    try:
+        return await service.get_stats_breakdown({
+            "phase": phase,
+            "platform": platform,
+            "domain": domain,
+            "data_source": data_source,
+            "subtechnique": subtechnique,
+            "deprecated": deprecated
+        })
+    except Exception as e:
+        logger.error(f"Failed to get stats breakdown: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/dashboard-data",
+    response_model=SearchResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "SearchResponse, or one pattern per line when streamed"}}
+)
 async def get_dashboard_data(
+    view: Literal["summary", "full"] = Query("full", description="Representation of each result"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (overrides view)"),
+    output_format: Literal["json", "ndjson"] = Query(
+        "json", alias="format", description="ndjson streams every pattern, one JSON object per line"
+    ),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     service: AttackPatternService = Depends(get_attack_service)
 ):
     """Get all attack patterns for dashboard (no pagination)"""
-    try:
+    fields = resolve_fields(view, split_fields(fields))
+    if output_format == "ndjson" or (accept and NDJSON_MEDIA_TYPE in accept):
+        try:
+            total = await service.count_patterns()
+        except Exception as e:
+            logger.error(f"Failed to get dashboard data: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(
+            ndjson_stream(service.iter_patterns(fields), fields),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"X-Total-Count": str(total)}
+        )
+    
+    async def dashboard_content() -> Dict[str, Any]:
         # Get all patterns without pagination for dashboard
-        patterns, total = await service.get_all_patterns(limit=10000, offset=0)
+        patterns, total = await service.get_all_patterns(limit=10000, offset=0, fields=fields)
         
         # Convert to response format
-        response_patterns = []
-        for pattern in patterns:
-            response_patterns.append(AttackPatternResponse(
-                id=pattern["id"],
-                name=pattern["name"],
-                description=pattern["description"],
-                x_mitre_platforms=pattern["x_mitre_platforms"],
-                x_mitre_detection=pattern["x_mitre_detection"],
-                phase_name=pattern["phase_name"],
-                external_id=pattern["external_id"],
-                kill_chain_phases=pattern["kill_chain_phases"],
-                external_references=pattern.get("external_references", []),
-                created_at=pattern.get("created_at", ""),
-                modified_at=pattern.get("modified_at", "")
-            ))
-        
-        return SearchResponse(
-            results=response_patterns,
-            total=total,
-            limit=total,
-            offset=0
-        )
+        return search_response_content(patterns, total, total, 0, fields=fields)
+    
+    try:
+        if PRECOMPRESSED_RESPONSES_ENABLED:
+            # The whole dataset is identical for every client of a version, so it is compressed once
+            payload = await get_payload(
+                await service.get_data_version(),
+                "dashboard-data",
+                negotiate(accept or ""),
+                dashboard_content,
+                variant=tuple(fields or ())
+            )
+            return payload.response(accept_encoding or "")
+        return NegotiatedResponse(await dashboard_content())
     except Exception as e:
         logger.error(f"Failed to get dashboard data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
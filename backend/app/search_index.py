@@ -0,0 +1,254 @@
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+# Searchable fields and their BM25 weights; the same fields the regex fallback scans
+SEARCH_FIELDS: Dict[str, float] = {
+    "name": 3.0,
+    "external_id": 3.0,
+    "description": 1.0,
+    "x_mitre_detection": 0.5,
+    "x_mitre_platforms": 1.5,
+    "phase_name": 1.5,
+    "kill_chain_phases.phase_name": 1.0,
+    "external_references.source_name": 0.5,
+    "external_references.external_id": 1.0,
+    "x_mitre_domains": 1.0,
+    "x_mitre_data_sources": 1.0,
+    "x_mitre_version": 0.5,
+    "x_mitre_attack_spec_version": 0.5,
+}
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+NGRAM_SIZE = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of a field value or query"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def ngrams(term: str) -> Set[str]:
+    """Character n-grams of a term, used to find terms containing a substring"""
+    return {term[i:i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1)}
+
+
+def field_values(document: Mapping[str, Any], path: str) -> Iterable[str]:
+    """String values at a dotted path, descending into lists like MongoDB does"""
+    values: List[Any] = [document]
+    for key in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                value = [item.get(key) for item in value if isinstance(item, dict)]
+                next_values.extend(value)
+            elif isinstance(value, Mapping):
+                next_values.append(value.get(key))
+        values = next_values
+    for value in values:
+        if isinstance(value, list):
+            yield from (str(item) for item in value if item is not None)
+        elif value is not None:
+            yield str(value)
+
+
+def as_dict(document: Mapping[str, Any]) -> Dict[str, Any]:
+    """An indexed document itself, or a replica record copied to a dict"""
+    return document if isinstance(document, dict) else document.to_document()
+
+
+class SuggestionIndex:
+    """Sorted-array prefix index for typeahead over technique names, IDs, platforms and phases
+    
+    Every key is a lowercase string mapped to a (kind, value, external_id)
+    suggestion. Technique names are also keyed from each word onwards, so
+    "inj" suggests "Process Injection".
+    """
+    
+    def __init__(self, documents: Sequence[Mapping[str, Any]]):
+        entries = set()
+        for document in documents:
+            external_id = document.get("external_id")
+            name = document.get("name")
+            technique = ("technique", name or external_id, external_id)
+            if external_id:
+                entries.add((external_id.lower(), technique))
+            if name:
+                words = name.lower().split()
+                for i in range(len(words)):
+                    entries.add((" ".join(words[i:]), technique))
+            for platform in field_values(document, "x_mitre_platforms"):
+                entries.add((platform.lower(), ("platform", platform, None)))
+            for phase in field_values(document, "kill_chain_phases.phase_name"):
+                entries.add((phase.lower(), ("phase", phase, None)))
+        
+        ordered = sorted(entries, key=lambda entry: (entry[0], entry[1][0], entry[1][1] or ""))
+        self.keys = [key for key, _ in ordered]
+        self.suggestions = [suggestion for _, suggestion in ordered]
+    
+    def suggest(self, prefix: str, limit: int = 10) -> List[tuple[str, str, Optional[str]]]:
+        """Up to ``limit`` distinct (kind, value, external_id) suggestions whose key starts with ``prefix``"""
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+        
+        results: List[tuple[str, str, Optional[str]]] = []
+        seen = set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(results) < limit and self.keys[position].startswith(prefix):
+            suggestion = self.suggestions[position]
+            if suggestion not in seen:
+                seen.add(suggestion)
+                results.append(suggestion)
+            position += 1
+        return results
+
+
+class SearchIndex:
+    """Immutable in-memory inverted index over attack pattern documents
+    
+    Documents are dicts, or read replica records, which are copied to dicts
+    with their ``to_document`` method when returned.
+    
+    Every query token must match (as a whole term or a substring of one) in
+    at least one field. Matches are ranked with per-field BM25, and substring
+    matches score in proportion to how much of the term they cover.
+    """
+    
+    def __init__(self, documents: Sequence[Mapping[str, Any]], version: int = 0):
+        self.documents = documents
+        self.version = version
+        # Pattern ID -> document, for bulk lookups; the first stored document wins if an ID repeats
+        self.by_id: Dict[str, Mapping[str, Any]] = {}
+        for document in documents:
+            self.by_id.setdefault(document.get("id"), document)
+        # field -> term -> {document position: term frequency}
+        self.postings: Dict[str, Dict[str, Dict[int, int]]] = {field: defaultdict(dict) for field in SEARCH_FIELDS}
+        self.lengths: Dict[str, List[int]] = {field: [0] * len(documents) for field in SEARCH_FIELDS}
+        document_terms: Dict[str, Set[int]] = defaultdict(set)
+        
+        for position, document in enumerate(documents):
+            for field in SEARCH_FIELDS:
+                tokens = [token for value in field_values(document, field) for token in tokenize(value)]
+                self.lengths[field][position] = len(tokens)
+                postings = self.postings[field]
+                for token in tokens:
+                    postings[token][position] = postings[token].get(position, 0) + 1
+                    document_terms[token].add(position)
+        
+        self.average_lengths = {
+            field: (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+            for field, lengths in self.lengths.items()
+        }
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - len(positions) + 0.5) / (len(positions) + 0.5))
+            for term, positions in document_terms.items()
+        }
+        self.terms = sorted(self.idf)
+        self.ngram_terms: Dict[str, Set[str]] = defaultdict(set)
+        for term in self.terms:
+            for gram in ngrams(term):
+                self.ngram_terms[gram].add(term)
+        self.suggestions = SuggestionIndex(documents)
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def expand(self, token: str) -> List[str]:
+        """Indexed terms containing ``token``, found through the n-gram (or prefix, for short tokens) index"""
+        if len(token) < NGRAM_SIZE:
+            # Too short for n-grams; a prefix scan of the sorted vocabulary covers the common typeahead case
+            start = bisect_left(self.terms, token)
+            matches = []
+            for term in self.terms[start:]:
+                if not term.startswith(token):
+                    break
+                matches.append(term)
+            return matches
+        
+        candidates: Optional[Set[str]] = None
+        for gram in ngrams(token):
+            terms = self.ngram_terms.get(gram, set())
+            candidates = set(terms) if candidates is None else candidates & terms
+            if not candidates:
+                return []
+        return [term for term in candidates or () if token in term]
+    
+    def _score_term(self, term: str, weight: float, scores: Dict[int, float]) -> None:
+        idf = self.idf[term]
+        for field, field_weight in SEARCH_FIELDS.items():
+            positions = self.postings[field].get(term)
+            if not positions:
+                continue
+            lengths = self.lengths[field]
+            average = self.average_lengths[field]
+            for position, frequency in positions.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average)
+                scores[position] = scores.get(position, 0.0) + (
+                    weight * field_weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                )
+    
+    def rank(self, query: str) -> List[tuple[float, int]]:
+        """(score, document position) for every match, best first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        
+        scores: Optional[Dict[int, float]] = None
+        for token in tokens:
+            token_scores: Dict[int, float] = {}
+            for term in self.expand(token):
+                self._score_term(term, len(token) / len(term), token_scores)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    position: score + token_scores[position]
+                    for position, score in scores.items()
+                    if position in token_scores
+                }
+            if not scores:
+                return []
+        
+        # Ties keep ingestion order so pages are stable
+        return sorted(((score, position) for position, score in scores.items()), key=lambda item: (-item[0], item[1]))
+    
+    def count(self, query: str) -> int:
+        """Number of documents matching ``query``"""
+        return len(self.rank(query))
+    
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        after: Optional[tuple[float, str]] = None
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """Return one page of matching documents (with ``_score``) and the total number of matches
+        
+        ``after`` is the (score, _id) of the last document on the previous page and overrides offset.
+        """
+        ranked = self.rank(query)
+        if after is not None:
+            last_score, last_id = after
+            start = next(
+                (i + 1 for i, (_, position) in enumerate(ranked) if str(self.documents[position].get("_id")) == last_id),
+                None
+            )
+            if start is None:
+                # The cursor's document no longer matches; resume below its score
+                start = next((i for i, (score, _) in enumerate(ranked) if score < last_score), len(ranked))
+        else:
+            start = offset
+        
+        page = [{**as_dict(self.documents[position]), "_score": score} for score, position in ranked[start:start + limit]]
+        return page, len(ranked)
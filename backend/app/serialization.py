@@ -0,0 +1,53 @@
+import orjson
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from app.models import RESPONSE_FIELDS
+
+# Stand-ins for fields older documents may lack, as the AttackPatternResponse conversion filled in
+FIELD_DEFAULTS: Dict[str, Any] = {"external_references": (), "created_at": "", "modified_at": ""}
+
+
+@lru_cache(maxsize=256)
+def compile_fields(fields: Optional[tuple[str, ...]]) -> tuple[tuple[str, Any], ...]:
+    """(field, default) pairs to copy for a projection; None selects every response field"""
+    return tuple((field, FIELD_DEFAULTS.get(field)) for field in (fields or RESPONSE_FIELDS))
+
+
+def response_dict(pattern: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Copy a stored pattern into its response shape without model validation
+    
+    Documents are validated against AttackPattern when they are ingested, so
+    validating them again on every read only repeats that work.
+    """
+    compiled = compile_fields(tuple(fields) if fields is not None else None)
+    return {field: pattern.get(field, default) for field, default in compiled}
+
+
+def search_response_content(
+    patterns: List[Dict[str, Any]],
+    total: Optional[int],
+    limit: int,
+    offset: int,
+    next_cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """SearchResponse-shaped content for a page of stored patterns"""
+    return {
+        "results": [response_dict(pattern, fields) for pattern in patterns],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor
+    }
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize response content to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default)
@@ -1,120 +1,297 @@
+import asyncio
+import base64
+import hashlib
 import httpx
 import json
 import logging
-from typing import List, Dict, Any
-from app.database import get_sync_database
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Deque, Iterator, Mapping, Optional
+import bson
+import ijson
+from bson import ObjectId
+from bson.errors import InvalidId
+from bson.raw_bson import RawBSONDocument
+from pymongo import DeleteMany, ReplaceOne
+from app.cache import MISSING, CacheBackend, ResponseCache, SingleFlight, TTLCache
+from app.database import (
+    bump_dataset_version, create_search_indexes_sync, get_dataset_metadata, get_materialized_stats, get_sync_database,
+    materialize_stats, stats_document, stats_pipeline
+)
 from app.models import AttackPattern
+from app.precompressed import clear_payloads, payload_flight_metrics
+from app.replica import ReadReplica
+from app.search_index import SearchIndex, as_dict
+from app.similarity import SIMILARITY_FIELDS, TECHNIQUE_GRAPH_METADATA_ID, SimilarityModel, materialize_technique_graph
+from app.sources import SourcePart, iter_local_objects, iter_local_parts, iter_part_objects
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # httpx only negotiates HTTP/2 when the optional h2 package is installed
+    HTTP2_AVAILABLE = False
+
+# Marks the end of a producer's output on a pipeline queue
+_END_OF_STREAM = object()
+
+# ID stix_to_attack_pattern gives techniques without a mitre-attack reference; such patterns are told apart by content
+UNIDENTIFIED_ID = "N/A"
+
+
+def stix_to_attack_pattern(obj: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Transform a STIX attack-pattern object, returning None for other object types"""
+    if obj.get("type") != "attack-pattern":
+        return None
+    
+    # Extract external ID from references
+    external_id = "N/A"
+    for ref in obj.get("external_references", []):
+        if ref.get("source_name") == "mitre-attack":
+            external_id = ref.get("external_id", "N/A")
+            break
+    
+    # Extract platforms
+    platforms = obj.get("x_mitre_platforms", [])
+    
+    # Extract kill chain phases
+    kill_chain_phases = []
+    for phase in obj.get("kill_chain_phases", []):
+        kill_chain_phases.append({
+            "phase_name": phase.get("phase_name", "N/A")
+        })
+    
+    return {
+        "id": external_id,
+        "name": obj.get("name", "N/A"),
+        "description": obj.get("description", "N/A"),
+        "x_mitre_platforms": platforms,
+        "x_mitre_detection": obj.get("x_mitre_detection", "N/A"),
+        "kill_chain_phases": kill_chain_phases,
+        "external_references": obj.get("external_references", []),
+        "created_at": obj.get("created", "N/A"),
+        "modified_at": obj.get("modified", "N/A"),
+        # Additional MITRE fields
+        "x_mitre_domains": obj.get("x_mitre_domains", []),
+        "x_mitre_data_sources": obj.get("x_mitre_data_sources", []),
+        "x_mitre_version": obj.get("x_mitre_version", "N/A"),
+        "x_mitre_is_subtechnique": obj.get("x_mitre_is_subtechnique", False),
+        "x_mitre_deprecated": obj.get("x_mitre_deprecated", False),
+        "x_mitre_attack_spec_version": obj.get("x_mitre_attack_spec_version", "N/A"),
+        "created": obj.get("created", "N/A"),
+        "modified": obj.get("modified", "N/A"),
+        "phase_name": kill_chain_phases[0]["phase_name"] if kill_chain_phases else "N/A"
+    }
+
+
+def compute_content_hash(document: Dict[str, Any]) -> str:
+    """Stable hash of a processed pattern, used to detect changes between ingestions"""
+    content = {key: value for key, value in document.items() if key not in ("_id", "content_hash")}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
 
 class MITREAttackService:
     """Service for fetching and processing MITRE ATT&CK data"""
     
     BASE_URL = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack"
+    INDEX_URL = "https://api.github.com/repos/mitre/cti/contents/enterprise-attack/attack-pattern"
+    
+    # HTTP status codes worth retrying (rate limiting and transient server errors)
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    INGEST_MODES = ("replace", "incremental", "swap")
+    
+    COLLECTION_NAME = "attack_patterns"
+    STAGING_COLLECTION_NAME = "attack_patterns_staging"
+    
+    # Maximum number of documents or operations sent in a single write
+    WRITE_CHUNK_SIZE = 1000
+    
+    # Maximum number of downloaded files buffered ahead of the transform stage
+    QUEUE_SIZE = 500
+    
+    # Bytes of source files or bundle ranges sent to a transform worker process at a time
+    SHARD_BYTES = 256 * 1024
+    
+    def __init__(
+        self,
+        index_url: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        timeout: float = 30.0,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        source_path: Optional[str] = None,
+        transform_workers: Optional[int] = None,
+        min_swap_fraction: Optional[float] = None
+    ):
+        self.index_url = index_url or os.getenv("MITRE_INDEX_URL", self.INDEX_URL)
+        self.concurrency = concurrency or int(os.getenv("MITRE_FETCH_CONCURRENCY", 16))
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+        self.source_path = source_path
+        self.transform_workers = transform_workers or int(os.getenv("MITRE_TRANSFORM_WORKERS", 1))
+        # A full refresh is refused when it would shrink the live collection below this fraction of its size
+        self.min_swap_fraction = (
+            min_swap_fraction if min_swap_fraction is not None else float(os.getenv("MITRE_MIN_SWAP_FRACTION", 0.9))
+        )
+        # Source files left out of the last object stream because they failed past their retries or did not parse
+        self.skipped_sources: List[str] = []
     
     async def fetch_attack_patterns(self) -> List[Dict[str, Any]]:
-        """Fetch attack patterns from MITRE ATT&CK repository"""
-        try:
-            # Get list of all attack pattern files
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api.github.com/repos/mitre/cti/contents/enterprise-attack/attack-pattern"
-                )
-                response.raise_for_status()
-                files = response.json()
-                
-                attack_patterns = []
-                total_files = len([f for f in files if f["name"].endswith(".json")])
-                processed_files = 0
-                
-                logger.info(f"Found {total_files} JSON files to process")
-                
-                # Process files in batches to manage memory
-                batch_size = 100
+        """Fetch attack patterns from MITRE ATT&CK repository or a local STIX source"""
+        attack_patterns = [pattern async for pattern in self.iter_attack_patterns()]
+        logger.info(f"Successfully fetched {len(attack_patterns)} attack patterns")
+        return attack_patterns
+    
+    async def iter_attack_patterns(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield attack patterns as they are downloaded or read, without buffering the dataset"""
+        async for obj in self.iter_stix_objects():
+            attack_pattern = stix_to_attack_pattern(obj)
+            if attack_pattern is not None:
+                yield attack_pattern
+    
+    async def iter_stix_objects(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield raw STIX objects from the configured local source or the MITRE repository
+        
+        Files that cannot be read are skipped and listed in ``skipped_sources``
+        once the stream ends; a stream with skipped files is incomplete.
+        """
+        self.skipped_sources = []
+        if self.source_path:
+            async for obj in self._iter_local_objects():
+                yield obj
+        else:
+            async for obj in self._iter_remote_objects():
+                yield obj
+    
+    async def _iter_remote_objects(self) -> AsyncIterator[Dict[str, Any]]:
+        """Download attack-pattern files, yielding their objects as files complete"""
+        async for name, content in self._iter_remote_files():
+            try:
+                objects = json.loads(content).get("objects", [])
+            except Exception as e:
+                logger.warning(f"Failed to process file {name}: {e}")
+                self.skipped_sources.append(name)
+                continue
+            for obj in objects:
+                yield obj
+    
+    async def _iter_remote_files(self) -> AsyncIterator[tuple[str, bytes]]:
+        """Download attack-pattern files with a bounded worker pool, yielding names and contents as files complete"""
+        # One pooled client is shared by all workers so connections are kept alive
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency
+        )
+        async with httpx.AsyncClient(limits=limits, http2=HTTP2_AVAILABLE, timeout=self.timeout) as client:
+            try:
+                # Get list of all attack pattern files
+                files = await self._get_json_with_retry(client, self.index_url)
                 json_files = [f for f in files if f["name"].endswith(".json")]
-                
-                for i in range(0, len(json_files), batch_size):
-                    batch = json_files[i:i + batch_size]
-                    logger.info(f"Processing batch {i//batch_size + 1}/{(len(json_files) + batch_size - 1)//batch_size} ({len(batch)} files)")
-                    
-                    for file_info in batch:
-                        if file_info["name"].endswith(".json"):
-                            try:
-                                file_response = await client.get(file_info["download_url"])
-                                file_response.raise_for_status()
-                                file_data = file_response.json()
-                                
-                                # Extract attack pattern from bundle
-                                if "objects" in file_data:
-                                    for obj in file_data["objects"]:
-                                        if obj.get("type") == "attack-pattern":
-                                            # Extract external ID from references
-                                            external_id = "N/A"
-                                            for ref in obj.get("external_references", []):
-                                                if ref.get("source_name") == "mitre-attack":
-                                                    external_id = ref.get("external_id", "N/A")
-                                                    break
-                                            
-                                            # Extract platforms
-                                            platforms = obj.get("x_mitre_platforms", [])
-                                            
-                                            # Extract kill chain phases
-                                            kill_chain_phases = []
-                                            for phase in obj.get("kill_chain_phases", []):
-                                                kill_chain_phases.append({
-                                                    "phase_name": phase.get("phase_name", "N/A")
-                                                })
-                                            
-                                            attack_pattern = {
-                                                "id": external_id,
-                                                "name": obj.get("name", "N/A"),
-                                                "description": obj.get("description", "N/A"),
-                                                "x_mitre_platforms": platforms,
-                                                "x_mitre_detection": obj.get("x_mitre_detection", "N/A"),
-                                                "kill_chain_phases": kill_chain_phases,
-                                                "external_references": obj.get("external_references", []),
-                                                "created_at": obj.get("created", "N/A"),
-                                                "modified_at": obj.get("modified", "N/A"),
-                                                # Additional MITRE fields
-                                                "x_mitre_domains": obj.get("x_mitre_domains", []),
-                                                "x_mitre_data_sources": obj.get("x_mitre_data_sources", []),
-                                                "x_mitre_version": obj.get("x_mitre_version", "N/A"),
-                                                "x_mitre_is_subtechnique": obj.get("x_mitre_is_subtechnique", False),
-                                                "x_mitre_deprecated": obj.get("x_mitre_deprecated", False),
-                                                "x_mitre_attack_spec_version": obj.get("x_mitre_attack_spec_version", "N/A"),
-                                                "created": obj.get("created", "N/A"),
-                                                "modified": obj.get("modified", "N/A"),
-                                                "phase_name": kill_chain_phases[0]["phase_name"] if kill_chain_phases else "N/A"
-                                            }
-                                            attack_patterns.append(attack_pattern)
-                            except Exception as e:
-                                logger.warning(f"Failed to process file {file_info['name']}: {e}")
-                                continue
-                            finally:
-                                processed_files += 1
-                                if processed_files % 50 == 0:  # Log every 50 files
-                                    logger.info(f"Processed {processed_files}/{total_files} files, found {len(attack_patterns)} attack patterns")
-                
-                logger.info(f"Successfully fetched {len(attack_patterns)} attack patterns")
-                return attack_patterns
-                
-        except Exception as e:
-            logger.error(f"Failed to fetch attack patterns: {e}")
-            # Fallback to sample data if API fails
-            return [
-                {
-                    "id": "T1001",
-                    "name": "Data Exfiltration",
-                    "description": "Adversaries may steal data from compromised systems",
-                    "x_mitre_platforms": ["Windows", "Linux"],
-                    "x_mitre_detection": "Monitor network traffic for unusual data transfers",
-                    "kill_chain_phases": [{"phase_name": "Exfiltration"}],
-                    "external_references": [{"external_id": "T1001"}],
-                    "created_at": "2020-01-01T00:00:00.000Z",
-                    "modified_at": "2020-01-01T00:00:00.000Z"
-                }
-            ]
+            except Exception as e:
+                # Without the index nothing is known about the dataset; never pass anything off as all of it
+                logger.error(f"Failed to fetch attack patterns: {e}")
+                raise
+            
+            total_files = len(json_files)
+            processed_files = 0
+            logger.info(f"Found {total_files} JSON files to process (concurrency={self.concurrency})")
+            
+            # Bounded so downloads pause instead of piling up when the consumer falls behind
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+            pending_files = iter(json_files)
+            
+            async def worker() -> None:
+                nonlocal processed_files
+                for file_info in pending_files:
+                    try:
+                        response = await self._get_with_retry(client, file_info["download_url"])
+                        await queue.put((file_info["name"], response.content))
+                    except Exception as e:
+                        logger.warning(f"Failed to process file {file_info['name']}: {e}")
+                        self.skipped_sources.append(file_info["name"])
+                    finally:
+                        processed_files += 1
+                        self._report_progress(processed_files, total_files)
+            
+            worker_errors: List[Exception] = []
+            
+            async def run_workers() -> None:
+                try:
+                    await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+                except Exception as e:
+                    worker_errors.append(e)
+                await queue.put(_END_OF_STREAM)
+            
+            producer = asyncio.create_task(run_workers())
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _END_OF_STREAM:
+                        break
+                    yield item
+                # A truncated stream must not look like a complete dataset
+                if worker_errors:
+                    raise worker_errors[0]
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+    
+    async def _get_json_with_retry(self, client: httpx.AsyncClient, url: str) -> Any:
+        """GET a JSON document, retrying transient failures with exponential backoff"""
+        response = await self._get_with_retry(client, url)
+        return response.json()
+    
+    async def _get_with_retry(self, client: httpx.AsyncClient, url: str) -> httpx.Response:
+        """GET a URL, retrying transient failures with exponential backoff"""
+        attempt = 0
+        while True:
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = (
+                    isinstance(e, httpx.TransportError)
+                    or e.response.status_code in self.RETRYABLE_STATUS_CODES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                logger.debug(f"Retrying {url} in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+    
+    async def _iter_local_objects(self) -> AsyncIterator[Dict[str, Any]]:
+        """Read STIX objects from a local bundle, directory or tarball without network access"""
+        logger.info(f"Reading STIX objects from {self.source_path}")
+        scanned_objects = 0
+        for obj in iter_local_objects(self.source_path, self.skipped_sources):
+            scanned_objects += 1
+            yield obj
+            if scanned_objects % self.QUEUE_SIZE == 0:
+                # Parsing is synchronous; let in-flight writes make progress
+                await asyncio.sleep(0)
+        
+        logger.info(f"Read {scanned_objects} STIX objects from {self.source_path}")
+    
+    def _report_progress(self, processed: int, total: int) -> None:
+        """Log fetch progress and notify the optional progress callback"""
+        if processed % 50 == 0 or processed == total:  # Log every 50 files
+            logger.info(f"Processed {processed}/{total} files")
+        if self.progress_callback:
+            self.progress_callback(processed, total)
     
     def process_attack_pattern(self, pattern: Dict[str, Any]) -> AttackPattern:
         """Process a single attack pattern from MITRE data"""
@@ -148,120 +325,1045 @@ class MITREAttackService:
                 kill_chain_phases=kill_chain_phases,
                 external_references=pattern.get("external_references", []),
                 created_at=pattern.get("created_at", "N/A"),
-                modified_at=pattern.get("modified_at", "N/A")
+                modified_at=pattern.get("modified_at", "N/A"),
+                x_mitre_domains=pattern.get("x_mitre_domains", []),
+                x_mitre_data_sources=pattern.get("x_mitre_data_sources", []),
+                x_mitre_version=pattern.get("x_mitre_version", "N/A"),
+                x_mitre_is_subtechnique=pattern.get("x_mitre_is_subtechnique", False),
+                x_mitre_deprecated=pattern.get("x_mitre_deprecated", False),
+                x_mitre_attack_spec_version=pattern.get("x_mitre_attack_spec_version", "N/A")
             )
         except Exception as e:
             logger.error(f"Failed to process attack pattern {pattern.get('id', 'unknown')}: {e}")
             raise
     
-    async def ingest_data(self) -> int:
-        """Ingest MITRE ATT&CK data into MongoDB"""
+    def prepare_document(self, pattern_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Process a raw pattern into a MongoDB document stamped with a content hash"""
         try:
-            # Fetch data from MITRE
-            patterns_data = await self.fetch_attack_patterns()
-            logger.info(f"Fetched {len(patterns_data)} attack patterns from MITRE")
+            document = self.process_attack_pattern(pattern_data).dict()
+        except Exception as e:
+            logger.warning(f"Skipping pattern due to processing error: {e}")
+            return None
+        document["content_hash"] = compute_content_hash(document)
+        return document
+    
+    async def iter_documents(self) -> AsyncIterator[Mapping[str, Any]]:
+        """Fetch and transform patterns (the fetch -> transform stages of ingestion)
+        
+        With more than one transform worker, the source is split into parts that
+        a process pool parses and transforms, and the results are merged back in
+        source order as RawBSONDocuments.
+        """
+        if self.transform_workers > 1:
+            async for document in self._iter_documents_parallel():
+                yield document
+            return
+        
+        async for pattern_data in self.iter_attack_patterns():
+            document = self.prepare_document(pattern_data)
+            if document is not None:
+                yield document
+    
+    async def _iter_documents_parallel(self) -> AsyncIterator[RawBSONDocument]:
+        """Parse and transform source parts on a process pool, keeping a bounded number in flight
+        
+        Workers open local files and bundle ranges themselves (only downloads and
+        tarball members are shipped to them, as bytes) and send documents back
+        BSON-encoded, so the parent neither parses JSON nor unpickles documents.
+        """
+        self.skipped_sources = []
+        loop = asyncio.get_running_loop()
+        in_flight: Deque[tuple[List[SourcePart], asyncio.Future]] = deque()
+        max_in_flight = self.transform_workers * 2
+        pool = ProcessPoolExecutor(max_workers=self.transform_workers)
+        # STIX objects read so far from the ranges of a single bundle
+        bundle_objects = 0
+        
+        async def finish_oldest() -> tuple[List[bytes], bool]:
+            nonlocal bundle_objects
+            job, future = in_flight.popleft()
+            try:
+                encoded, scanned, skipped = await future
+            except ijson.JSONError:
+                if job[0].kind != "range":
+                    raise
+                # A range boundary fell inside an object: parse the rest of the bundle as one part
+                logger.warning(f"Could not split {job[0].name} at byte {job[0].start}; reading the rest in one part")
+                for _job, later in in_flight:
+                    later.cancel()
+                in_flight.clear()
+                rest = job[0]._replace(kind="bundle", skip=bundle_objects)
+                encoded, _scanned, _skipped = await loop.run_in_executor(pool, build_part_documents, [rest])
+                return encoded, True
+            bundle_objects += scanned if job[0].kind == "range" else 0
+            self.skipped_sources.extend(skipped)
+            return encoded, False
+        
+        jobs = self._iter_transform_jobs()
+        try:
+            async for job in jobs:
+                in_flight.append((job, loop.run_in_executor(pool, build_part_documents, job)))
+                if len(in_flight) < max_in_flight:
+                    continue
+                encoded, finished = await finish_oldest()
+                for raw in encoded:
+                    yield RawBSONDocument(raw)
+                if finished:
+                    return
+            while in_flight:
+                encoded, _finished = await finish_oldest()
+                for raw in encoded:
+                    yield RawBSONDocument(raw)
+        finally:
+            await jobs.aclose()
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    async def _iter_transform_jobs(self) -> AsyncIterator[List[SourcePart]]:
+        """Group source parts into jobs of about SHARD_BYTES; each bundle range is a job of its own"""
+        if self.source_path:
+            logger.info(f"Reading STIX objects from {self.source_path}")
+            parts = iter_local_parts(self.source_path, self.SHARD_BYTES)
+        else:
+            parts = None
+        
+        job: List[SourcePart] = []
+        job_bytes = 0
+        async for part in self._iter_parts(parts):
+            if part.kind == "range":
+                yield [part]
+                continue
+            job.append(part)
+            job_bytes += part.size
+            if job_bytes >= self.SHARD_BYTES:
+                yield job
+                job, job_bytes = [], 0
+        if job:
+            yield job
+    
+    async def _iter_parts(self, local_parts: Optional[Iterator[SourcePart]]) -> AsyncIterator[SourcePart]:
+        """Source parts from a local iterator or, without one, from downloads"""
+        if local_parts is None:
+            async for name, content in self._iter_remote_files():
+                yield SourcePart("bytes", name, len(content), data=content)
+            return
+        for part in local_parts:
+            yield part
+            # Reading tarball members is synchronous; let in-flight writes make progress
+            await asyncio.sleep(0)
+    
+    async def write_in_chunks(
+        self,
+        items: AsyncIterator[Any],
+        write_chunk: Callable[[List[Any]], Any]
+    ) -> int:
+        """Drain items into fixed-size chunks written on a worker thread
+        
+        At most one chunk is being written while the next one is filled, so
+        writes overlap with downloads and memory stays bounded by two chunks.
+        Returns the number of items written.
+        """
+        written = 0
+        chunk: List[Any] = []
+        pending: Optional[asyncio.Future] = None
+        
+        async def flush() -> None:
+            nonlocal pending, chunk
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(asyncio.to_thread(write_chunk, chunk))
+            chunk = []
+        
+        try:
+            async for item in items:
+                chunk.append(item)
+                written += 1
+                if len(chunk) >= self.WRITE_CHUNK_SIZE:
+                    await flush()
+            if chunk:
+                await flush()
+            if pending is not None:
+                await pending
+        except BaseException:
+            if pending is not None:
+                await asyncio.gather(pending, return_exceptions=True)
+            raise
+        
+        return written
+    
+    async def sync_patterns(self, collection, documents: AsyncIterator[Mapping[str, Any]]) -> Dict[str, int]:
+        """Write only the added, changed and removed patterns, returning per-kind counts
+        
+        Patterns are matched by ATT&CK ID, or by content hash when they have
+        none. Stored patterns are only removed when ``documents`` came from a
+        complete object stream (no skipped source files).
+        """
+        stored = await asyncio.to_thread(lambda: {
+            sync_key(stored_doc): stored_doc.get("content_hash")
+            for stored_doc in collection.find({}, {"_id": 0, "id": 1, "content_hash": 1})
+        })
+        
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        
+        async def operations() -> AsyncIterator[Any]:
+            async for document in documents:
+                key = sync_key(document)
+                if key in seen:
+                    # Later duplicates of an ID win, matching what a full reload would serve first
+                    yield ReplaceOne(sync_filter(key), document, upsert=True)
+                    continue
+                seen.add(key)
+                if key not in stored:
+                    counts["added"] += 1
+                elif stored[key] != document["content_hash"]:
+                    counts["changed"] += 1
+                else:
+                    counts["unchanged"] += 1
+                    continue
+                yield ReplaceOne(sync_filter(key), document, upsert=True)
+        
+        # Unordered batches let the server apply independent writes in parallel
+        await self.write_in_chunks(operations(), lambda ops: collection.bulk_write(ops, ordered=False))
+        
+        if not seen:
+            logger.warning("No patterns were processed successfully; keeping stored patterns")
+            return counts
+        if self.skipped_sources:
+            # A pattern missing from an incomplete stream may only be in a file that failed
+            logger.warning(
+                f"Skipped {len(self.skipped_sources)} source files; keeping stored patterns that were not fetched"
+            )
+            return counts
+        
+        removed = [key for key in stored if key not in seen]
+        counts["removed"] = len(removed)
+        removed_ids = [pattern_id for pattern_id, _ in removed if pattern_id != UNIDENTIFIED_ID]
+        removed_hashes = [content_hash for pattern_id, content_hash in removed if pattern_id == UNIDENTIFIED_ID]
+        deletions = [
+            DeleteMany({"id": {"$in": removed_ids[i:i + self.WRITE_CHUNK_SIZE]}})
+            for i in range(0, len(removed_ids), self.WRITE_CHUNK_SIZE)
+        ] + [
+            DeleteMany({"id": UNIDENTIFIED_ID, "content_hash": {"$in": removed_hashes[i:i + self.WRITE_CHUNK_SIZE]}})
+            for i in range(0, len(removed_hashes), self.WRITE_CHUNK_SIZE)
+        ]
+        if deletions:
+            await asyncio.to_thread(collection.bulk_write, deletions, ordered=False)
+        
+        return counts
+    
+    async def swap_in_patterns(self, db, documents: AsyncIterator[Mapping[str, Any]]) -> int:
+        """Load documents into a fully indexed staging collection, then rename it over the live one
+        
+        The swap is refused, leaving the live collection as it was, when the
+        object stream skipped source files or the staged patterns number fewer
+        than ``min_swap_fraction`` of the live ones.
+        """
+        staging = db[self.STAGING_COLLECTION_NAME]
+        live = db[self.COLLECTION_NAME]
+        
+        # Leftovers from an interrupted refresh must not leak into this one
+        await asyncio.to_thread(staging.drop)
+        try:
+            written = await self.write_in_chunks(
+                documents, lambda chunk: staging.insert_many(chunk, ordered=False)
+            )
+            if not written:
+                logger.warning("No patterns were processed successfully; keeping live collection")
+                await asyncio.to_thread(staging.drop)
+                return 0
+            if self.skipped_sources:
+                raise RuntimeError(
+                    f"Skipped {len(self.skipped_sources)} source files; refusing to replace the live collection"
+                )
             
-            # Get database connection
-            db = get_sync_database()
-            collection = db.attack_patterns
+            await asyncio.to_thread(create_search_indexes_sync, staging)
             
-            # Clear existing data
-            collection.delete_many({})
-            logger.info("Cleared existing attack patterns")
+            staged_count = await asyncio.to_thread(staging.count_documents, {})
+            if staged_count != written:
+                raise RuntimeError(
+                    f"Staging collection holds {staged_count} patterns, expected {written}"
+                )
+            live_count = await asyncio.to_thread(live.count_documents, {})
+            if staged_count < live_count * self.min_swap_fraction:
+                raise RuntimeError(
+                    f"Staging collection holds {staged_count} patterns, fewer than {self.min_swap_fraction:.0%} "
+                    f"of the {live_count} live ones; refusing to replace the live collection"
+                )
             
-            # Process and insert data
-            processed_patterns = []
-            for pattern_data in patterns_data:
-                try:
-                    processed_pattern = self.process_attack_pattern(pattern_data)
-                    processed_patterns.append(processed_pattern.dict())
-                except Exception as e:
-                    logger.warning(f"Skipping pattern due to processing error: {e}")
-                    continue
+            # renameCollection with dropTarget replaces the live collection atomically
+            await asyncio.to_thread(staging.rename, self.COLLECTION_NAME, dropTarget=True)
+        except Exception:
+            await asyncio.to_thread(staging.drop)
+            raise
+        
+        logger.info(f"Swapped in {staged_count} attack patterns")
+        return staged_count
+    
+    async def ingest_data(self, mode: str = "replace") -> int:
+        """Ingest MITRE ATT&CK data into MongoDB
+        
+        ``replace`` and ``swap`` build a staging collection and atomically
+        rename it over the live one, so a fetch that fails part way, skips
+        files or comes back much smaller than the live data leaves the
+        previous data in place; ``incremental`` only writes the patterns that
+        changed since the previous ingestion. Patterns are streamed from fetch
+        through transform to chunked writes.
+        """
+        if mode not in self.INGEST_MODES:
+            raise ValueError(f"Unknown ingestion mode {mode!r}, expected one of {', '.join(self.INGEST_MODES)}")
+        
+        try:
+            # Get database connection
+            db = get_sync_database()
+            collection = db[self.COLLECTION_NAME]
+            documents = self.iter_documents()
             
-            # Insert all patterns
-            if processed_patterns:
-                result = collection.insert_many(processed_patterns)
-                logger.info(f"Inserted {len(result.inserted_ids)} attack patterns")
-                return len(result.inserted_ids)
+            if mode == "incremental":
+                counts = await self.sync_patterns(collection, documents)
+                logger.info(
+                    f"Synced attack patterns: {counts['added']} added, {counts['changed']} changed, "
+                    f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+                )
+                changed = counts["added"] + counts["changed"] + counts["removed"]
+                count = counts["added"] + counts["changed"] + counts["unchanged"]
             else:
-                logger.warning("No patterns were processed successfully")
-                return 0
+                # Clearing the live collection before the stream has finished would lose data if it failed
+                count = changed = await self.swap_in_patterns(db, documents)
+            
+            if changed:
+                # Lets API processes drop counts and other data cached for the old version
+                version = await asyncio.to_thread(bump_dataset_version, db)
+                # Recomputed once per data change so /stats is a single point read
+                await asyncio.to_thread(materialize_stats, db, version)
+                # Neighbors are scored once here instead of on every graph request
+                await asyncio.to_thread(materialize_technique_graph, db, version)
+                invalidate_read_caches()
+            return count
                 
         except Exception as e:
             logger.error(f"Failed to ingest data: {e}")
             raise
 
 
+def sync_key(document: Mapping[str, Any]) -> tuple[str, Optional[str]]:
+    """Identity of a pattern across ingestions: its ATT&CK ID, or its content hash when it has none"""
+    pattern_id = document["id"]
+    return pattern_id, document.get("content_hash") if pattern_id == UNIDENTIFIED_ID else None
+
+
+def sync_filter(key: tuple[str, Optional[str]]) -> Dict[str, Any]:
+    """Filter matching the stored pattern with a sync_key"""
+    pattern_id, content_hash = key
+    if pattern_id != UNIDENTIFIED_ID:
+        return {"id": pattern_id}
+    return {"id": pattern_id, "content_hash": content_hash}
+
+
+def build_documents(objects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Transform a shard of raw STIX objects into MongoDB documents (runs in transform worker processes)"""
+    service = MITREAttackService()
+    documents = []
+    for obj in objects:
+        attack_pattern = stix_to_attack_pattern(obj)
+        if attack_pattern is None:
+            continue
+        document = service.prepare_document(attack_pattern)
+        if document is not None:
+            documents.append(document)
+    return documents
+
+
+def build_part_documents(parts: List[SourcePart]) -> tuple[List[bytes], int, List[str]]:
+    """Parse and transform source parts into BSON-encoded MongoDB documents (runs in transform worker processes)
+    
+    Returns the encoded documents, the number of STIX objects read and the
+    names of files skipped because they did not parse.
+    """
+    encoded: List[bytes] = []
+    scanned = 0
+    skipped: List[str] = []
+    for part in parts:
+        try:
+            objects = list(iter_part_objects(part))
+        except (ijson.JSONError, OSError) as e:
+            if part.kind in ("range", "bundle"):
+                raise
+            logger.warning(f"Failed to process file {part.name}: {e}")
+            skipped.append(part.name)
+            continue
+        scanned += len(objects)
+        encoded.extend(bson.encode(document) for document in build_documents(objects))
+    return encoded, scanned, skipped
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+# Cached totals for filtered queries, keyed by dataset version and normalized filter
+_count_cache = TTLCache(ttl=float(os.getenv("COUNT_CACHE_TTL", 300)), max_entries=4096)
+
+# How long a dataset version read is trusted before MongoDB is asked again
+_version_cache = TTLCache(ttl=float(os.getenv("DATASET_VERSION_CHECK_INTERVAL", 5)), max_entries=1)
+
+
+# Serve non-empty searches from an in-process inverted index instead of MongoDB text/regex queries
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+
+# The search index for the latest dataset version this process has seen, keyed by that version
+_search_indexes = TTLCache(ttl=float("inf"), max_entries=1)
+_search_index_lock = asyncio.Lock()
+
+# The similarity model for the latest dataset version this process has seen, keyed by that version
+_similarity_models = TTLCache(ttl=float("inf"), max_entries=1)
+_similarity_model_lock = asyncio.Lock()
+
+# Statistics for the latest dataset version this process has seen, keyed by that version
+_stats_cache = TTLCache(ttl=float("inf"), max_entries=1)
+
+# Filtered statistics, keyed by dataset version and normalized filter
+_stats_breakdown_cache = TTLCache(ttl=float(os.getenv("COUNT_CACHE_TTL", 300)), max_entries=1024)
+
+# Loads in flight, so concurrent identical reads share one MongoDB query and one result
+_flights = SingleFlight()
+
+# Read-through cache of service results, keyed by dataset version, operation and normalized arguments
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+_response_cache = ResponseCache(
+    TTLCache(ttl=float("inf"), max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))), _flights
+)
+
+
+def set_response_cache_backend(backend: CacheBackend) -> None:
+    """Store cached service results in ``backend`` instead of the in-process LRU"""
+    _response_cache.backend = backend
+
+
+def response_cache_metrics() -> Dict[str, Any]:
+    """Hit/miss counts and fill level of the response cache"""
+    return {"enabled": RESPONSE_CACHE_ENABLED, **_response_cache.metrics()}
+
+
+def coalescing_metrics() -> Dict[str, Any]:
+    """How many reads ran and how many joined an identical read already in flight, overall and per operation"""
+    services, payloads = _flights.metrics(), payload_flight_metrics()
+    return {
+        **{name: services[name] + payloads[name] for name in ("in_flight", "executed", "coalesced")},
+        "operations": {**services["operations"], **payloads["operations"]}
+    }
+
+
+# Serve list, get, search and statistics reads from an in-memory copy of the collection
+READ_REPLICA_ENABLED = os.getenv("READ_REPLICA_ENABLED", "false").lower() == "true"
+
+# The read replica for the latest dataset version this process has seen, keyed by that version
+_replicas = TTLCache(ttl=float("inf"), max_entries=1)
+
+# Statistics breakdown filters and the document fields they match
+STATS_FILTER_FIELDS = {
+    "phase": "kill_chain_phases.phase_name",
+    "platform": "x_mitre_platforms",
+    "domain": "x_mitre_domains",
+    "data_source": "x_mitre_data_sources",
+    "subtechnique": "x_mitre_is_subtechnique",
+    "deprecated": "x_mitre_deprecated",
+}
+
+
+def invalidate_read_caches() -> None:
+    """Forget cached counts, statistics, responses and payloads, the dataset version and every in-memory model of the data"""
+    _count_cache.clear()
+    _response_cache.clear()
+    clear_payloads()
+    _version_cache.clear()
+    _search_indexes.clear()
+    _similarity_models.clear()
+    _replicas.clear()
+    _stats_cache.clear()
+    _stats_breakdown_cache.clear()
+
+
+def normalize_filter(search_filter: Dict[str, Any]) -> str:
+    """Canonical form of a MongoDB filter, used as a cache key"""
+    return json.dumps(search_filter, sort_keys=True, default=str)
+
+
+def encode_cursor(last_id: ObjectId, score: Optional[float] = None) -> str:
+    """Encode the sort key of the last pattern on a page as an opaque pagination cursor
+    
+    Text search pages are ordered by relevance, so their cursors also carry the text score.
+    """
+    raw = last_id.binary if score is None else last_id.binary + struct.pack(">d", score)
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[ObjectId, Optional[float]]:
+    """Decode a pagination cursor produced by encode_cursor into (_id, text score or None)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        if len(raw) == 12:
+            return ObjectId(raw), None
+        if len(raw) == 20:
+            return ObjectId(raw[:12]), struct.unpack(">d", raw[12:])[0]
+    except (InvalidId, ValueError, TypeError):
+        pass
+    raise InvalidCursorError(f"Invalid pagination cursor {cursor!r}")
+
+
+def next_page_cursor(patterns: List[Dict], limit: int) -> Optional[str]:
+    """Cursor for the page after ``patterns``, or None when it was the last page"""
+    if len(patterns) < limit or not patterns:
+        return None
+    return encode_cursor(patterns[-1]["_id"], patterns[-1].get("_score"))
+
+
+def projection_for(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """MongoDB projection returning only ``fields`` (plus _id, which cursors need), or None for whole documents"""
+    if fields is None:
+        return None
+    return {field: 1 for field in fields}
+
+
+def project_document(document: Mapping[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Apply projection_for(fields) to an in-memory document or replica record, always returning a dict"""
+    if fields is None:
+        return as_dict(document)
+    return {key: value for key, value in as_dict(document).items() if key in fields or key in ("_id", "_score")}
+
+
+def normalize_pattern_id(pattern_id: str) -> str:
+    """Canonical technique ID: trimmed and upper-case, with sub-technique URL paths (T1055/001) dotted"""
+    return pattern_id.strip().upper().replace("/", ".")
+
+
+def stats_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """MongoDB filter for statistics breakdown filters; several values for one filter match any of them"""
+    search_filter: Dict[str, Any] = {}
+    for name, value in filters.items():
+        if value is None or value == []:
+            continue
+        if name not in STATS_FILTER_FIELDS:
+            raise ValueError(f"Unknown statistics filter {name!r}")
+        if isinstance(value, list):
+            value = value[0] if len(value) == 1 else {"$in": value}
+        search_filter[STATS_FILTER_FIELDS[name]] = value
+    return search_filter
+
+
+def regex_search_filter(query: str) -> Dict[str, Any]:
+    """Case-insensitive regex filter across all searchable fields"""
+    return {
+        "$or": [
+            {"name": {"$regex": query, "$options": "i"}},
+            {"description": {"$regex": query, "$options": "i"}},
+            {"x_mitre_platforms": {"$regex": query, "$options": "i"}},
+            {"x_mitre_detection": {"$regex": query, "$options": "i"}},
+            {"phase_name": {"$regex": query, "$options": "i"}},
+            {"external_id": {"$regex": query, "$options": "i"}},
+            {"kill_chain_phases.phase_name": {"$regex": query, "$options": "i"}},
+            {"external_references.source_name": {"$regex": query, "$options": "i"}},
+            {"external_references.external_id": {"$regex": query, "$options": "i"}},
+            # Additional MITRE fields
+            {"x_mitre_domains": {"$regex": query, "$options": "i"}},
+            {"x_mitre_data_sources": {"$regex": query, "$options": "i"}},
+            {"x_mitre_version": {"$regex": query, "$options": "i"}},
+            {"x_mitre_attack_spec_version": {"$regex": query, "$options": "i"}}
+        ]
+    }
+
+
 class AttackPatternService:
     """Service for querying attack patterns"""
     
+    # Documents fetched per round trip when streaming every pattern
+    STREAM_BATCH_SIZE = 500
+    
     def __init__(self, database):
         self.database = database
         self.collection = database.attack_patterns
+        # Milliseconds spent per stage of the last call, surfaced as a Server-Timing header
+        self.timings: Dict[str, float] = {}
     
-    async def get_all_patterns(self, limit: int = 10, offset: int = 0) -> tuple[List[Dict], int]:
-        """Get all attack patterns with pagination"""
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        """Record how long the enclosed block takes under ``stage``"""
+        start = time.perf_counter()
         try:
-            cursor = self.collection.find().skip(offset).limit(limit)
-            patterns = await cursor.to_list(length=limit)
-            total = await self.collection.count_documents({})
+            yield
+        finally:
+            self.timings[stage] = (time.perf_counter() - start) * 1000
+    
+    async def _find_page(
+        self,
+        search_filter: Dict[str, Any],
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Fetch one page ordered by _id, by keyset cursor when given, otherwise by offset"""
+        projection = projection_for(fields)
+        if cursor:
+            # Seeking on the _id index costs the same at any depth, unlike skip()
+            last_id, _ = decode_cursor(cursor)
+            page_filter = {**search_filter, "_id": {"$gt": last_id}}
+            find_cursor = self.collection.find(page_filter, projection).sort("_id", 1).limit(limit)
+        else:
+            find_cursor = self.collection.find(search_filter, projection).sort("_id", 1).skip(offset).limit(limit)
+        return await find_cursor.to_list(length=limit)
+    
+    async def get_data_stamp(self) -> Dict[str, Any]:
+        """Dataset version and the time of the ingestion that set it, re-read from MongoDB at most once per check interval"""
+        stamp = _version_cache.get("stamp")
+        if stamp is MISSING:
+            stamp, _ = await _flights.do("get_data_stamp", None, self._load_data_stamp)
+        return stamp
+    
+    async def _load_data_stamp(self) -> Dict[str, Any]:
+        stamp = await get_dataset_metadata(self.database)
+        _version_cache.set("stamp", stamp)
+        return stamp
+    
+    async def get_data_version(self) -> int:
+        """Dataset version, re-read from MongoDB at most once per check interval"""
+        return (await self.get_data_stamp())["version"]
+    
+    async def get_search_index(self) -> Optional[SearchIndex]:
+        """In-memory search index for the current dataset version, rebuilt on first use after an ingestion"""
+        version = await self.get_data_version()
+        index = _search_indexes.get(version)
+        if index is MISSING:
+            async with _search_index_lock:
+                # Another request may have built it while this one waited
+                index = _search_indexes.get(version)
+                if index is MISSING:
+                    index = await self.build_search_index(version)
+                    _search_indexes.set(version, index)
+        return index
+    
+    async def build_search_index(self, version: int) -> SearchIndex:
+        """Load every pattern and index it off the event loop"""
+        start = time.perf_counter()
+        documents = await self.collection.find({}).sort("_id", 1).to_list(length=None)
+        index = await asyncio.to_thread(SearchIndex, documents, version)
+        logger.info(
+            f"Built search index over {len(index)} patterns for dataset version {version} "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return index
+    
+    async def _available_search_index(self) -> Optional[SearchIndex]:
+        """The search index, or None when searching it is disabled or it cannot be built (MongoDB is queried instead)"""
+        if not SEARCH_INDEX_ENABLED:
+            return None
+        try:
+            return await self.get_search_index()
+        except Exception as e:
+            logger.warning(f"Search index unavailable, falling back to MongoDB queries: {e}")
+            return None
+    
+    async def get_similarity_model(self) -> SimilarityModel:
+        """In-memory similarity model for the current dataset version, rebuilt on first use after an ingestion"""
+        version = await self.get_data_version()
+        model = _similarity_models.get(version)
+        if model is MISSING:
+            async with _similarity_model_lock:
+                model = _similarity_models.get(version)
+                if model is MISSING:
+                    start = time.perf_counter()
+                    documents = await self.collection.find({}, SIMILARITY_FIELDS).sort("_id", 1).to_list(length=None)
+                    model = await asyncio.to_thread(SimilarityModel, documents, version)
+                    logger.info(
+                        f"Built similarity model over {len(model)} patterns for dataset version {version} "
+                        f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+                    )
+                    _similarity_models.set(version, model)
+        return model
+    
+    async def warm_up(self) -> None:
+        """Build the in-memory search index and similarity model for the current dataset version now rather than on first use"""
+        await self._available_search_index()
+        await self.get_similarity_model()
+    
+    async def count_patterns(self, search_filter: Optional[Dict[str, Any]] = None) -> int:
+        """Count matching patterns, from collection metadata or the count cache where possible"""
+        if not search_filter:
+            # Unfiltered totals come from collection metadata instead of a scan
+            return await self.collection.estimated_document_count()
+        
+        key = (await self.get_data_version(), normalize_filter(search_filter))
+        total = _count_cache.get(key)
+        if total is MISSING:
+            total = await self.collection.count_documents(search_filter)
+            _count_cache.set(key, total)
+        return total
+    
+    async def _has_matches(self, search_filter: Dict[str, Any]) -> bool:
+        """Whether any pattern matches, without counting all of them"""
+        total = _count_cache.get((await self.get_data_version(), normalize_filter(search_filter)))
+        if total is not MISSING:
+            return total > 0
+        return await self.collection.find_one(search_filter, {"_id": 1}) is not None
+    
+    async def _resolve_search_filter(self, query: str) -> Dict[str, Any]:
+        """Build the filter for a search query: text search when it matches, regex otherwise"""
+        # If query is empty, match all patterns
+        if not query or not query.strip():
+            return {}
+        
+        # Try full-text search first (faster for longer queries)
+        if len(query.strip()) > 2:
+            try:
+                text_search_filter = {"$text": {"$search": query}}
+                # Decided for the whole result set, so paging past the last text match doesn't switch to regex
+                if await self._has_matches(text_search_filter):
+                    return text_search_filter
+            except Exception:
+                # Fall back to regex search if text search fails
+                pass
+        
+        # Fallback to case-insensitive regex search across multiple fields
+        return regex_search_filter(query)
+    
+    async def _search_page(
+        self,
+        search_filter: Dict[str, Any],
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        include_total: bool,
+        text: bool,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], int]:
+        """Fetch a page and its total in one aggregation round trip
+        
+        When the total is not wanted and not cached, only whether anything
+        matches is computed, so the returned total is then 0 or 1.
+        """
+        cache_key = (await self.get_data_version(), normalize_filter(search_filter))
+        cached_total = _count_cache.get(cache_key)
+        
+        pipeline: List[Dict[str, Any]] = [{"$match": search_filter}]
+        if text:
+            pipeline.append({"$addFields": {"_score": {"$meta": "textScore"}}})
+            pipeline.append({"$sort": {"_score": -1, "_id": 1}})
+        else:
+            pipeline.append({"$sort": {"_id": 1}})
+        
+        results: List[Dict[str, Any]] = []
+        if cursor:
+            last_id, last_score = decode_cursor(cursor)
+            if text and last_score is not None:
+                results.append({"$match": {"$or": [
+                    {"_score": {"$lt": last_score}},
+                    {"_score": last_score, "_id": {"$gt": last_id}}
+                ]}})
+            else:
+                results.append({"$match": {"_id": {"$gt": last_id}}})
+        else:
+            results.append({"$skip": offset})
+        results.append({"$limit": limit})
+        if fields is not None:
+            results.append({"$project": {**projection_for(fields), "_score": 1} if text else projection_for(fields)})
+        
+        facets: Dict[str, Any] = {"results": results}
+        if cached_total is MISSING:
+            facets["total"] = [{"$count": "count"}] if include_total else [{"$limit": 1}, {"$count": "count"}]
+        pipeline.append({"$facet": facets})
+        
+        output = await self.collection.aggregate(pipeline).to_list(length=1)
+        facet = output[0] if output else {}
+        patterns = facet.get("results", [])
+        if cached_total is not MISSING:
+            return patterns, cached_total
+        
+        counted = facet["total"][0]["count"] if facet.get("total") else 0
+        if include_total:
+            _count_cache.set(cache_key, counted)
+        return patterns, counted
+    
+    async def get_all_patterns(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], Optional[int]]:
+        """Get all attack patterns with offset or cursor pagination, optionally projected to ``fields``"""
+        try:
+            patterns = await self._find_page({}, limit, offset, cursor, fields)
+            total = await self.count_patterns() if include_total else None
             return patterns, total
         except Exception as e:
             logger.error(f"Failed to get attack patterns: {e}")
             raise
     
-    async def search_patterns(self, query: str, limit: int = 10, offset: int = 0) -> tuple[List[Dict], int]:
-        """Search attack patterns across all fields (case-insensitive)"""
+    async def iter_patterns(self, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """Stream every pattern in _id order without holding them all in memory"""
+        try:
+            find_cursor = self.collection.find({}, projection_for(fields)).sort("_id", 1).batch_size(self.STREAM_BATCH_SIZE)
+            async for pattern in find_cursor:
+                yield pattern
+        except Exception as e:
+            logger.error(f"Failed to stream attack patterns: {e}")
+            raise
+    
+    async def search_patterns(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], Optional[int]]:
+        """Search attack patterns across all fields (case-insensitive), optionally projected to ``fields``
+        
+        Served from the in-memory search index when available. Otherwise each
+        attempt is a single aggregation returning the page and its total; a
+        second one is only needed when text search finds nothing.
+        """
+        self.timings = {}
         try:
             # If query is empty, return all patterns
             if not query or not query.strip():
-                cursor = self.collection.find().skip(offset).limit(limit)
-                patterns = await cursor.to_list(length=limit)
-                total = await self.collection.count_documents({})
-                return patterns, total
+                with self._timed("list"):
+                    return await self.get_all_patterns(limit, offset, cursor, include_total, fields)
+            
+            index = await self._available_search_index()
+            if index is not None:
+                with self._timed("index_search"):
+                    after = None
+                    if cursor:
+                        last_id, last_score = decode_cursor(cursor)
+                        after = (float("inf") if last_score is None else last_score, str(last_id))
+                    patterns, total = index.search(query, limit, offset, after)
+                    patterns = [project_document(pattern, fields) for pattern in patterns]
+                return patterns, total if include_total else None
             
-            # Try full-text search first (faster for longer queries)
+            # Try full-text search first (faster for longer queries), ranked by text score
             if len(query.strip()) > 2:
                 try:
-                    text_search_filter = {"$text": {"$search": query}}
-                    cursor = self.collection.find(text_search_filter).skip(offset).limit(limit)
-                    patterns = await cursor.to_list(length=limit)
-                    total = await self.collection.count_documents(text_search_filter)
-                    if patterns:  # If we found results with text search, return them
-                        return patterns, total
+                    with self._timed("text_search"):
+                        patterns, total = await self._search_page(
+                            {"$text": {"$search": query}}, limit, offset, cursor, include_total, text=True, fields=fields
+                        )
+                    if total:  # If we found results with text search, return them
+                        return patterns, total if include_total else None
                 except Exception:
                     # Fall back to regex search if text search fails
                     pass
             
             # Fallback to case-insensitive regex search across multiple fields
-            search_filter = {
-                "$or": [
-                    {"name": {"$regex": query, "$options": "i"}},
-                    {"description": {"$regex": query, "$options": "i"}},
-                    {"x_mitre_platforms": {"$regex": query, "$options": "i"}},
-                    {"x_mitre_detection": {"$regex": query, "$options": "i"}},
-                    {"phase_name": {"$regex": query, "$options": "i"}},
-                    {"external_id": {"$regex": query, "$options": "i"}},
-                    {"kill_chain_phases.phase_name": {"$regex": query, "$options": "i"}},
-                    {"external_references.source_name": {"$regex": query, "$options": "i"}},
-                    {"external_references.external_id": {"$regex": query, "$options": "i"}},
-                    # Additional MITRE fields
-                    {"x_mitre_domains": {"$regex": query, "$options": "i"}},
-                    {"x_mitre_data_sources": {"$regex": query, "$options": "i"}},
-                    {"x_mitre_version": {"$regex": query, "$options": "i"}},
-                    {"x_mitre_attack_spec_version": {"$regex": query, "$options": "i"}}
-                ]
-            }
-            
-            cursor = self.collection.find(search_filter).skip(offset).limit(limit)
-            patterns = await cursor.to_list(length=limit)
-            total = await self.collection.count_documents(search_filter)
-            return patterns, total
+            with self._timed("regex_search"):
+                patterns, total = await self._search_page(
+                    regex_search_filter(query), limit, offset, cursor, include_total, text=False, fields=fields
+                )
+            return patterns, total if include_total else None
         except Exception as e:
             logger.error(f"Failed to search attack patterns: {e}")
             raise
     
+    async def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Typeahead suggestions for technique names and IDs, platforms and phases starting with ``prefix``"""
+        try:
+            index = await self.get_search_index()
+            return [
+                {"kind": kind, "value": value, "external_id": external_id}
+                for kind, value, external_id in index.suggestions.suggest(prefix, limit)
+            ]
+        except Exception as e:
+            logger.error(f"Failed to suggest attack patterns for {prefix!r}: {e}")
+            raise
+    
+    async def count_search_results(self, query: str) -> int:
+        """Total number of results for a search query, for clients that fetch totals lazily"""
+        try:
+            index = await self._available_search_index()
+            if index is not None and query and query.strip():
+                return index.count(query)
+            return await self.count_patterns(await self._resolve_search_filter(query))
+        except Exception as e:
+            logger.error(f"Failed to count search results: {e}")
+            raise
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Statistics for the current dataset version, read from the document materialized at ingestion
+        
+        They are only aggregated here when that document is missing or older
+        than the data, and then only once per dataset version.
+        """
+        try:
+            version = await self.get_data_version()
+            stats = _stats_cache.get(version)
+            if stats is MISSING:
+                stats, _ = await _flights.do("get_stats", version, partial(self._load_stats, version))
+            return stats
+        except Exception as e:
+            logger.error(f"Failed to get stats: {e}")
+            raise
+    
+    async def _load_stats(self, version: int) -> Dict[str, Any]:
+        stats = await get_materialized_stats(self.database)
+        if stats is None or stats.get("version") != version:
+            logger.info(f"No statistics materialized for dataset version {version}, aggregating them")
+            facets = await self.collection.aggregate(stats_pipeline()).to_list(length=1)
+            stats = stats_document(facets[0] if facets else {}, version)
+        stats.pop("_id", None)
+        _stats_cache.set(version, stats)
+        return stats
+    
+    async def get_stats_breakdown(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Statistics over the patterns matching ``filters``, every dimension in one aggregation
+        
+        Without filters this is the materialized statistics document.
+        """
+        search_filter = stats_filter(filters)
+        if not search_filter:
+            return await self.get_stats()
+        
+        try:
+            version = await self.get_data_version()
+            key = (version, normalize_filter(search_filter))
+            stats = _stats_breakdown_cache.get(key)
+            if stats is MISSING:
+                stats, _ = await _flights.do(
+                    "get_stats_breakdown", key, partial(self._load_stats_breakdown, key, search_filter)
+                )
+            return stats
+        except Exception as e:
+            logger.error(f"Failed to get stats breakdown: {e}")
+            raise
+    
+    async def _load_stats_breakdown(self, key: tuple[int, str], search_filter: Dict[str, Any]) -> Dict[str, Any]:
+        facets = await self.collection.aggregate(stats_pipeline(search_filter)).to_list(length=1)
+        stats = stats_document(facets[0] if facets else {}, key[0])
+        _stats_breakdown_cache.set(key, stats)
+        return stats
+    
+    async def get_neighbors(self, pattern_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """The k techniques most similar to ``pattern_id``, read from the graph materialized at ingestion
+        
+        They are scored from the in-memory similarity model when the stored
+        neighbors are missing or older than the data.
+        """
+        try:
+            version = await self.get_data_version()
+            stored = await self.database.technique_graph.find_one(
+                {"_id": pattern_id}, {"version": 1, "neighbors": {"$slice": k}}
+            )
+            if stored is not None and stored.get("version") == version:
+                return stored["neighbors"]
+            
+            model = await self.get_similarity_model()
+            if pattern_id not in model.positions:
+                raise ValueError(f"Attack pattern with ID {pattern_id} not found")
+            return next(model.neighbors(k, ids=[pattern_id]))[1]
+        except Exception as e:
+            logger.error(f"Failed to get neighbors of attack pattern {pattern_id}: {e}")
+            raise
+    
+    async def find_similar(
+        self,
+        k: int = 10,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k techniques by description similarity for each technique ID and free text
+        
+        Every query is answered by one batched sparse product against the
+        TF-IDF matrix of the current dataset version.
+        """
+        try:
+            ids = ids or []
+            texts = texts or []
+            model = await self.get_similarity_model()
+            with self._timed("similar"):
+                matches = model.similar(k, ids=ids, texts=texts)
+            queries = [
+                *({"query": pattern_id, "kind": "id", "found": pattern_id in model.positions} for pattern_id in ids),
+                *({"query": text, "kind": "text", "found": True} for text in texts)
+            ]
+            return [{**query, "similar": similar} for query, similar in zip(queries, matches)]
+        except Exception as e:
+            logger.error(f"Failed to find similar attack patterns: {e}")
+            raise
+    
+    async def get_similar(self, pattern_id: str, k: int = 10) -> Dict[str, Any]:
+        """Top-k techniques whose descriptions are most similar to ``pattern_id``'s"""
+        result = (await self.find_similar(k, ids=[pattern_id]))[0]
+        if not result["found"]:
+            raise ValueError(f"Attack pattern with ID {pattern_id} not found")
+        return result
+    
+    async def get_technique_graph(self, k: int = 10, min_score: float = 0.0) -> Dict[str, Any]:
+        """Edges from every technique to its k most similar techniques scoring at least ``min_score``"""
+        try:
+            version = await self.get_data_version()
+            materialized = await self.database.metadata.find_one({"_id": TECHNIQUE_GRAPH_METADATA_ID})
+            if materialized is not None and materialized.get("version") == version:
+                stored = await self.database.technique_graph.find(
+                    {"version": version}, {"neighbors": {"$slice": k}}
+                ).to_list(length=None)
+                adjacency = [(document["_id"], document["neighbors"]) for document in stored]
+            else:
+                logger.info(f"No technique graph materialized for dataset version {version}, scoring it")
+                model = await self.get_similarity_model()
+                adjacency = await asyncio.to_thread(lambda: list(model.neighbors(k)))
+            
+            edges = [
+                {"source": source, "target": neighbor["id"], "type": neighbor["type"], "strength": neighbor["score"]}
+                for source, neighbors in adjacency
+                for neighbor in neighbors
+                if neighbor["score"] >= min_score
+            ]
+            return {"version": version, "k": k, "edges": edges}
+        except Exception as e:
+            logger.error(f"Failed to get technique graph: {e}")
+            raise
+    
+    async def get_patterns_by_ids(
+        self,
+        pattern_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Resolve many technique and sub-technique IDs at once, optionally projected to ``fields``
+        
+        Returns the found patterns keyed by the ID as requested, and the
+        requested IDs that matched nothing. IDs are matched after
+        normalize_pattern_id. The search index's ID map answers without a
+        query; otherwise every ID is resolved by a single ``$in`` query.
+        """
+        self.timings = {}
+        try:
+            requested = {pattern_id: normalize_pattern_id(pattern_id) for pattern_id in pattern_ids}
+            wanted = list(dict.fromkeys(requested.values()))
+            
+            index = await self._available_search_index()
+            if index is not None:
+                with self._timed("index_lookup"):
+                    documents = {
+                        pattern_id: project_document(index.by_id[pattern_id], fields)
+                        for pattern_id in wanted
+                        if pattern_id in index.by_id
+                    }
+            else:
+                with self._timed("find"):
+                    # The id is always read, to key the results
+                    projection = projection_for(None if fields is None else ["id", *fields])
+                    cursor = self.collection.find({"id": {"$in": wanted}}, projection).sort("_id", 1)
+                    documents = {}
+                    for document in await cursor.to_list(length=None):
+                        documents.setdefault(document["id"], document)
+            
+            found = {pattern_id: documents[normalized] for pattern_id, normalized in requested.items() if normalized in documents}
+            missing = [pattern_id for pattern_id in requested if pattern_id not in found]
+            return found, missing
+        except Exception as e:
+            logger.error(f"Failed to look up {len(pattern_ids)} attack patterns: {e}")
+            raise
+    
     async def get_pattern_by_id(self, pattern_id: str) -> Dict:
         """Get a specific attack pattern by ID"""
         try:
@@ -272,3 +1374,201 @@ class AttackPatternService:
         except Exception as e:
             logger.error(f"Failed to get attack pattern {pattern_id}: {e}")
             raise
+
+
+class CachedAttackPatternService(AttackPatternService):
+    """AttackPatternService whose read results are reused until the dataset version changes
+    
+    Results are keyed by dataset version, operation and normalized arguments,
+    so an ingestion (which bumps the version) makes every older entry
+    unreachable; the least recently used entries are evicted when the cache
+    is full. Streaming reads are not cached.
+    """
+    
+    async def _read_through(self, operation: str, params: Dict[str, Any], load: Callable[[], Awaitable[Any]]) -> Any:
+        key = (await self.get_data_version(), normalize_filter(params))
+        start = time.perf_counter()
+        value, source = await _response_cache.get_or_load(operation, key, load)
+        # The load's stages were timed on the service of the request that ran it
+        if source != "load":
+            self.timings = {source: (time.perf_counter() - start) * 1000}
+        return value
+    
+    async def get_all_patterns(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], Optional[int]]:
+        params = {"limit": limit, "offset": offset, "cursor": cursor, "include_total": include_total, "fields": fields}
+        return await self._read_through(
+            "get_all_patterns", params, partial(super().get_all_patterns, **params)
+        )
+    
+    async def search_patterns(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], Optional[int]]:
+        params = {
+            "query": query, "limit": limit, "offset": offset, "cursor": cursor,
+            "include_total": include_total, "fields": fields
+        }
+        return await self._read_through(
+            "search_patterns", params, partial(super().search_patterns, **params)
+        )
+    
+    async def get_pattern_by_id(self, pattern_id: str) -> Dict:
+        return await self._read_through(
+            "get_pattern_by_id", {"pattern_id": pattern_id}, partial(super().get_pattern_by_id, pattern_id)
+        )
+    
+    async def get_patterns_by_ids(
+        self,
+        pattern_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> tuple[Dict[str, Dict[str, Any]], List[str]]:
+        params = {"pattern_ids": pattern_ids, "fields": fields}
+        return await self._read_through(
+            "get_patterns_by_ids", params, partial(super().get_patterns_by_ids, **params)
+        )
+    
+    async def find_similar(
+        self,
+        k: int = 10,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        params = {"k": k, "ids": ids, "texts": texts}
+        return await self._read_through(
+            "find_similar", params, partial(super().find_similar, **params)
+        )
+    
+    async def get_neighbors(self, pattern_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        params = {"pattern_id": pattern_id, "k": k}
+        return await self._read_through(
+            "get_neighbors", params, partial(super().get_neighbors, **params)
+        )
+    
+    async def get_technique_graph(self, k: int = 10, min_score: float = 0.0) -> Dict[str, Any]:
+        params = {"k": k, "min_score": min_score}
+        return await self._read_through(
+            "get_technique_graph", params, partial(super().get_technique_graph, **params)
+        )
+
+
+class ReplicaAttackPatternService(AttackPatternService):
+    """AttackPatternService answering list, get, lookup, search and statistics reads from a ReadReplica
+    
+    The replica is loaded once per dataset version. A new version is noticed
+    through the cached version check (at most once per
+    DATASET_VERSION_CHECK_INTERVAL), and the requests that notice it share
+    one reload. keep_replica_fresh polls the version in the background, so
+    the reload usually happens before any request needs it. Similarity
+    reads and filtered counts still go to MongoDB.
+    """
+    
+    async def get_replica(self) -> ReadReplica:
+        """Read replica for the current dataset version, loaded on first use after an ingestion"""
+        version = await self.get_data_version()
+        replica = _replicas.get(version)
+        if replica is MISSING:
+            replica, _ = await _flights.do("load_replica", version, partial(self._load_replica, version))
+        return replica
+    
+    async def _load_replica(self, version: int) -> ReadReplica:
+        start = time.perf_counter()
+        documents = await self.collection.find({}).sort("_id", 1).to_list(length=None)
+        replica = await asyncio.to_thread(ReadReplica, documents, version, STATS_FILTER_FIELDS)
+        _replicas.set(version, replica)
+        logger.info(
+            f"Loaded read replica of {len(replica)} patterns for dataset version {version} "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return replica
+    
+    async def get_search_index(self) -> Optional[SearchIndex]:
+        return (await self.get_replica()).search_index
+    
+    async def _available_search_index(self) -> Optional[SearchIndex]:
+        # The replica's index serves searches even when SEARCH_INDEX_ENABLED is off
+        return await self.get_search_index()
+    
+    async def warm_up(self) -> None:
+        """Load the read replica, with its search index, and build the similarity model"""
+        await self.get_replica()
+        await self.get_similarity_model()
+    
+    async def count_patterns(self, search_filter: Optional[Dict[str, Any]] = None) -> int:
+        if search_filter:
+            return await super().count_patterns(search_filter)
+        return len(await self.get_replica())
+    
+    async def get_all_patterns(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> tuple[List[Dict], Optional[int]]:
+        try:
+            replica = await self.get_replica()
+            with self._timed("replica"):
+                after = decode_cursor(cursor)[0] if cursor else None
+                patterns = [project_document(pattern, fields) for pattern in replica.page(limit, offset, after)]
+            return patterns, len(replica) if include_total else None
+        except Exception as e:
+            logger.error(f"Failed to get attack patterns: {e}")
+            raise
+    
+    async def iter_patterns(self, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        try:
+            replica = await self.get_replica()
+            for record in replica.records:
+                yield project_document(record, fields)
+        except Exception as e:
+            logger.error(f"Failed to stream attack patterns: {e}")
+            raise
+    
+    async def get_pattern_by_id(self, pattern_id: str) -> Dict:
+        try:
+            pattern = (await self.get_replica()).get(pattern_id)
+            if pattern is None:
+                raise ValueError(f"Attack pattern with ID {pattern_id} not found")
+            return pattern
+        except Exception as e:
+            logger.error(f"Failed to get attack pattern {pattern_id}: {e}")
+            raise
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        try:
+            return (await self.get_replica()).stats
+        except Exception as e:
+            logger.error(f"Failed to get stats: {e}")
+            raise
+    
+    async def get_stats_breakdown(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        if not stats_filter(filters):
+            return await self.get_stats()
+        try:
+            return (await self.get_replica()).statistics(filters)
+        except Exception as e:
+            logger.error(f"Failed to get stats breakdown: {e}")
+            raise
+
+
+async def keep_replica_fresh(service: ReplicaAttackPatternService, interval: float) -> None:
+    """Poll the dataset version every ``interval`` seconds and load the replica of a new version as soon as it appears"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await service.get_replica()
+        except Exception as e:
+            logger.warning(f"Read replica refresh failed: {e}")
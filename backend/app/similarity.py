@@ -0,0 +1,255 @@
+import logging
+import numpy as np
+from scipy import sparse
+from typing import Any, Dict, Iterator, List, Optional
+from pymongo import ReplaceOne
+from app.search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Common words that say nothing about what a technique does
+STOP_WORDS = frozenset({
+    "the", "and", "for", "are", "was", "were", "with", "this", "that", "these", "those", "from", "into", "onto",
+    "may", "can", "could", "such", "also", "other", "than", "then", "their", "there", "which", "when", "where",
+    "while", "have", "has", "had", "been", "being", "use", "used", "using", "not", "but", "all", "any", "each",
+    "its", "via", "more", "most", "some", "only", "they", "them", "will", "would", "should", "about", "within",
+    "adversaries", "adversary", "citation"
+})
+
+# Weights of the similarity components; each component is in [0, 1], so scores are too
+PHASE_WEIGHT = 0.3
+PLATFORM_WEIGHT = 0.2
+TEXT_WEIGHT = 0.5
+
+# Rows scored at a time, bounding the dense score block to BLOCK_SIZE x techniques
+BLOCK_SIZE = 256
+
+# Neighbors stored per technique at ingestion (the most the neighbors endpoint serves)
+GRAPH_NEIGHBORS = 20
+
+# Fields the model reads, used as a projection when loading documents
+SIMILARITY_FIELDS = {"id": 1, "name": 1, "description": 1, "kill_chain_phases": 1, "x_mitre_platforms": 1}
+
+# Document in the metadata collection recording the dataset version the stored graph is complete for
+TECHNIQUE_GRAPH_METADATA_ID = "technique_graph"
+
+_PLACEHOLDERS = {"NA", "N/A", ""}
+
+
+def description_terms(text: str) -> List[str]:
+    """Tokens of a description that carry meaning for similarity"""
+    return [token for token in tokenize(text) if len(token) > 2 and token not in STOP_WORDS and not token.isdigit()]
+
+
+def _binary_matrix(rows: List[List[str]]) -> sparse.csr_matrix:
+    """Rows x distinct values indicator matrix"""
+    columns: Dict[str, int] = {}
+    indices, indptr = [], [0]
+    for values in rows:
+        for value in set(values) - _PLACEHOLDERS:
+            indices.append(columns.setdefault(value, len(columns)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), max(len(columns), 1)))
+
+
+def _jaccard(transposed: sparse.csr_matrix, sizes: np.ndarray, rows: sparse.csr_matrix, row_sizes: np.ndarray) -> np.ndarray:
+    """Jaccard similarity of every row in ``rows`` against every row of a matrix, given its transpose"""
+    intersection = (rows @ transposed).toarray()
+    union = row_sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k largest scores in each row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class SimilarityModel:
+    """Sparse technique feature matrices for similarity queries
+    
+    Descriptions become L2-normalized TF-IDF rows (sublinear term frequency),
+    so a sparse dot product is their cosine similarity. Kill chain phases and
+    platforms are indicator rows compared with Jaccard similarity.
+    """
+    
+    def __init__(self, documents: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.ids = [document["id"] for document in documents]
+        self.names = [document.get("name", "") for document in documents]
+        self.positions = {pattern_id: position for position, pattern_id in enumerate(self.ids)}
+        
+        self.vocabulary: Dict[str, int] = {}
+        indices, counts, indptr = [], [], [0]
+        for document in documents:
+            terms: Dict[int, int] = {}
+            for term in description_terms(document.get("description", "")):
+                column = self.vocabulary.setdefault(term, len(self.vocabulary))
+                terms[column] = terms.get(column, 0) + 1
+            indices.extend(terms)
+            counts.extend(terms.values())
+            indptr.append(len(indices))
+        shape = (len(documents), max(len(self.vocabulary), 1))
+        frequencies = sparse.csr_matrix((np.array(counts, dtype=np.float32), indices, indptr), shape=shape)
+        
+        document_frequency = np.bincount(frequencies.indices, minlength=shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + document_frequency)) + 1).astype(np.float32)
+        frequencies.data = 1 + np.log(frequencies.data)
+        self.tfidf = self._normalize(frequencies @ sparse.diags(self.idf))
+        # Transposes are kept in CSR so products with them do not convert formats on every query
+        self.tfidf_t = self.tfidf.T.tocsr()
+        
+        self.phases = _binary_matrix([
+            [phase.get("phase_name", "") for phase in document.get("kill_chain_phases", [])] for document in documents
+        ])
+        self.platforms = _binary_matrix([document.get("x_mitre_platforms", []) for document in documents])
+        self.phase_sizes = np.asarray(self.phases.sum(axis=1), dtype=np.float32).ravel()
+        self.platform_sizes = np.asarray(self.platforms.sum(axis=1), dtype=np.float32).ravel()
+        self.phases_t = self.phases.T.tocsr()
+        self.platforms_t = self.platforms.T.tocsr()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @staticmethod
+    def _normalize(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+        matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+    
+    def vectorize(self, texts: List[str]) -> sparse.csr_matrix:
+        """TF-IDF rows for free text, over the model's vocabulary"""
+        indices, counts, indptr = [], [], [0]
+        for text in texts:
+            terms: Dict[int, int] = {}
+            for term in description_terms(text):
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    terms[column] = terms.get(column, 0) + 1
+            indices.extend(terms)
+            counts.extend(terms.values())
+            indptr.append(len(indices))
+        frequencies = sparse.csr_matrix(
+            (np.array(counts, dtype=np.float32), indices, indptr), shape=(len(texts), self.tfidf.shape[1])
+        )
+        frequencies.data = 1 + np.log(frequencies.data)
+        return self._normalize(frequencies @ sparse.diags(self.idf))
+    
+    def _neighbor(self, position: int, score: float, components: Dict[str, float]) -> Dict[str, Any]:
+        strongest = max(components, key=components.get)
+        return {
+            "id": self.ids[position],
+            "name": self.names[position],
+            "score": round(score, 4),
+            "type": strongest,
+            **{name: round(value, 4) for name, value in components.items()}
+        }
+    
+    def _score_rows(self, positions: np.ndarray) -> tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Combined scores of the given rows against every technique, with their weighted components"""
+        components = {
+            "phase": PHASE_WEIGHT * _jaccard(
+                self.phases_t, self.phase_sizes, self.phases[positions], self.phase_sizes[positions]
+            ),
+            "platform": PLATFORM_WEIGHT * _jaccard(
+                self.platforms_t, self.platform_sizes, self.platforms[positions], self.platform_sizes[positions]
+            ),
+            "keyword": TEXT_WEIGHT * (self.tfidf[positions] @ self.tfidf_t).toarray()
+        }
+        scores = components["phase"] + components["platform"] + components["keyword"]
+        # A technique is not its own neighbor
+        scores[np.arange(len(positions)), positions] = -1
+        return scores, components
+    
+    def neighbors(
+        self,
+        k: int = GRAPH_NEIGHBORS,
+        min_score: float = 0.0,
+        ids: Optional[List[str]] = None
+    ) -> Iterator[tuple[str, List[Dict[str, Any]]]]:
+        """Top-k most similar techniques for every technique (or the given ones), scored BLOCK_SIZE rows at a time
+        
+        Each neighbor carries its weighted phase, platform and keyword (description)
+        contributions, and ``type`` names the largest of them. Unknown IDs are skipped.
+        """
+        if ids is None:
+            positions = np.arange(len(self))
+        else:
+            known = [self.positions[pattern_id] for pattern_id in ids if pattern_id in self.positions]
+            positions = np.array(known, dtype=np.int64)
+        for start in range(0, len(positions), BLOCK_SIZE):
+            block = positions[start:start + BLOCK_SIZE]
+            scores, components = self._score_rows(block)
+            for row, columns in enumerate(_top_k(scores, k)):
+                yield self.ids[block[row]], [
+                    self._neighbor(
+                        int(column),
+                        float(scores[row, column]),
+                        {name: float(values[row, column]) for name, values in components.items()}
+                    )
+                    for column in columns
+                    if scores[row, column] > min_score
+                ]
+    
+    def similar(
+        self,
+        k: int,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k techniques by description cosine similarity for each given technique ID or free text
+        
+        All queries are answered with one sparse matrix product. Unknown IDs
+        get an empty list, and a technique never appears in its own results.
+        """
+        ids = ids or []
+        texts = texts or []
+        known = [self.positions.get(pattern_id) for pattern_id in ids]
+        if not ids + texts or not len(self):
+            return [[] for _ in ids + texts]
+        
+        # Unknown IDs borrow row 0 and have their results discarded below
+        queries = self.tfidf[[position or 0 for position in known]]
+        if texts:
+            queries = sparse.vstack([queries, self.vectorize(texts)]).tocsr()
+        scores = (queries @ self.tfidf_t).toarray()
+        for row, position in enumerate(known):
+            if position is not None:
+                scores[row, position] = -1
+        
+        results = []
+        for row, columns in enumerate(_top_k(scores, k)):
+            if row < len(known) and known[row] is None:
+                results.append([])
+                continue
+            results.append([
+                {"id": self.ids[column], "name": self.names[column], "score": round(float(scores[row, column]), 4)}
+                for column in columns
+                if scores[row, column] > 0
+            ])
+        return results
+
+
+def materialize_technique_graph(database, version: int, k: int = GRAPH_NEIGHBORS) -> int:
+    """Recompute every technique's nearest neighbors and store them, through a synchronous (ingestion) connection"""
+    documents = list(database.attack_patterns.find({}, SIMILARITY_FIELDS).sort("_id", 1))
+    model = SimilarityModel(documents, version)
+    operations = [
+        ReplaceOne({"_id": pattern_id}, {"version": version, "neighbors": neighbors}, upsert=True)
+        for pattern_id, neighbors in model.neighbors(k)
+    ]
+    if operations:
+        database.technique_graph.bulk_write(operations, ordered=False)
+    # Techniques that no longer exist were not rewritten for this version
+    database.technique_graph.delete_many({"version": {"$ne": version}})
+    database.metadata.update_one(
+        {"_id": TECHNIQUE_GRAPH_METADATA_ID}, {"$set": {"version": version, "techniques": len(operations)}}, upsert=True
+    )
+    logger.info(f"Materialized technique graph for {len(operations)} techniques at dataset version {version}")
+    return len(operations)
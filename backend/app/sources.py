@@ -0,0 +1,203 @@
+import ijson
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import tarfile
+from itertools import islice
+from typing import Any, Dict, IO, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The opening of a bundle's objects array, and the end of a bundle whose objects array comes last
+_OBJECTS_START = re.compile(rb'"objects"\s*:\s*\[')
+_OBJECTS_END = re.compile(rb'\]\s*\}\s*$')
+
+# Where one object of an array ends and the next begins
+_OBJECT_SEPARATOR = re.compile(rb'\}\s*,\s*\{')
+
+# Bytes decoded after a candidate boundary to check that a STIX object starts there
+_BOUNDARY_CHECK_BYTES = 64 * 1024
+
+# Candidate boundaries tried before a range is simply made longer
+_BOUNDARY_CANDIDATES = 32
+
+
+def iter_stream_objects(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Incrementally yield the entries of a STIX bundle's ``objects`` array"""
+    # use_float keeps numbers BSON-encodable instead of Decimal
+    yield from ijson.items(stream, "objects.item", use_float=True)
+
+
+def iter_bundle_objects(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream STIX objects from a single bundle file such as enterprise-attack.json"""
+    with open(path, "rb") as stream:
+        yield from iter_stream_objects(stream)
+
+
+def iter_directory_objects(path: str, skipped: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream STIX objects from a directory of per-technique bundle files, recording unreadable ones in ``skipped``"""
+    for root, _dirs, files in os.walk(path):
+        for name in sorted(files):
+            if not name.endswith(".json"):
+                continue
+            try:
+                yield from iter_bundle_objects(os.path.join(root, name))
+            except (ijson.JSONError, OSError) as e:
+                logger.warning(f"Failed to process file {name}: {e}")
+                if skipped is not None:
+                    skipped.append(name)
+
+
+def iter_tarball_objects(path: str, skipped: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream STIX objects from a (optionally compressed) tarball of bundle files, recording unreadable ones in ``skipped``"""
+    with tarfile.open(path, "r:*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith(".json"):
+                continue
+            stream = archive.extractfile(member)
+            if stream is None:
+                continue
+            try:
+                with stream:
+                    yield from iter_stream_objects(stream)
+            except ijson.JSONError as e:
+                logger.warning(f"Failed to process file {member.name}: {e}")
+                if skipped is not None:
+                    skipped.append(member.name)
+
+
+def iter_local_objects(path: str, skipped: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream STIX objects from a local bundle file, directory or tarball
+
+    Files of a directory or tarball that cannot be parsed are logged, left
+    out and their names appended to ``skipped``.
+    """
+    if os.path.isdir(path):
+        return iter_directory_objects(path, skipped)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"STIX source {path} does not exist")
+    if tarfile.is_tarfile(path):
+        return iter_tarball_objects(path, skipped)
+    return iter_bundle_objects(path)
+
+
+class SourcePart(NamedTuple):
+    """A piece of a STIX source that a transform worker reads and parses by itself
+
+    ``kind`` is ``file`` (a per-technique file at ``path``), ``bytes`` (a
+    downloaded file or tarball member in ``data``), ``range`` (the objects
+    between ``start`` and ``end`` in the bundle at ``path``) or ``bundle``
+    (the bundle at ``path`` from its ``skip``-th object on). Files and bytes
+    that do not parse are skipped; ranges and bundles raise, as a bundle
+    read in one process does.
+    """
+
+    kind: str
+    name: str
+    size: int
+    path: str = ""
+    data: bytes = b""
+    start: int = 0
+    end: int = 0
+    skip: int = 0
+
+
+def bundle_ranges(path: str, target_size: int) -> Optional[List[Tuple[int, int]]]:
+    """Byte ranges of about ``target_size`` covering a bundle's objects array, each holding whole objects
+
+    Boundaries are placed where the text after ``}, {`` decodes to an object
+    with a STIX ``type`` and ``id``. Wrapped in brackets, each range is then
+    a JSON array of consecutive objects; a boundary that lands inside an
+    object anyway makes its range fail to parse. Returns None unless the
+    bundle ends with its objects array.
+    """
+    if os.path.getsize(path) == 0:
+        return None
+    decoder = json.JSONDecoder()
+    with open(path, "rb") as stream, mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        opening = _OBJECTS_START.search(data)
+        closing = _OBJECTS_END.search(data, max(0, len(data) - 4096))
+        if opening is None or closing is None:
+            return None
+        try:
+            # Only parses when "objects" is a key of the bundle itself, not of something nested in it
+            json.loads(data[:opening.end()] + b"]}")
+        except ValueError:
+            return None
+
+        ranges = []
+        start, end = opening.end(), closing.start()
+        target = start + target_size
+        while target < end:
+            boundary = None
+            for tried, separator in enumerate(_OBJECT_SEPARATOR.finditer(data, target, end)):
+                if tried == _BOUNDARY_CANDIDATES:
+                    break
+                window = data[separator.end() - 1:min(separator.end() - 1 + _BOUNDARY_CHECK_BYTES, end)]
+                try:
+                    candidate, _ = decoder.raw_decode(window.decode("utf-8", errors="ignore"))
+                except ValueError:
+                    continue
+                if isinstance(candidate, dict) and "type" in candidate and "id" in candidate:
+                    boundary = separator
+                    break
+            if boundary is None:
+                target += target_size
+                continue
+            ranges.append((start, boundary.start() + 1))
+            start = boundary.end() - 1
+            target = start + target_size
+        ranges.append((start, end))
+        return ranges
+
+
+def iter_range_objects(path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    """Parse the objects in a byte range from bundle_ranges"""
+    with open(path, "rb") as stream:
+        stream.seek(start)
+        data = stream.read(end - start)
+    yield from ijson.items(io.BytesIO(b"[" + data + b"]"), "item", use_float=True)
+
+
+def iter_local_parts(path: str, target_size: int) -> Iterator[SourcePart]:
+    """Split a local bundle file, directory or tarball into parts for transform workers"""
+    if os.path.isdir(path):
+        for root, _dirs, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(".json"):
+                    file_path = os.path.join(root, name)
+                    yield SourcePart("file", name, os.path.getsize(file_path), path=file_path)
+        return
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"STIX source {path} does not exist")
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.endswith(".json"):
+                    continue
+                stream = archive.extractfile(member)
+                if stream is not None:
+                    with stream:
+                        yield SourcePart("bytes", member.name, member.size, data=stream.read())
+        return
+    name = os.path.basename(path)
+    ranges = bundle_ranges(path, target_size)
+    if ranges is None:
+        yield SourcePart("bundle", name, os.path.getsize(path), path=path)
+        return
+    for start, end in ranges:
+        yield SourcePart("range", name, end - start, path=path, start=start, end=end)
+
+
+def iter_part_objects(part: SourcePart) -> Iterator[Dict[str, Any]]:
+    """Parse the STIX objects of one source part"""
+    if part.kind == "bytes":
+        return iter_stream_objects(io.BytesIO(part.data))
+    if part.kind == "range":
+        return iter_range_objects(part.path, part.start, part.end)
+    if part.kind == "bundle":
+        return islice(iter_bundle_objects(part.path), part.skip, None)
+    return iter_bundle_objects(part.path)
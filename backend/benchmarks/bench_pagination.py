@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark deep-page latency of offset versus cursor pagination
+
+Loads synthetic attack patterns into a scratch database on the MongoDB at
+MONGODB_URL and times fetching a page at increasing depths with
+AttackPatternService.get_all_patterns, once via offset and once via cursor.
+
+Usage:
+    python -m benchmarks.bench_pagination
+    python -m benchmarks.bench_pagination --documents 200000 --limit 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services import AttackPatternService, encode_cursor
+
+BENCH_DATABASE = "cybersecurity_intelligence_bench"
+
+
+async def load_documents(collection, count: int) -> None:
+    """Insert synthetic patterns in batches"""
+    await collection.drop()
+    batch = []
+    for index in range(count):
+        batch.append({
+            "id": f"T{index:06d}",
+            "name": f"Technique {index}",
+            "description": "Adversaries may do something interesting " * 10,
+            "x_mitre_platforms": ["Windows", "Linux"],
+            "x_mitre_detection": "Monitor",
+            "phase_name": "execution",
+            "external_id": f"T{index:06d}",
+            "kill_chain_phases": [{"phase_name": "execution"}],
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+
+
+async def time_call(call, repeat: int) -> float:
+    """Median wall time of ``call`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000, help="Number of synthetic patterns")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per measurement")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    database = client[BENCH_DATABASE]
+    try:
+        await load_documents(database.attack_patterns, args.documents)
+        service = AttackPatternService(database)
+
+        print(f"{args.documents} documents, page size {args.limit}")
+        print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+        depth = args.limit
+        while depth < args.documents:
+            # The cursor for a page at ``depth`` is the _id of the document just before it
+            previous = await database.attack_patterns.find({}, {"_id": 1}).sort("_id", 1).skip(depth - 1).limit(1).to_list(1)
+            cursor = encode_cursor(previous[0]["_id"])
+
+            offset_ms = await time_call(lambda: service.get_all_patterns(limit=args.limit, offset=depth), args.repeat)
+            cursor_ms = await time_call(lambda: service.get_all_patterns(limit=args.limit, cursor=cursor), args.repeat)
+            print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+            depth *= 4
+    finally:
+        await client.drop_database(BENCH_DATABASE)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
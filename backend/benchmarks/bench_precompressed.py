@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark serving /dashboard-data and /stats from precompressed payloads
+
+Drives the real FastAPI app in-process (httpx ASGI transport, every
+middleware included) with a service holding the data in memory, so only
+response building and encoding differ between the paths:
+
+  per request         serialize the payload on every request, uncompressed
+                      (what the endpoints did before)
+  per request gzip    the same, compressed on every request by Starlette's
+                      GZipMiddleware (what enabling compression would cost)
+  stored identity     the stored uncompressed body
+  stored gzip / br    the stored gzip and brotli bodies
+
+Each path reports requests per second, p50 latency and bytes on the wire.
+
+Usage:
+    python -m benchmarks.bench_precompressed
+    python -m benchmarks.bench_precompressed --documents 800 --requests 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import httpx
+from starlette.middleware.gzip import GZipMiddleware
+import app.routers
+from app.main import app as api
+from app.database import stats_document
+from app.routers import get_attack_service
+from app.services import AttackPatternService, invalidate_read_caches
+from benchmarks.bench_serialization import make_documents
+
+
+def distribution(values: List[str]) -> List[dict]:
+    return [{"_id": value, "count": count} for value, count in Counter(values).most_common()]
+
+
+def make_stats(documents: List[dict]) -> dict:
+    """The stored statistics document for ``documents``, counted in Python instead of the aggregation"""
+    return stats_document({
+        "total": [{"count": len(documents)}],
+        "phase_distribution": distribution(
+            [phase["phase_name"] for document in documents for phase in document.get("kill_chain_phases", [])]
+        ),
+        "platform_distribution": distribution(
+            [platform for document in documents for platform in document.get("x_mitre_platforms", [])]
+        ),
+    }, version=1)
+
+
+class InMemoryService(AttackPatternService):
+    """Attack pattern service answering from a list of documents, without MongoDB"""
+
+    def __init__(self, documents: List[dict]):
+        super().__init__(SimpleNamespace(attack_patterns=None))
+        self.documents = documents
+        self.stats = make_stats(documents)
+
+    async def get_data_stamp(self) -> Dict[str, Any]:
+        return {"version": 1, "updated_at": None}
+
+    async def get_all_patterns(self, limit=10, offset=0, cursor=None, include_total=True, fields=None):
+        return self.documents[offset:offset + limit], len(self.documents)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return self.stats
+
+
+async def measure(
+    transport: httpx.AsyncBaseTransport,
+    path: str,
+    encoding: str,
+    requests: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """Requests/second, p50 milliseconds and response bytes for ``requests`` GETs, ``concurrency`` at a time"""
+    timings: List[float] = []
+    size = 0
+
+    async def worker(client: httpx.AsyncClient, count: int) -> None:
+        nonlocal size
+        for _ in range(count):
+            start = time.perf_counter()
+            async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+                # Raw bytes, so the client does not spend time decompressing
+                size = sum([len(chunk) async for chunk in response.aiter_raw()])
+            timings.append((time.perf_counter() - start) * 1000)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await worker(client, 1)
+        timings.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"rps": len(timings) / elapsed, "p50": statistics.median(timings), "bytes": size}
+
+
+async def run(path: str, requests: int, concurrency: int) -> None:
+    plain = httpx.ASGITransport(app=api)
+    compressing = httpx.ASGITransport(app=GZipMiddleware(api))
+    paths: List[tuple[str, httpx.AsyncBaseTransport, str, bool]] = [
+        ("per request", plain, "identity", False),
+        ("per request gzip", compressing, "gzip", False),
+        ("stored identity", plain, "identity", True),
+        ("stored gzip", plain, "gzip", True),
+        ("stored br", plain, "br", True),
+    ]
+    baseline: Optional[float] = None
+    print(f"GET {path}")
+    print(f"{'path':>18} {'req/s':>9} {'p50 ms':>9} {'bytes':>10} {'speedup':>8}")
+    for name, transport, encoding, stored in paths:
+        invalidate_read_caches()
+        app.routers.PRECOMPRESSED_RESPONSES_ENABLED = stored
+        result = await measure(transport, path, encoding, requests, concurrency)
+        baseline = baseline or result["rps"]
+        print(
+            f"{name:>18} {result['rps']:>9.1f} {result['p50']:>9.2f} {result['bytes']:>10,} "
+            f"{result['rps'] / baseline:>7.1f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1500, help="Stored attack patterns")
+    parser.add_argument("--requests", type=int, default=100, help="Requests timed per path")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    args = parser.parse_args()
+
+    service = InMemoryService(make_documents(args.documents))
+    api.dependency_overrides[get_attack_service] = lambda: service
+    for path in ("/api/v1/dashboard-data", "/api/v1/stats"):
+        asyncio.run(run(path, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark building list responses with and without per-document model validation
+
+Times turning a page of stored attack pattern documents (10k by default) into
+response bytes two ways:
+
+  validated  AttackPatternResponse per document, a SearchResponse, then
+             FastAPI's response_model validation and JSON rendering
+             (the router path before the fast path existed)
+  fast       plain dicts copied from the compiled field list, rendered
+             with orjson (what list endpoints do now)
+
+Usage:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --documents 2000 --repeat 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, List
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.models import AttackPatternResponse, SearchResponse, SUMMARY_FIELDS
+from app.serialization import search_response_content
+from app.services import build_documents
+from benchmarks.bench_transform import make_object
+
+RESPONSE_FIELD = create_model_field(name="Response_get_dashboard_data", type_=SearchResponse, mode="serialization")
+
+
+def make_documents(count: int) -> List[dict]:
+    """Stored-shape documents produced by the real ingestion transform"""
+    rng = random.Random(42)
+    documents: List[dict] = []
+    index = 0
+    while len(documents) < count:
+        documents.extend(build_documents([make_object(index, rng)]))
+        index += 1
+    return documents
+
+
+def validated(documents: List[dict]) -> bytes:
+    """Build the response the way routers did before the fast path"""
+    results = [
+        AttackPatternResponse(
+            id=pattern["id"],
+            name=pattern["name"],
+            description=pattern["description"],
+            x_mitre_platforms=pattern["x_mitre_platforms"],
+            x_mitre_detection=pattern["x_mitre_detection"],
+            phase_name=pattern["phase_name"],
+            external_id=pattern["external_id"],
+            kill_chain_phases=pattern["kill_chain_phases"],
+            external_references=pattern.get("external_references", []),
+            created_at=pattern.get("created_at", ""),
+            modified_at=pattern.get("modified_at", "")
+        )
+        for pattern in documents
+    ]
+    response = SearchResponse(results=results, total=len(documents), limit=len(documents), offset=0)
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=response))
+    return JSONResponse(content).body
+
+
+def fast(documents: List[dict]) -> bytes:
+    return ORJSONResponse(search_response_content(documents, len(documents), len(documents), 0)).body
+
+
+def fast_summary(documents: List[dict]) -> bytes:
+    return ORJSONResponse(search_response_content(documents, len(documents), len(documents), 0, fields=SUMMARY_FIELDS)).body
+
+
+def best_of(build: Callable[[List[dict]], bytes], documents: List[dict], repeat: int) -> tuple[float, int]:
+    """Fastest of ``repeat`` runs, with the response size"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = build(documents)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10_000, help="Number of documents in the page")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the fastest is reported")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    print(f"{args.documents} documents, best of {args.repeat}")
+    print(f"{'path':>14} {'ms':>9} {'MB':>7} {'speedup':>8}")
+    baseline = None
+    for name, build in (("validated", validated), ("fast", fast), ("fast summary", fast_summary)):
+        elapsed, size = best_of(build, documents, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:>14} {elapsed * 1000:>9.1f} {size / 1e6:>7.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
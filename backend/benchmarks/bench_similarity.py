@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark similar-technique queries against the TF-IDF similarity model
+
+Builds the model over a corpus the size of every ATT&CK domain combined
+(1,500 techniques by default), or over a real STIX bundle/directory/tarball
+given with --source, then reports:
+
+  build      vectorizing every description into the TF-IDF matrix
+  by id      one technique ID per query (the details modal)
+  by text    one free-text query
+  batch      --batch technique IDs answered by one sparse product
+  loop       one query scored pair by pair in Python, for comparison
+
+Usage:
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --source enterprise-attack.json --queries 500
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+from app.services import build_documents
+from app.similarity import SimilarityModel, description_terms
+from app.sources import iter_local_objects
+from benchmarks.bench_transform import PHASES, PLATFORMS
+
+# Synthetic descriptions draw from a Zipf-like vocabulary, like natural text
+VOCABULARY = [f"term{index}" for index in range(8000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def make_documents(count: int) -> List[dict]:
+    rng = random.Random(42)
+    return [
+        {
+            "id": f"T{1000 + index // 10}.{index % 10:03d}",
+            "name": f"Technique {index}",
+            "description": " ".join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(40, 400))),
+            "kill_chain_phases": [{"phase_name": phase} for phase in rng.sample(PHASES, k=rng.randint(1, 3))],
+            "x_mitre_platforms": rng.sample(PLATFORMS, k=rng.randint(1, 4))
+        }
+        for index in range(count)
+    ]
+
+
+def load_documents(source: str) -> List[dict]:
+    return build_documents(list(iter_local_objects(source)))
+
+
+def loop_similar(documents: List[dict], pattern_id: str, k: int) -> List[str]:
+    """Cosine similarity of term counts computed pair by pair, as a per-request loop would"""
+    vectors = [Counter(description_terms(document["description"])) for document in documents]
+    query = next(vector for vector, document in zip(vectors, documents) if document["id"] == pattern_id)
+    query_norm = math.sqrt(sum(count * count for count in query.values()))
+    scores = []
+    for vector, document in zip(vectors, documents):
+        if document["id"] == pattern_id:
+            continue
+        dot = sum(count * vector.get(term, 0) for term, count in query.items())
+        norm = math.sqrt(sum(count * count for count in vector.values()))
+        scores.append((dot / (query_norm * norm or 1), document["id"]))
+    return [pattern_id for _, pattern_id in sorted(scores, reverse=True)[:k]]
+
+
+def latencies(run: Callable[[int], object], count: int) -> Dict[str, float]:
+    """p50/p99 milliseconds over ``count`` runs"""
+    timings = []
+    for number in range(count):
+        start = time.perf_counter()
+        run(number)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50": statistics.median(timings), "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1500, help="Synthetic techniques (ignored with --source)")
+    parser.add_argument("--source", help="STIX bundle, directory or tarball to load instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed per path")
+    parser.add_argument("--batch", type=int, default=100, help="Technique IDs per batched query")
+    parser.add_argument("-k", type=int, default=10, help="Similar techniques per query")
+    args = parser.parse_args()
+
+    documents = load_documents(args.source) if args.source else make_documents(args.documents)
+    start = time.perf_counter()
+    model = SimilarityModel(documents)
+    build = (time.perf_counter() - start) * 1000
+    print(f"{len(model)} techniques, {len(model.vocabulary)} terms, {model.tfidf.nnz} non-zeros, k={args.k}")
+    print(f"{'build':>8} {build:>9.1f} ms")
+
+    ids = model.ids
+    texts = [documents[number % len(documents)]["description"][:200] for number in range(args.queries)]
+    rows = [
+        ("by id", latencies(lambda number: model.similar(args.k, ids=[ids[number % len(ids)]]), args.queries), 1),
+        ("by text", latencies(lambda number: model.similar(args.k, texts=[texts[number]]), args.queries), 1),
+        ("batch", latencies(
+            lambda number: model.similar(args.k, ids=[ids[(number + i) % len(ids)] for i in range(args.batch)]),
+            max(args.queries // args.batch, 5)
+        ), args.batch),
+        ("loop", latencies(lambda number: loop_similar(documents, ids[number % len(ids)], args.k), 3), 1),
+    ]
+    print(f"{'path':>8} {'p50 ms':>9} {'p99 ms':>9} {'ms/query':>9}")
+    for name, timing, size in rows:
+        print(f"{name:>8} {timing['p50']:>9.2f} {timing['p99']:>9.2f} {timing['p50'] / size:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
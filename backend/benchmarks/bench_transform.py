@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark STIX transformation throughput across transform worker counts
+
+Generates a synthetic multi-domain bundle (100k objects by default) and times
+the fetch -> transform stages of ingestion for each worker count. The parent
+CPU column is the time the ingesting process itself spends on the CPU; with
+workers it bounds how far adding cores can speed the transform up.
+
+Usage:
+    python -m benchmarks.bench_transform
+    python -m benchmarks.bench_transform --objects 20000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from app.services import MITREAttackService
+
+DOMAINS = ["enterprise-attack", "mobile-attack", "ics-attack"]
+PLATFORMS = ["Windows", "Linux", "macOS", "Android", "iOS", "Network", "Containers", "IaaS"]
+PHASES = ["initial-access", "execution", "persistence", "privilege-escalation", "defense-evasion",
+          "credential-access", "discovery", "lateral-movement", "collection", "exfiltration"]
+WORDS = ["adversaries", "may", "abuse", "process", "injection", "credential", "registry", "network",
+         "traffic", "payload", "execute", "command", "scripting", "interpreter", "persistence", "service"]
+
+
+def make_object(index: int, rng: random.Random) -> dict:
+    """Build one synthetic object; roughly one in ten is not an attack pattern"""
+    if index % 10 == 9:
+        return {"type": "relationship", "id": f"relationship--{index}", "relationship_type": "uses"}
+    external_id = f"T{1000 + index // 10}.{index % 10:03d}"
+    return {
+        "type": "attack-pattern",
+        "id": f"attack-pattern--{index}",
+        "name": " ".join(rng.choices(WORDS, k=3)).title(),
+        "description": " ".join(rng.choices(WORDS, k=120)),
+        "x_mitre_detection": " ".join(rng.choices(WORDS, k=40)),
+        "x_mitre_platforms": rng.sample(PLATFORMS, k=rng.randint(1, 4)),
+        "x_mitre_domains": [rng.choice(DOMAINS)],
+        "x_mitre_data_sources": [f"Process: {rng.choice(WORDS)}" for _ in range(3)],
+        "x_mitre_version": "1.0",
+        "x_mitre_is_subtechnique": index % 3 == 0,
+        "kill_chain_phases": [
+            {"kill_chain_name": "mitre-attack", "phase_name": phase}
+            for phase in rng.sample(PHASES, k=rng.randint(1, 3))
+        ],
+        "external_references": [
+            {"source_name": "mitre-attack", "external_id": external_id,
+             "url": f"https://attack.mitre.org/techniques/{external_id}"},
+            {"source_name": "capec", "external_id": f"CAPEC-{index}"},
+        ],
+        "created": "2020-01-01T00:00:00.000Z",
+        "modified": "2023-01-01T00:00:00.000Z",
+    }
+
+
+def write_bundle(path: str, count: int) -> None:
+    """Write a synthetic bundle object by object so generation stays cheap on memory"""
+    rng = random.Random(42)
+    with open(path, "w") as f:
+        f.write('{"type": "bundle", "id": "bundle--synthetic", "objects": [')
+        for index in range(count):
+            if index:
+                f.write(",")
+            json.dump(make_object(index, rng), f)
+        f.write("]}")
+
+
+async def run(path: str, workers: int) -> tuple[int, float, float]:
+    """Time transforming the whole bundle with the given number of worker processes"""
+    service = MITREAttackService(source_path=path, transform_workers=workers)
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    count = 0
+    async for _document in service.iter_documents():
+        count += 1
+    return count, time.perf_counter() - start, time.process_time() - start_cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=100_000, help="Number of STIX objects in the bundle")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic-attack.json")
+        write_bundle(path, args.objects)
+        print(f"Bundle: {args.objects} objects, {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'documents':>10} {'seconds':>9} {'docs/s':>9} {'speedup':>8} {'parent CPU s':>13}")
+        baseline = None
+        for workers in args.workers:
+            count, elapsed, parent_cpu = asyncio.run(run(path, workers))
+            baseline = baseline or elapsed
+            print(
+                f"{workers:>8} {count:>10} {elapsed:>9.2f} {count / elapsed:>9.0f} "
+                f"{baseline / elapsed:>7.2f}x {parent_cpu:>13.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
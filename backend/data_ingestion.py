@@ -2,8 +2,14 @@
 """
 Data ingestion script for MITRE ATT&CK attack patterns
 Run this script to populate the database with attack pattern data
+
+Usage:
+    python data_ingestion.py                          # fetch from the MITRE CTI GitHub repository
+    python data_ingestion.py enterprise-attack.json   # read a local STIX bundle (offline)
+    python data_ingestion.py cti/attack-pattern/      # read a directory or tarball of per-technique files
 """
 
+import argparse
 import asyncio
 import logging
 import os
@@ -21,18 +27,66 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Ingest MITRE ATT&CK attack patterns into MongoDB")
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default=os.getenv("MITRE_SOURCE_PATH"),
+        help="Local STIX bundle, directory or tarball of per-technique files (default: fetch from GitHub)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent downloads when fetching from GitHub"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes used to parse and transform STIX sources (default: 1, in-process)"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=MITREAttackService.INGEST_MODES,
+        default="replace",
+        help=(
+            "replace or swap: load and index a staging collection, then atomically rename it over the live one; "
+            "incremental: only write changed patterns"
+        )
+    )
+    parser.add_argument(
+        "--min-swap-fraction",
+        type=float,
+        default=None,
+        help=(
+            "Refuse a replace or swap that would leave fewer than this fraction of the live patterns "
+            "(default: MITRE_MIN_SWAP_FRACTION or 0.9; 0 disables the check)"
+        )
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
     """Main function to ingest MITRE ATT&CK data"""
+    args = parse_args(argv)
     try:
         logger.info("Starting MITRE ATT&CK data ingestion...")
         
         # Create service instance
-        service = MITREAttackService()
+        service = MITREAttackService(
+            concurrency=args.concurrency,
+            source_path=args.source,
+            transform_workers=args.workers,
+            min_swap_fraction=args.min_swap_fraction
+        )
         
         # Ingest data
-        count = await service.ingest_data()
+        count = await service.ingest_data(mode=args.mode)
         
-        logger.info(f"Data ingestion completed successfully. Inserted {count} attack patterns.")
+        logger.info(f"Data ingestion completed successfully. Ingested {count} attack patterns.")
         
     except Exception as e:
         logger.error(f"Data ingestion failed: {e}")
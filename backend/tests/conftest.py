@@ -2,14 +2,19 @@
 Pytest configuration and fixtures for the cybersecurity intelligence app
 """
 import asyncio
+import json
+import threading
 import pytest
 import pytest_asyncio
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from typing import AsyncGenerator, Generator
+from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.main import app
 from app.database import get_database, connect_to_mongo, close_mongo_connection
-from app.services import MITREAttackService, AttackPatternService
+from app.routers import get_attack_service
+from app.services import MITREAttackService, AttackPatternService, invalidate_read_caches
 
 
 @pytest.fixture(scope="session")
@@ -91,6 +96,81 @@ async def sample_attack_patterns(test_db) -> list[dict]:
     return sample_patterns
 
 
+def make_stix_bundle(external_id: str, name: str, **fields) -> dict:
+    """Build a minimal STIX bundle holding a single attack pattern."""
+    attack_pattern = {
+        "type": "attack-pattern",
+        "id": f"attack-pattern--{external_id.lower()}",
+        "name": name,
+        "description": f"Description of {name}",
+        "x_mitre_platforms": ["Windows"],
+        "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "execution"}],
+        "external_references": [{"source_name": "mitre-attack", "external_id": external_id}],
+        "created": "2020-01-01T00:00:00.000Z",
+        "modified": "2020-01-01T00:00:00.000Z",
+    }
+    attack_pattern.update(fields)
+    return {"type": "bundle", "id": f"bundle--{external_id.lower()}", "objects": [attack_pattern]}
+
+
+@pytest.fixture
+def stix_dir(tmp_path):
+    """Directory of per-technique STIX files, laid out like mitre/cti."""
+    directory = tmp_path / "attack-pattern"
+    directory.mkdir()
+    for number in range(1, 21):
+        external_id = f"T{1000 + number}"
+        bundle = make_stix_bundle(external_id, f"Technique {number}")
+        (directory / f"attack-pattern--{external_id.lower()}.json").write_text(json.dumps(bundle))
+    return directory
+
+
+@pytest.fixture
+def stix_server(stix_dir) -> Generator[dict, None, None]:
+    """Local stand-in for the GitHub contents API serving a directory of STIX files.
+
+    ``/index`` returns a GitHub-style listing; paths registered in ``failures``
+    answer 503 that many times before succeeding.
+    """
+    state = {"failures": {}, "requests": 0}
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(stix_dir), **kwargs)
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            state["requests"] += 1
+            if self.path == "/index":
+                base_url = f"http://127.0.0.1:{self.server.server_port}"
+                listing = [
+                    {"name": path.name, "download_url": f"{base_url}/{path.name}"}
+                    for path in sorted(stix_dir.iterdir())
+                ]
+                body = json.dumps(listing).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if state["failures"].get(self.path, 0) > 0:
+                state["failures"][self.path] -= 1
+                self.send_error(503)
+                return
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["index_url"] = f"http://127.0.0.1:{server.server_port}/index"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture
 def mitre_service() -> MITREAttackService:
     """Create a MITRE attack service instance for testing."""
@@ -110,6 +190,38 @@ async def setup_test_environment():
     pass
 
 
+@pytest.fixture(autouse=True)
+def reset_read_caches():
+    """Keep module-level read caches from leaking between tests."""
+    invalidate_read_caches()
+    yield
+    invalidate_read_caches()
+
+
+@pytest.fixture
+def api_service() -> MagicMock:
+    """Stand-in AttackPatternService injected into the API by service_client."""
+    service = MagicMock(spec=AttackPatternService)
+    service.timings = {}
+    service.get_data_stamp = AsyncMock(return_value={"version": 1, "updated_at": None})
+    service.get_data_version = AsyncMock(return_value=1)
+    return service
+
+
+@pytest.fixture
+def service_client(api_service) -> Generator[TestClient, None, None]:
+    """Client for the API with the service dependency overridden; never connects to MongoDB."""
+    app.dependency_overrides[get_attack_service] = lambda: api_service
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_attack_service, None)
+
+
+@pytest.fixture
+def mongo_search(monkeypatch):
+    """Serve searches with MongoDB queries instead of the in-memory search index."""
+    monkeypatch.setattr("app.services.SEARCH_INDEX_ENABLED", False)
+
+
 @pytest.fixture(autouse=True)
 async def cleanup_test_environment():
     """Cleanup test environment after each test."""
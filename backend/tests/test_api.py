@@ -1,10 +1,13 @@
 """
 API endpoint tests for the cybersecurity intelligence app
 """
+import json
 import pytest
+from bson import ObjectId
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
 from app.main import app
+from app.models import AttackPatternResponse, AttackPatternSummary, SUMMARY_FIELDS
 
 
 class TestHealthEndpoint:
@@ -159,3 +162,226 @@ class TestCORS:
         assert "Access-Control-Allow-Origin" in response.headers
         assert "Access-Control-Allow-Methods" in response.headers
         assert "Access-Control-Allow-Headers" in response.headers
+
+
+def stored_pattern(number):
+    """A stored attack pattern document as returned by AttackPatternService."""
+    return {
+        "_id": ObjectId(f"{number:024x}"),
+        "id": f"attack-pattern--{number}",
+        "name": f"Technique {number}",
+        "description": "A long description " * 20,
+        "x_mitre_platforms": ["Windows"],
+        "x_mitre_detection": "Monitor processes",
+        "phase_name": "execution",
+        "external_id": f"T{1000 + number}",
+        "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "execution"}],
+        "external_references": [],
+        "created_at": "2023-01-01T00:00:00",
+        "modified_at": "2023-01-01T00:00:00"
+    }
+
+
+async def stream_of(patterns):
+    for pattern in patterns:
+        yield pattern
+
+
+class TestDashboardStreaming:
+    """Test cases for streaming /dashboard-data as NDJSON"""
+    
+    def test_ndjson_streams_one_pattern_per_line(self, service_client: TestClient, api_service):
+        """Test that every pattern is written as its own JSON line"""
+        patterns = [stored_pattern(n) for n in range(1, 301)]
+        api_service.count_patterns = AsyncMock(return_value=300)
+        api_service.iter_patterns.return_value = stream_of(patterns)
+        
+        response = service_client.get("/api/v1/dashboard-data?format=ndjson")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["x-total-count"] == "300"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["external_id"] for line in lines] == [p["external_id"] for p in patterns]
+        assert "_id" not in lines[0]
+    
+    def test_accept_header_selects_ndjson_with_projection(self, service_client: TestClient, api_service):
+        """Test NDJSON negotiation through Accept and field projection of streamed lines"""
+        api_service.count_patterns = AsyncMock(return_value=1)
+        api_service.iter_patterns.return_value = stream_of([stored_pattern(1)])
+        
+        response = service_client.get(
+            "/api/v1/dashboard-data?view=summary",
+            headers={"Accept": "application/x-ndjson"}
+        )
+        
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert set(json.loads(response.text)) == {
+            "id", "name", "external_id", "phase_name", "x_mitre_platforms", "kill_chain_phases"
+        }
+        api_service.iter_patterns.assert_called_once_with(
+            ["id", "name", "external_id", "phase_name", "x_mitre_platforms", "kill_chain_phases"]
+        )
+    
+    def test_json_remains_the_default(self, service_client: TestClient, api_service):
+        """Test that the buffered SearchResponse is still returned by default"""
+        api_service.get_all_patterns = AsyncMock(return_value=([stored_pattern(1)], 1))
+        
+        response = service_client.get("/api/v1/dashboard-data")
+        
+        assert response.json()["total"] == 1
+        api_service.iter_patterns.assert_not_called()
+
+
+class TestListSerialization:
+    """Test cases for list endpoints serialized without response model re-validation"""
+    
+    def test_search_response_body_and_timings(self, service_client: TestClient, api_service):
+        """Test that search returns SearchResponse JSON and reports its stages"""
+        api_service.search_patterns = AsyncMock(return_value=([stored_pattern(1)], 1))
+        api_service.timings = {"index_search": 0.5}
+        
+        response = service_client.post("/api/v1/attack-patterns/search", json={"query": "technique", "limit": 1})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"][0]["external_id"] == "T1001"
+        assert set(data["results"][0]) == set(AttackPatternResponse.model_fields)
+        assert data["total"] == 1
+        assert data["next_cursor"] is not None
+        assert response.headers["server-timing"].startswith("index_search;dur=0.50, convert;dur=")
+    
+    def test_list_summary_view(self, service_client: TestClient, api_service):
+        """Test that projections are honoured by the fast path"""
+        api_service.get_all_patterns = AsyncMock(return_value=([stored_pattern(1)], 1))
+        
+        response = service_client.get("/api/v1/attack-patterns?view=summary")
+        
+        assert set(response.json()["results"][0]) == set(AttackPatternSummary.model_fields)
+
+
+class TestStatsBreakdown:
+    """Test cases for the filtered statistics endpoint"""
+    
+    def test_repeated_query_parameters_become_filter_lists(self, service_client: TestClient, api_service):
+        """Test that each filter accepts several values"""
+        api_service.get_stats_breakdown = AsyncMock(return_value={"total_patterns": 3})
+        
+        response = service_client.get("/api/v1/stats/breakdown?platform=Windows&platform=Linux&subtechnique=false")
+        
+        assert response.json() == {"total_patterns": 3}
+        api_service.get_stats_breakdown.assert_called_once_with({
+            "phase": None,
+            "platform": ["Windows", "Linux"],
+            "domain": None,
+            "data_source": None,
+            "subtechnique": False,
+            "deprecated": None
+        })
+
+
+class TestTechniqueGraph:
+    """Test cases for the technique neighbors and relationship graph endpoints"""
+    
+    def test_neighbors_of_a_pattern(self, service_client: TestClient, api_service):
+        """Test that a pattern's neighbors are returned with their score components"""
+        neighbor = {"id": "T1574", "name": "Hijack Execution Flow", "score": 0.7, "type": "phase",
+                    "phase": 0.3, "platform": 0.2, "keyword": 0.2}
+        api_service.get_neighbors = AsyncMock(return_value=[neighbor])
+        
+        response = service_client.get("/api/v1/attack-patterns/T1055/neighbors?k=3")
+        
+        assert response.status_code == 200
+        assert response.json() == {"id": "T1055", "neighbors": [neighbor]}
+        api_service.get_neighbors.assert_called_once_with("T1055", 3)
+    
+    def test_neighbors_of_unknown_pattern(self, service_client: TestClient, api_service):
+        """Test that a missing pattern is a 404"""
+        api_service.get_neighbors = AsyncMock(side_effect=ValueError("Attack pattern with ID T9999 not found"))
+        
+        response = service_client.get("/api/v1/attack-patterns/T9999/neighbors")
+        
+        assert response.status_code == 404
+    
+    def test_graph_parameters_are_bounded(self, service_client: TestClient, api_service):
+        """Test that k cannot exceed the neighbors stored per technique"""
+        api_service.get_technique_graph = AsyncMock(return_value={"version": 1, "k": 10, "edges": []})
+        
+        assert service_client.get("/api/v1/technique-graph?k=50").status_code == 422
+        assert service_client.get("/api/v1/technique-graph?k=5&min_score=0.5").json()["edges"] == []
+        api_service.get_technique_graph.assert_called_once_with(5, 0.5)
+
+
+class TestSimilarTechniques:
+    """Test cases for the similar techniques endpoints"""
+    
+    def test_batch_request_is_passed_through(self, service_client: TestClient, api_service):
+        """Test that IDs and texts are answered in one service call"""
+        api_service.timings = {"similar": 0.4}
+        api_service.find_similar = AsyncMock(return_value=[
+            {"query": "T1055", "kind": "id", "found": True, "similar": [{"id": "T1574", "name": "Hijack", "score": 0.5}]}
+        ])
+        
+        response = service_client.post("/api/v1/attack-patterns/similar", json={"ids": ["T1055"], "texts": ["dll"], "k": 3})
+        
+        assert response.status_code == 200
+        assert response.json()["results"][0]["similar"][0]["id"] == "T1574"
+        assert response.headers["Server-Timing"] == "similar;dur=0.40"
+        api_service.find_similar.assert_called_once_with(3, ids=["T1055"], texts=["dll"])
+    
+    def test_empty_batch_is_rejected(self, service_client: TestClient, api_service):
+        """Test that a request without IDs or texts is a 400"""
+        response = service_client.post("/api/v1/attack-patterns/similar", json={"k": 3})
+        
+        assert response.status_code == 400
+    
+    def test_similar_to_unknown_pattern(self, service_client: TestClient, api_service):
+        """Test that a missing pattern is a 404"""
+        api_service.get_similar = AsyncMock(side_effect=ValueError("Attack pattern with ID T9999 not found"))
+        
+        response = service_client.get("/api/v1/attack-patterns/T9999/similar?k=5")
+        
+        assert response.status_code == 404
+        api_service.get_similar.assert_called_once_with("T9999", 5)
+
+
+class TestBulkLookup:
+    """Test cases for the bulk ID lookup endpoint"""
+    
+    def test_results_are_keyed_by_id(self, service_client: TestClient, api_service):
+        """Test that found patterns are keyed by requested ID and missing IDs listed"""
+        api_service.get_patterns_by_ids = AsyncMock(return_value=({"T1001": stored_pattern(1)}, ["T9999"]))
+        
+        response = service_client.post("/api/v1/attack-patterns/lookup", json={"ids": ["T1001", "T9999"], "view": "summary"})
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["missing"] == ["T9999"]
+        assert body["results"]["T1001"]["name"] == "Technique 1"
+        assert set(body["results"]["T1001"]) == set(SUMMARY_FIELDS)
+        api_service.get_patterns_by_ids.assert_called_once_with(["T1001", "T9999"], SUMMARY_FIELDS)
+        assert "convert;dur=" in response.headers["Server-Timing"]
+    
+    def test_empty_id_list_is_rejected(self, service_client: TestClient, api_service):
+        """Test that at least one ID is required"""
+        response = service_client.post("/api/v1/attack-patterns/lookup", json={"ids": []})
+        
+        assert response.status_code == 422
+
+
+class TestCacheMetrics:
+    """Test cases for the response cache metrics endpoint"""
+    
+    def test_metrics_are_reported(self, service_client: TestClient):
+        """Test that hit/miss counters and the cache size are exposed"""
+        response = service_client.get("/api/v1/metrics/cache")
+        
+        assert response.status_code == 200
+        assert {"enabled", "entries", "max_entries", "hits", "misses", "hit_ratio", "operations"} <= set(response.json())
+    
+    def test_coalescing_metrics_are_reported(self, service_client: TestClient):
+        """Test that executed and coalesced read counts are exposed"""
+        response = service_client.get("/api/v1/metrics/coalescing")
+        
+        assert response.status_code == 200
+        assert set(response.json()) == {"in_flight", "executed", "coalesced", "operations"}
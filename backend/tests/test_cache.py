@@ -0,0 +1,202 @@
+"""
+Tests for in-process cache primitives
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.cache import MISSING, ResponseCache, SingleFlight, TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock for expiry tests"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test cases for TTLCache"""
+    
+    def test_get_missing_key(self):
+        """Test that unknown keys report MISSING"""
+        assert TTLCache(ttl=10).get("absent") is MISSING
+    
+    def test_entries_expire(self):
+        """Test that entries are dropped once their TTL has passed"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.set("key", 0)
+        
+        clock.now = 9.9
+        assert cache.get("key") == 0
+        
+        clock.now = 10
+        assert cache.get("key") is MISSING
+        assert len(cache) == 0
+    
+    def test_oldest_entry_is_evicted(self):
+        """Test that the cache stays within max_entries"""
+        cache = TTLCache(ttl=10, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        
+        assert cache.get("a") is MISSING
+        assert cache.get("b") == 2
+        assert cache.get("c") == 3
+    
+    def test_recently_read_entry_is_kept(self):
+        """Test that eviction picks the least recently used entry, not the oldest"""
+        cache = TTLCache(ttl=10, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        
+        cache.set("c", 3)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+    
+    def test_clear(self):
+        """Test that clear drops all entries"""
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        
+        cache.clear()
+        
+        assert cache.get("a") is MISSING
+
+
+class TestSingleFlight:
+    """Test cases for coalescing concurrent identical calls"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_load(self):
+        """Test that callers arriving while a load runs get its result, and other keys load separately"""
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+        
+        async def load(key):
+            calls.append(key)
+            await release.wait()
+            return key.upper()
+        
+        waiting = [asyncio.ensure_future(flights.do("search", key, lambda key=key: load(key))) for key in "aaab"]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiting)
+        
+        assert results == [("A", False), ("A", True), ("A", True), ("B", False)]
+        assert calls == ["a", "b"]
+        assert len(flights) == 0
+    
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller_and_are_not_kept(self):
+        """Test that a failed load fails all of its callers and the next call runs again"""
+        flights = SingleFlight()
+        load = AsyncMock(side_effect=[ValueError("down"), "up"])
+        
+        results = await asyncio.gather(
+            flights.do("get", "T1", load), flights.do("get", "T1", load), return_exceptions=True
+        )
+        
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        assert await flights.do("get", "T1", load) == ("up", False)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_load(self):
+        """Test that a caller going away leaves the shared load running for the others"""
+        flights = SingleFlight()
+        release = asyncio.Event()
+        
+        async def load():
+            await release.wait()
+            return "done"
+        
+        first = asyncio.ensure_future(flights.do("get", "T1", load))
+        second = asyncio.ensure_future(flights.do("get", "T1", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        
+        assert await second == ("done", True)
+        assert first.cancelled()
+    
+    @pytest.mark.asyncio
+    async def test_metrics(self):
+        """Test the executed and coalesced counters"""
+        flights = SingleFlight()
+        load = AsyncMock(return_value=1)
+        
+        await asyncio.gather(*(flights.do("search", "query", load) for _ in range(3)))
+        await flights.do("get", "T1", load)
+        
+        assert flights.metrics() == {
+            "in_flight": 0,
+            "executed": 2,
+            "coalesced": 2,
+            "operations": {"get": {"executed": 1, "coalesced": 0}, "search": {"executed": 1, "coalesced": 2}}
+        }
+
+
+class TestResponseCache:
+    """Test cases for the read-through response cache"""
+    
+    @pytest.mark.asyncio
+    async def test_results_are_loaded_once(self):
+        """Test that a miss loads and stores the result and a hit reuses it"""
+        cache = ResponseCache(TTLCache(ttl=10))
+        load = AsyncMock(return_value=[1, 2])
+        
+        first = await cache.get_or_load("search", "query", load)
+        second = await cache.get_or_load("search", "query", load)
+        
+        assert first == ([1, 2], "load")
+        assert second == ([1, 2], "cache")
+        load.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self):
+        """Test that identical misses in flight together share one load"""
+        cache = ResponseCache(TTLCache(ttl=10))
+        load = AsyncMock(return_value=[1, 2])
+        
+        results = await asyncio.gather(*(cache.get_or_load("search", "query", load) for _ in range(5)))
+        
+        assert results == [([1, 2], "load")] + [([1, 2], "coalesced")] * 4
+        load.assert_awaited_once()
+        assert cache.flights.coalesced["search"] == 4
+    
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        """Test that an exception from the loader reaches the caller and the next call retries"""
+        cache = ResponseCache(TTLCache(ttl=10))
+        load = AsyncMock(side_effect=[ValueError("not found"), "found"])
+        
+        with pytest.raises(ValueError):
+            await cache.get_or_load("get", "T1", load)
+        
+        assert await cache.get_or_load("get", "T1", load) == ("found", "load")
+    
+    @pytest.mark.asyncio
+    async def test_metrics_count_hits_and_misses_per_operation(self):
+        """Test the overall and per-operation counters"""
+        cache = ResponseCache(TTLCache(ttl=10, max_entries=8))
+        for key in ("a", "a", "a", "b"):
+            await cache.get_or_load("search", key, AsyncMock(return_value=key))
+        await cache.get_or_load("get", "T1", AsyncMock(return_value={}))
+        
+        metrics = cache.metrics()
+        
+        assert metrics == {
+            "entries": 3,
+            "max_entries": 8,
+            "hits": 2,
+            "misses": 3,
+            "hit_ratio": 0.4,
+            "operations": {"get": {"hits": 0, "misses": 1}, "search": {"hits": 2, "misses": 2}}
+        }
@@ -0,0 +1,99 @@
+"""
+Tests for ETag / Last-Modified validation of data responses
+"""
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.conditional import entity_tag, etag_matches, not_modified_since
+
+UPDATED_AT = datetime(2024, 5, 1, 12, 0, 30, 250000, tzinfo=timezone.utc)
+
+
+class TestValidators:
+    """Test cases for comparing request validators"""
+    
+    def test_entity_tag_varies_by_version_and_representation(self):
+        """Test that each dataset version and representation has its own tag"""
+        assert entity_tag(3, "application/json") == entity_tag(3, "application/json")
+        assert entity_tag(3, "application/json") != entity_tag(4, "application/json")
+        assert entity_tag(3, "application/json") != entity_tag(3, "application/msgpack")
+        assert entity_tag(3, "application/json", "br") != entity_tag(3, "application/json", "identity")
+    
+    def test_if_none_match_lists_and_wildcard(self):
+        """Test that any listed tag, weak or strong, matches and * is left to the endpoint"""
+        etag = entity_tag(3, "")
+        
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert not etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+    
+    def test_if_modified_since_uses_whole_seconds(self):
+        """Test that the HTTP date of the last change counts as not modified"""
+        assert not_modified_since("Wed, 01 May 2024 12:00:30 GMT", UPDATED_AT)
+        assert not not_modified_since("Wed, 01 May 2024 12:00:29 GMT", UPDATED_AT)
+        assert not not_modified_since("not a date", UPDATED_AT)
+
+
+class TestConditionalGet:
+    """Test cases for conditional GETs through the API"""
+    
+    def test_data_responses_carry_validators(self, service_client: TestClient, api_service):
+        """Test that a data endpoint returns an ETag, Last-Modified and no-cache"""
+        api_service.get_data_stamp.return_value = {"version": 5, "updated_at": UPDATED_AT}
+        api_service.get_stats = AsyncMock(return_value={"total_patterns": 3})
+        
+        response = service_client.get("/api/v1/stats")
+        
+        assert response.status_code == 200
+        request_headers = response.request.headers
+        assert response.headers["ETag"] == entity_tag(5, request_headers["accept"], request_headers["accept-encoding"])
+        assert response.headers["Last-Modified"] == "Wed, 01 May 2024 12:00:30 GMT"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert response.headers["Vary"] == "Accept, Accept-Encoding"
+    
+    def test_matching_etag_is_not_modified(self, service_client: TestClient, api_service):
+        """Test that a revalidation for the current version is answered without running the endpoint"""
+        api_service.get_stats = AsyncMock(return_value={"total_patterns": 3})
+        etag = service_client.get("/api/v1/stats").headers["ETag"]
+        
+        response = service_client.get("/api/v1/stats", headers={"If-None-Match": etag})
+        
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        api_service.get_stats.assert_awaited_once()
+    
+    def test_new_version_returns_the_data(self, service_client: TestClient, api_service):
+        """Test that a tag from an older dataset version gets a full response"""
+        api_service.get_stats = AsyncMock(return_value={"total_patterns": 3})
+        etag = service_client.get("/api/v1/stats").headers["ETag"]
+        api_service.get_data_stamp.return_value = {"version": 2, "updated_at": None}
+        
+        response = service_client.get("/api/v1/stats", headers={"If-None-Match": etag})
+        
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    
+    def test_wildcard_runs_the_endpoint(self, service_client: TestClient, api_service):
+        """Test that If-None-Match: * does not hide a missing attack pattern behind a 304"""
+        api_service.get_pattern_by_id = AsyncMock(side_effect=ValueError("Attack pattern with ID T9999 not found"))
+        
+        response = service_client.get("/api/v1/attack-patterns/T9999", headers={"If-None-Match": "*"})
+        
+        assert response.status_code == 404
+        api_service.get_pattern_by_id.assert_awaited_once()
+    
+    def test_if_modified_since(self, service_client: TestClient, api_service):
+        """Test revalidation by date when the client sends no ETag"""
+        api_service.get_data_stamp.return_value = {"version": 5, "updated_at": UPDATED_AT}
+        
+        response = service_client.get("/api/v1/stats", headers={"If-Modified-Since": "Wed, 01 May 2024 12:00:30 GMT"})
+        
+        assert response.status_code == 304
+    
+    def test_errors_and_other_endpoints_are_not_tagged(self, service_client: TestClient, api_service):
+        """Test that only successful data responses get validators"""
+        api_service.get_stats = AsyncMock(side_effect=RuntimeError("database down"))
+        
+        assert "ETag" not in service_client.get("/api/v1/stats").headers
+        assert "ETag" not in service_client.get("/api/v1/health").headers
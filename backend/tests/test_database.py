@@ -3,8 +3,10 @@ Database integration tests for the cybersecurity intelligence app
 """
 import pytest
 from motor.motor_asyncio import AsyncIOMotorClient
-from app.database import connect_to_mongo, close_mongo_connection, get_database
-from app.services import MITREAttackService, AttackPatternService
+from app.database import connect_to_mongo, close_mongo_connection, get_database, stats_pipeline
+from app.replica import ReadReplica
+from app.services import MITREAttackService, AttackPatternService, STATS_FILTER_FIELDS
+from tests.test_replica import make_pattern
 
 
 class TestDatabaseConnection:
@@ -213,4 +215,28 @@ class TestDataConsistency:
         
         # All IDs should be unique
         assert len(ids) == len(set(ids))
-
+    
+    @pytest.mark.database
+    @pytest.mark.asyncio
+    async def test_replica_statistics_match_the_aggregation(self, test_db):
+        """Test that the replica and the stats aggregation agree on repeated phases and missing phase names"""
+        documents = [
+            make_pattern(1, ["execution", "execution"], ["Windows", "Windows", "Linux"]),
+            make_pattern(2, ["persistence"], ["Windows"], kill_chain_phases=[
+                {"kill_chain_name": "mitre-attack", "phase_name": "persistence"},
+                {"kill_chain_name": "mitre-mobile-attack", "phase_name": "persistence"},
+                {"kill_chain_name": "mitre-attack"}
+            ]),
+            make_pattern(3, [], ["macOS"], x_mitre_deprecated=True)
+        ]
+        await test_db.attack_patterns.insert_many([dict(document) for document in documents])
+        
+        facet = (await test_db.attack_patterns.aggregate(stats_pipeline()).to_list(length=1))[0]
+        replica = ReadReplica(documents, version=1, facets=STATS_FILTER_FIELDS)
+        
+        for name in ("phase_distribution", "platform_distribution", "tactic_platform_matrix"):
+            assert replica.stats[name] == facet[name]
+        assert replica.stats["phase_distribution"] == [
+            {"_id": "execution", "count": 1},
+            {"_id": "persistence", "count": 1}
+        ]
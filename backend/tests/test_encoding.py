@@ -0,0 +1,82 @@
+"""
+Tests for response encoding and Accept negotiation
+"""
+from datetime import datetime, timezone
+import msgpack
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+from app.encoding import ENCODERS, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, msgpack_dumps, negotiate, register_encoder
+from app.services import AttackPatternService
+from tests.test_api import stored_pattern
+
+
+class TestNegotiate:
+    """Test cases for choosing a response media type"""
+    
+    @pytest.mark.parametrize("accept, expected", [
+        ("", JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("text/html, application/msgpack;q=0.9, application/json;q=0.8", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0.5, application/json", JSON_MEDIA_TYPE),
+        ("application/json, application/msgpack", JSON_MEDIA_TYPE),
+        ("application/msgpack;q=oops", JSON_MEDIA_TYPE),
+    ])
+    def test_negotiate(self, accept, expected):
+        """Test quality values and client ordering"""
+        assert negotiate(accept) == expected
+
+
+class TestNegotiatedResponses:
+    """Test cases for encoding API responses per request"""
+    
+    def test_json_is_the_default(self, service_client: TestClient):
+        """Test that plain requests get JSON and a Vary header"""
+        response = service_client.get("/api/v1/health")
+        
+        assert response.headers["content-type"] == JSON_MEDIA_TYPE
+        assert response.headers["vary"] == "Accept"
+        assert response.json()["status"] == "healthy"
+    
+    def test_msgpack_on_request(self, service_client: TestClient, api_service):
+        """Test that list endpoints answer in MessagePack when asked"""
+        api_service.get_all_patterns = AsyncMock(return_value=([stored_pattern(1)], 1))
+        
+        response = service_client.get("/api/v1/attack-patterns", headers={"Accept": MSGPACK_MEDIA_TYPE})
+        
+        assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        data = msgpack.unpackb(response.content)
+        assert data["total"] == 1
+        assert data["results"][0]["external_id"] == "T1001"
+    
+    def test_msgpack_stats_from_the_materialized_document(self, service_client: TestClient, api_service):
+        """Test that stored statistics, whose computed_at MongoDB returns naive, encode as MessagePack"""
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.stats.find_one = AsyncMock(return_value={
+            "_id": "attack_patterns", "version": 1, "total_patterns": 3, "computed_at": datetime(2024, 5, 1, 12, 0, 30)
+        })
+        api_service.get_stats = AttackPatternService(database).get_stats
+        
+        response = service_client.get("/api/v1/stats", headers={"Accept": MSGPACK_MEDIA_TYPE})
+        
+        assert response.status_code == 200
+        data = msgpack.unpackb(response.content, timestamp=3)
+        assert data["computed_at"] == datetime(2024, 5, 1, 12, 0, 30, tzinfo=timezone.utc)
+    
+    def test_naive_datetimes_pack_as_utc(self):
+        """Test that the MessagePack encoder treats naive datetimes as UTC instead of failing"""
+        packed = msgpack_dumps({"at": datetime(2024, 5, 1, 12)})
+        
+        assert msgpack.unpackb(packed, timestamp=3)["at"] == datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    
+    def test_registered_encoders_are_offered(self, service_client: TestClient, monkeypatch):
+        """Test that new encoders can be plugged in"""
+        monkeypatch.setattr("app.encoding.ENCODERS", dict(ENCODERS))
+        register_encoder("text/plain", lambda content: repr(content).encode())
+        
+        response = service_client.get("/api/v1/health", headers={"Accept": "text/plain"})
+        
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.startswith("{'status': 'healthy'")
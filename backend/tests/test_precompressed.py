@@ -0,0 +1,120 @@
+"""
+Tests for precompressed dataset and statistics payloads
+"""
+import gzip
+import brotli
+import msgpack
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.encoding import JSON_MEDIA_TYPE
+from app.precompressed import EncodedPayload, choose_coding, get_payload
+from tests.test_api import stored_pattern
+
+
+class TestChooseCoding:
+    """Test cases for choosing a content coding from Accept-Encoding"""
+    
+    @pytest.mark.parametrize("accept_encoding, expected", [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("GZIP;q=0.8", "gzip"),
+        ("gzip;q=0", None),
+    ])
+    def test_choose_coding(self, accept_encoding, expected):
+        """Test quality values, wildcards and the preference for brotli"""
+        assert choose_coding(accept_encoding) == expected
+
+
+class TestEncodedPayload:
+    """Test cases for building and serving encoded payloads"""
+    
+    def test_every_coding_decodes_to_the_body(self):
+        """Test that each stored encoding round-trips and is smaller than the body"""
+        body = b'{"results": [' + b", ".join(b'{"name": "Technique"}' for _ in range(500)) + b"]}"
+        
+        payload = EncodedPayload(body, JSON_MEDIA_TYPE)
+        
+        assert gzip.decompress(payload.encodings["gzip"]) == body
+        assert brotli.decompress(payload.encodings["br"]) == body
+        assert len(payload.encodings["br"]) < len(body)
+    
+    def test_response_headers(self):
+        """Test that the chosen encoding is labelled and caches vary by Accept-Encoding"""
+        payload = EncodedPayload(b"{}", JSON_MEDIA_TYPE)
+        
+        compressed = payload.response("gzip")
+        plain = payload.response("")
+        
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.body == payload.encodings["gzip"]
+        assert compressed.headers["vary"] == "Accept, Accept-Encoding"
+        assert "content-encoding" not in plain.headers
+        assert plain.body == b"{}"
+    
+    @pytest.mark.asyncio
+    async def test_built_once_per_version(self):
+        """Test that a payload is reused within a dataset version and rebuilt for the next"""
+        build = AsyncMock(return_value={"total_patterns": 3})
+        
+        first = await get_payload(1, "stats", JSON_MEDIA_TYPE, build)
+        second = await get_payload(1, "stats", JSON_MEDIA_TYPE, build)
+        await get_payload(2, "stats", JSON_MEDIA_TYPE, build)
+        
+        assert first is second
+        assert build.await_count == 2
+
+
+class TestPrecompressedEndpoints:
+    """Test cases for the dashboard and statistics endpoints serving stored encodings"""
+    
+    def test_dashboard_data_is_compressed_once(self, service_client: TestClient, api_service):
+        """Test that repeated dashboard requests reuse one compressed payload"""
+        api_service.get_all_patterns = AsyncMock(return_value=([stored_pattern(n) for n in range(1, 51)], 50))
+        
+        first = service_client.get("/api/v1/dashboard-data", headers={"Accept-Encoding": "br"})
+        second = service_client.get("/api/v1/dashboard-data", headers={"Accept-Encoding": "gzip"})
+        
+        assert first.headers["content-encoding"] == "br"
+        assert second.headers["content-encoding"] == "gzip"
+        assert first.json() == second.json()
+        assert first.json()["total"] == 50
+        api_service.get_all_patterns.assert_awaited_once()
+    
+    def test_views_are_stored_separately(self, service_client: TestClient, api_service):
+        """Test that the summary view is not answered with the full payload"""
+        api_service.get_all_patterns = AsyncMock(return_value=([stored_pattern(1)], 1))
+        
+        full = service_client.get("/api/v1/dashboard-data")
+        summary = service_client.get("/api/v1/dashboard-data?view=summary")
+        
+        assert "description" in full.json()["results"][0]
+        assert "description" not in summary.json()["results"][0]
+        assert api_service.get_all_patterns.await_count == 2
+    
+    def test_stats_identity_and_msgpack(self, service_client: TestClient, api_service):
+        """Test uncompressed statistics and a separately stored MessagePack payload"""
+        api_service.get_stats = AsyncMock(return_value={"total_patterns": 3})
+        
+        plain = service_client.get("/api/v1/stats", headers={"Accept-Encoding": "identity"})
+        packed = service_client.get("/api/v1/stats", headers={"Accept": "application/msgpack"})
+        
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == {"total_patterns": 3}
+        assert msgpack.unpackb(packed.content) == {"total_patterns": 3}
+    
+    def test_disabled(self, service_client: TestClient, api_service, monkeypatch):
+        """Test that the payloads are rebuilt per request when precompression is off"""
+        monkeypatch.setattr("app.routers.PRECOMPRESSED_RESPONSES_ENABLED", False)
+        api_service.get_stats = AsyncMock(return_value={"total_patterns": 3})
+        
+        service_client.get("/api/v1/stats")
+        response = service_client.get("/api/v1/stats")
+        
+        assert response.json() == {"total_patterns": 3}
+        assert api_service.get_stats.await_count == 2
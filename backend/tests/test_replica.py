@@ -0,0 +1,107 @@
+"""
+Tests for the in-memory read replica of the attack pattern collection
+"""
+import pytest
+from bson import ObjectId
+from app.replica import ReadReplica
+from app.services import STATS_FILTER_FIELDS
+
+
+def make_pattern(number, phases, platforms, subtechnique=False, **fields):
+    """A stored attack pattern document with the facet fields set."""
+    return {
+        "_id": ObjectId(f"{number:024x}"),
+        "id": f"T{1000 + number}",
+        "name": f"Technique {number}",
+        "description": f"Description of technique {number}",
+        "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": phase} for phase in phases],
+        "x_mitre_platforms": platforms,
+        "x_mitre_domains": ["enterprise-attack"],
+        "x_mitre_is_subtechnique": subtechnique,
+        **fields
+    }
+
+
+@pytest.fixture
+def replica():
+    return ReadReplica([
+        make_pattern(1, ["execution"], ["Windows", "Linux"]),
+        make_pattern(2, ["execution", "persistence"], ["Windows"], subtechnique=True),
+        make_pattern(3, ["persistence"], ["macOS"], x_mitre_deprecated=True),
+        make_pattern(4, ["defense-evasion"], ["Linux"], subtechnique=True, x_mitre_deprecated=False),
+    ], version=7, facets=STATS_FILTER_FIELDS)
+
+
+class TestReadReplica:
+    """Test cases for lookups, pages and bitmap statistics"""
+    
+    def test_lookup_and_pages(self, replica):
+        """Test ID lookups and offset and _id-keyset pages in _id order"""
+        assert replica.get("T1003")["name"] == "Technique 3"
+        assert replica.get("T9999") is None
+        assert [p["id"] for p in replica.page(2, offset=1)] == ["T1002", "T1003"]
+        assert [p["id"] for p in replica.page(10, after=ObjectId(f"{2:024x}"))] == ["T1003", "T1004"]
+    
+    def test_facet_strings_are_interned(self):
+        """Test that equal facet values from separate documents are one string object"""
+        first, second = (make_pattern(n, ["execution"], ["".join(["Win", "dows"])]) for n in (1, 2))
+        
+        replica = ReadReplica([first, second], version=1, facets=STATS_FILTER_FIELDS)
+        
+        assert replica.records[0]["x_mitre_platforms"][0] is replica.records[1]["x_mitre_platforms"][0]
+    
+    def test_records_keep_exactly_the_stored_fields(self):
+        """Test that slotted records give back the stored document, extra fields included and missing ones left out"""
+        pattern = make_pattern(1, ["execution"], ["Windows"], x_custom={"note": "kept"})
+
+        replica = ReadReplica([dict(pattern)], version=1, facets=STATS_FILTER_FIELDS)
+
+        assert not hasattr(replica.records[0], "__dict__")
+        assert replica.get("T1001") == pattern
+        assert "x_mitre_deprecated" not in replica.records[0]
+        assert replica.page(1)[0] == pattern
+
+    def test_select_ors_within_and_ands_across_facets(self, replica):
+        """Test that several values of one filter match any, and filters combine"""
+        assert replica.select({}) == 0b1111
+        assert replica.select({"platform": ["Windows", "macOS"]}) == 0b0111
+        assert replica.select({"platform": ["Linux"], "subtechnique": True}) == 0b1000
+        assert replica.select({"deprecated": False}) == 0b1000
+        with pytest.raises(ValueError):
+            replica.select({"colour": "red"})
+    
+    def test_statistics(self, replica):
+        """Test that the bitmap statistics have the shape and counts of the aggregation"""
+        stats = replica.statistics({"platform": ["Windows", "Linux"]})
+        
+        assert stats["version"] == 7
+        assert stats["total_patterns"] == 3
+        assert stats["phase_distribution"] == [
+            {"_id": "execution", "count": 2},
+            {"_id": "defense-evasion", "count": 1},
+            {"_id": "persistence", "count": 1}
+        ]
+        assert stats["platform_distribution"] == [{"_id": "Linux", "count": 2}, {"_id": "Windows", "count": 2}]
+        assert {"tactic": "execution", "platform": "Windows", "count": 2} in stats["tactic_platform_matrix"]
+        assert stats["subtechnique_count"] == 2
+        assert stats["deprecated_count"] == 0
+        assert replica.stats["total_patterns"] == 4
+    
+    def test_repeated_values_count_once(self):
+        """Test that a value repeated within one technique counts once and a missing phase name not at all"""
+        pattern = make_pattern(1, ["execution", "execution"], ["Windows", "Windows"])
+        pattern["kill_chain_phases"].append({"kill_chain_name": "mitre-attack"})
+        
+        stats = ReadReplica([pattern], version=1, facets=STATS_FILTER_FIELDS).stats
+        
+        assert stats["phase_distribution"] == [{"_id": "execution", "count": 1}]
+        assert stats["platform_distribution"] == [{"_id": "Windows", "count": 1}]
+        assert stats["tactic_platform_matrix"] == [{"tactic": "execution", "platform": "Windows", "count": 1}]
+    
+    def test_no_matches(self, replica):
+        """Test statistics for a filter nothing matches"""
+        stats = replica.statistics({"platform": "Android"})
+        
+        assert stats["total_patterns"] == 0
+        assert stats["phase_distribution"] == []
+        assert stats["tactic_platform_matrix"] == []
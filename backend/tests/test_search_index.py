@@ -0,0 +1,128 @@
+"""
+Tests for the in-memory attack pattern search index
+"""
+import pytest
+from bson import ObjectId
+from app.search_index import SearchIndex, SuggestionIndex, field_values, tokenize
+
+
+def make_pattern(external_id, name, description="", **fields):
+    """A minimal attack pattern document as stored in MongoDB."""
+    return {
+        "_id": ObjectId(),
+        "id": f"attack-pattern--{external_id}",
+        "external_id": external_id,
+        "name": name,
+        "description": description,
+        "x_mitre_platforms": fields.pop("platforms", ["Windows"]),
+        "phase_name": fields.pop("phase_name", "execution"),
+        "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "execution"}],
+        "external_references": [{"source_name": "mitre-attack", "external_id": external_id}],
+        **fields
+    }
+
+
+@pytest.fixture
+def index():
+    return SearchIndex([
+        make_pattern("T1055", "Process Injection", "Adversaries may inject code into processes."),
+        make_pattern("T1027", "Obfuscated Files or Information", "Adversaries may obfuscate payloads."),
+        make_pattern("T1059.001", "PowerShell", "Adversaries may abuse PowerShell commands.", platforms=["Windows"]),
+        make_pattern("T1574.002", "DLL Side-Loading", "Adversaries may hijack DLL injection order.", platforms=["Linux"]),
+    ], version=3)
+
+
+class TestTokenization:
+    """Test cases for tokenizing field values"""
+    
+    def test_tokenize_lowercases_and_splits(self):
+        """Test that punctuation separates tokens"""
+        assert tokenize("DLL Side-Loading (T1574.002)") == ["dll", "side", "loading", "t1574", "002"]
+    
+    def test_field_values_descend_into_lists(self):
+        """Test that dotted paths reach into arrays of subdocuments like MongoDB"""
+        document = make_pattern("T1055", "Process Injection")
+        
+        assert list(field_values(document, "external_references.external_id")) == ["T1055"]
+        assert list(field_values(document, "x_mitre_platforms")) == ["Windows"]
+        assert list(field_values(document, "missing.field")) == []
+
+
+class TestSearchIndex:
+    """Test cases for ranking and paging index searches"""
+    
+    def test_name_matches_rank_above_description_matches(self, index):
+        """Test that BM25 field weights favour technique names"""
+        patterns, total = index.search("injection", limit=10)
+        
+        assert total == 2
+        assert [p["external_id"] for p in patterns] == ["T1055", "T1574.002"]
+        assert patterns[0]["_score"] > patterns[1]["_score"]
+    
+    def test_substring_queries_match_inside_terms(self, index):
+        """Test that partial words match like the regex fallback did"""
+        patterns, _ = index.search("obfusc", limit=10)
+        
+        assert [p["external_id"] for p in patterns] == ["T1027"]
+        assert index.count("jection") == 2
+    
+    def test_short_tokens_match_by_prefix(self, index):
+        """Test that tokens too short for n-grams still match term prefixes"""
+        assert [p["external_id"] for p in index.search("po", limit=10)[0]] == ["T1059.001"]
+    
+    def test_external_ids_are_searchable(self, index):
+        """Test lookups by technique and sub-technique ID"""
+        assert [p["name"] for p in index.search("T1059.001", limit=10)[0]] == ["PowerShell"]
+        assert index.count("t1574") == 1
+    
+    def test_every_query_token_must_match(self, index):
+        """Test that multi-word queries are conjunctive"""
+        assert index.count("dll injection") == 1
+        assert index.count("dll powershell") == 0
+        assert index.count("!!") == 0
+    
+    def test_offset_and_after_paging_agree(self, index):
+        """Test that cursor-style paging returns the same pages as offset paging"""
+        first_page, _ = index.search("adversaries", limit=2)
+        
+        by_offset, _ = index.search("adversaries", limit=2, offset=2)
+        by_cursor, _ = index.search("adversaries", limit=2, after=(first_page[-1]["_score"], str(first_page[-1]["_id"])))
+        
+        assert by_offset == by_cursor
+        assert len(by_offset) == 2
+        assert {p["external_id"] for p in first_page + by_offset} == {"T1055", "T1027", "T1059.001", "T1574.002"}
+    
+    def test_results_do_not_mutate_indexed_documents(self, index):
+        """Test that scores are added to copies"""
+        index.search("injection", limit=10)
+        
+        assert all("_score" not in document for document in index.documents)
+
+
+class TestSuggestionIndex:
+    """Test cases for typeahead prefix lookups"""
+    
+    @pytest.fixture
+    def suggestions(self, index):
+        return index.suggestions
+    
+    def test_name_prefix_and_word_prefix(self, suggestions):
+        """Test that names match from their start and from any word"""
+        assert suggestions.suggest("proc") == [("technique", "Process Injection", "T1055")]
+        assert suggestions.suggest("inj") == [("technique", "Process Injection", "T1055")]
+    
+    def test_technique_id_prefix(self, suggestions):
+        """Test that IDs suggest techniques and sub-techniques in order"""
+        assert suggestions.suggest("T1059.0") == [("technique", "PowerShell", "T1059.001")]
+        assert [s[2] for s in suggestions.suggest("t1")] == ["T1027", "T1055", "T1059.001", "T1574.002"]
+    
+    def test_platforms_and_phases_are_deduplicated(self, suggestions):
+        """Test that values shared by many techniques are suggested once"""
+        assert suggestions.suggest("win") == [("platform", "Windows", None)]
+        assert suggestions.suggest("exec") == [("phase", "execution", None)]
+    
+    def test_limit_and_empty_prefix(self, suggestions):
+        """Test result limits and blank input"""
+        assert len(suggestions.suggest("t", limit=2)) == 2
+        assert suggestions.suggest("   ") == []
+        assert SuggestionIndex([]).suggest("t") == []
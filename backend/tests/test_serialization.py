@@ -0,0 +1,54 @@
+"""
+Tests for the validation-free response serialization path
+"""
+from bson import ObjectId
+from app.models import AttackPatternResponse, SUMMARY_FIELDS, SearchResponse
+from app.serialization import dumps, response_dict, search_response_content
+from tests.test_api import stored_pattern
+
+
+class TestResponseDict:
+    """Test cases for copying stored patterns into response shape"""
+    
+    def test_matches_validated_model(self):
+        """Test that the fast path produces exactly what AttackPatternResponse would"""
+        pattern = stored_pattern(1)
+        
+        assert response_dict(pattern) == AttackPatternResponse(**pattern).model_dump()
+    
+    def test_missing_optional_fields_get_defaults(self):
+        """Test the defaults for fields older documents may lack"""
+        pattern = stored_pattern(1)
+        del pattern["external_references"], pattern["created_at"]
+        
+        content = response_dict(pattern)
+        
+        assert list(content["external_references"]) == []
+        assert content["created_at"] == ""
+    
+    def test_projection_keeps_field_order_and_drops_storage_fields(self):
+        """Test projected output contains only the requested fields"""
+        pattern = {**stored_pattern(1), "_id": ObjectId(), "content_hash": "abc"}
+        
+        assert list(response_dict(pattern, SUMMARY_FIELDS)) == SUMMARY_FIELDS
+        assert response_dict(pattern, ["id", "missing"]) == {"id": "attack-pattern--1", "missing": None}
+
+
+class TestSearchResponseContent:
+    """Test cases for whole-page serialization"""
+    
+    def test_round_trips_through_search_response(self):
+        """Test that the encoded page is a valid SearchResponse"""
+        patterns = [stored_pattern(n) for n in range(1, 4)]
+        
+        body = dumps(search_response_content(patterns, 3, 10, 0, "abc"))
+        
+        response = SearchResponse.model_validate_json(body)
+        assert [p.external_id for p in response.results] == ["T1001", "T1002", "T1003"]
+        assert response.next_cursor == "abc"
+    
+    def test_object_ids_are_encoded_as_strings(self):
+        """Test that stray ObjectIds do not break serialization"""
+        object_id = ObjectId()
+        
+        assert dumps({"_id": object_id}) == f'{{"_id":"{object_id}"}}'.encode()
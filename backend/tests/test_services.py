@@ -1,6 +1,18 @@
+import asyncio
+import time
+import httpx
+from datetime import datetime, timezone
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from app.services import MITREAttackService, AttackPatternService
+from pymongo import DeleteMany, ReplaceOne
+from bson import ObjectId
+from app.cache import MISSING, ResponseCache, SingleFlight, TTLCache
+from app.routers import server_timing_header
+from app.services import (
+    MITREAttackService, AttackPatternService, CachedAttackPatternService, InvalidCursorError, ReplicaAttackPatternService,
+    _replicas, decode_cursor, encode_cursor, invalidate_read_caches, keep_replica_fresh, next_page_cursor,
+    normalize_pattern_id, response_cache_metrics, stats_filter, stix_to_attack_pattern
+)
 
 
 class TestMITREAttackService:
@@ -48,6 +60,66 @@ class TestMITREAttackService:
             with pytest.raises(Exception, match="Network error"):
                 await service.fetch_attack_patterns()
     
+    @pytest.mark.asyncio
+    async def test_fetch_attack_patterns_concurrent(self, stix_server):
+        """Test concurrent fetching against a local STIX file server"""
+        progress = []
+        service = MITREAttackService(
+            index_url=stix_server["index_url"],
+            concurrency=4,
+            progress_callback=lambda done, total: progress.append((done, total))
+        )
+        
+        result = await service.fetch_attack_patterns()
+        
+        assert sorted(p["id"] for p in result) == [f"T{1000 + n}" for n in range(1, 21)]
+        first = next(p for p in result if p["id"] == "T1001")
+        assert first["name"] == "Technique 1"
+        assert first["phase_name"] == "execution"
+        assert len(progress) == 20
+        assert progress[-1] == (20, 20)
+    
+    @pytest.mark.asyncio
+    async def test_fetch_attack_patterns_retries_transient_errors(self, stix_server):
+        """Test that transient server errors are retried with backoff"""
+        stix_server["failures"]["/attack-pattern--t1001.json"] = 2
+        service = MITREAttackService(index_url=stix_server["index_url"], retry_backoff=0.01)
+        
+        result = await service.fetch_attack_patterns()
+        
+        assert len(result) == 20
+        assert stix_server["failures"]["/attack-pattern--t1001.json"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_fetch_attack_patterns_skips_exhausted_file(self, stix_server):
+        """Test that a file failing past its retry budget is skipped"""
+        stix_server["failures"]["/attack-pattern--t1001.json"] = 10
+        service = MITREAttackService(index_url=stix_server["index_url"], max_retries=1, retry_backoff=0.01)
+        
+        result = await service.fetch_attack_patterns()
+        
+        assert len(result) == 19
+        assert "T1001" not in {p["id"] for p in result}
+    
+    @pytest.mark.asyncio
+    async def test_parallel_transform_of_downloads(self, stix_server):
+        """Test that downloaded files are parsed by transform workers and failures still recorded"""
+        stix_server["failures"]["/attack-pattern--t1001.json"] = 10
+        service = MITREAttackService(
+            index_url=stix_server["index_url"], max_retries=1, retry_backoff=0.01, transform_workers=2
+        )
+        service.SHARD_BYTES = 1024
+        
+        result = [document async for document in service.iter_documents()]
+        
+        assert len(result) == 19
+        assert "T1001" not in {document["id"] for document in result}
+        assert service.skipped_sources == ["attack-pattern--t1001.json"]
+    
+    def test_stix_to_attack_pattern_ignores_other_types(self):
+        """Test that non attack-pattern STIX objects are ignored"""
+        assert stix_to_attack_pattern({"type": "relationship"}) is None
+    
     def test_process_attack_pattern_complete(self, service):
         """Test processing a complete attack pattern"""
         pattern_data = {
@@ -90,6 +162,338 @@ class TestMITREAttackService:
         assert result.kill_chain_phases == []
 
 
+async def async_items(items):
+    """Feed a list through the async iterator interface used by the ingestion pipeline"""
+    for item in items:
+        yield item
+
+
+class TestIngestionPipeline:
+    """Test cases for the streaming fetch -> transform -> write pipeline"""
+    
+    @pytest.fixture
+    def service(self):
+        service = MITREAttackService()
+        service.WRITE_CHUNK_SIZE = 2
+        return service
+    
+    @pytest.mark.asyncio
+    async def test_write_in_chunks_bounds_chunk_size(self, service):
+        """Test that items are written in fixed-size chunks"""
+        chunks = []
+        
+        written = await service.write_in_chunks(async_items(range(5)), chunks.append)
+        
+        assert written == 5
+        assert chunks == [[0, 1], [2, 3], [4]]
+    
+    @pytest.mark.asyncio
+    async def test_write_in_chunks_overlaps_production(self, service):
+        """Test that the producer keeps running while a chunk is being written"""
+        events = []
+        
+        async def produce():
+            for i in range(6):
+                events.append(f"produce {i}")
+                yield i
+                await asyncio.sleep(0.01)
+        
+        def write(chunk):
+            events.append(f"write {chunk}")
+            time.sleep(0.03)
+        
+        await service.write_in_chunks(produce(), write)
+        
+        # The third item is produced before the first write has been awaited
+        assert events.index("produce 2") < events.index("write [2, 3]")
+        assert events.index("write [0, 1]") < events.index("produce 3")
+    
+    @pytest.mark.asyncio
+    async def test_write_in_chunks_propagates_write_errors(self, service):
+        """Test that a failed write aborts the pipeline"""
+        def write(chunk):
+            raise RuntimeError("write failed")
+        
+        with pytest.raises(RuntimeError, match="write failed"):
+            await service.write_in_chunks(async_items(range(5)), write)
+    
+    @pytest.mark.asyncio
+    async def test_replace_keeps_live_data_when_the_stream_fails(self, service):
+        """Test that a fetch failing after several chunks leaves the live collection and dataset version alone"""
+        live, staging = MagicMock(), MagicMock()
+        db = MagicMock()
+        db.__getitem__.side_effect = lambda name: staging if name == "attack_patterns_staging" else live
+        
+        async def failing_stream():
+            for number in range(5):
+                yield {"id": f"T{number}"}
+            raise RuntimeError("truncated bundle")
+        
+        with patch("app.services.get_sync_database", return_value=db), \
+                patch("app.services.bump_dataset_version") as bump, \
+                patch.object(service, "iter_documents", failing_stream):
+            with pytest.raises(RuntimeError, match="truncated bundle"):
+                await service.ingest_data(mode="replace")
+        
+        assert staging.insert_many.call_count == 2
+        staging.rename.assert_not_called()
+        assert staging.drop.call_count == 2
+        live.delete_many.assert_not_called()
+        live.insert_many.assert_not_called()
+        bump.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_iter_documents_streams_remote_patterns(self, stix_server):
+        """Test that documents flow from the downloader without a full fetch first"""
+        service = MITREAttackService(index_url=stix_server["index_url"], concurrency=2)
+        
+        documents = [document async for document in service.iter_documents()]
+        
+        assert sorted(d["id"] for d in documents) == [f"T{1000 + n}" for n in range(1, 21)]
+        assert all(d["content_hash"] for d in documents)
+
+
+class TestIncrementalSync:
+    """Test cases for diff-based re-ingestion"""
+    
+    @pytest.fixture
+    def service(self):
+        return MITREAttackService()
+    
+    def make_documents(self, service, *names):
+        return [
+            service.prepare_document({"id": f"T{1000 + n}", "name": name, "description": f"{name} description"})
+            for n, name in enumerate(names, start=1)
+        ]
+    
+    def test_prepare_document_hash_is_stable(self, service):
+        """Test that identical input produces identical content hashes"""
+        first = self.make_documents(service, "Alpha", "Beta")
+        second = self.make_documents(service, "Alpha", "Beta")
+        
+        assert [d["content_hash"] for d in first] == [d["content_hash"] for d in second]
+        assert first[0]["content_hash"] != first[1]["content_hash"]
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_writes_only_differences(self, service):
+        """Test that unchanged patterns are skipped and stale ones removed"""
+        stored = self.make_documents(service, "Alpha", "Beta", "Gamma")
+        documents = self.make_documents(service, "Alpha", "Beta v2")
+        documents.append(service.prepare_document({"id": "T2000", "name": "Delta", "description": "New technique"}))
+        collection = MagicMock()
+        collection.find.return_value = [
+            {"id": d["id"], "content_hash": d["content_hash"]} for d in stored
+        ]
+        
+        counts = await service.sync_patterns(collection, async_items(documents))
+        
+        assert counts == {"added": 1, "changed": 1, "removed": 1, "unchanged": 1}
+        upserts, deletions = collection.bulk_write.call_args_list
+        assert upserts[1] == {"ordered": False}
+        assert upserts[0][0] == [
+            ReplaceOne({"id": "T1002"}, documents[1], upsert=True),
+            ReplaceOne({"id": "T2000"}, documents[2], upsert=True),
+        ]
+        assert deletions[0][0] == [DeleteMany({"id": {"$in": ["T1003"]}})]
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_no_changes(self, service):
+        """Test that an unchanged dataset issues no writes"""
+        documents = self.make_documents(service, "Alpha", "Beta")
+        collection = MagicMock()
+        collection.find.return_value = [
+            {"id": d["id"], "content_hash": d["content_hash"]} for d in documents
+        ]
+        
+        counts = await service.sync_patterns(collection, async_items(documents))
+        
+        assert counts["unchanged"] == 2
+        collection.bulk_write.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_keeps_data_when_nothing_fetched(self, service):
+        """Test that an empty fetch does not delete every stored pattern"""
+        collection = MagicMock()
+        collection.find.return_value = [{"id": "T1001", "content_hash": "abc"}]
+        
+        counts = await service.sync_patterns(collection, async_items([]))
+        
+        assert counts["removed"] == 0
+        collection.bulk_write.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_unreachable_index_deletes_nothing(self):
+        """Test that a failed index request aborts the sync instead of removing every stored pattern"""
+        service = MITREAttackService(index_url="http://127.0.0.1:1/index", max_retries=0)
+        db = MagicMock()
+        db["attack_patterns"].find.return_value = [{"id": f"T{1000 + n}", "content_hash": "abc"} for n in range(700)]
+        
+        with patch("app.services.get_sync_database", return_value=db), \
+                patch("app.services.bump_dataset_version") as bump:
+            with pytest.raises(httpx.TransportError):
+                await service.ingest_data(mode="incremental")
+        
+        db["attack_patterns"].bulk_write.assert_not_called()
+        bump.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_keeps_patterns_of_skipped_files(self, stix_server):
+        """Test that a file failing past its retries does not get its pattern removed"""
+        stix_server["failures"]["/attack-pattern--t1001.json"] = 10
+        service = MITREAttackService(index_url=stix_server["index_url"], max_retries=1, retry_backoff=0.01)
+        collection = MagicMock()
+        collection.find.return_value = [{"id": "T1001", "content_hash": "abc"}]
+        
+        counts = await service.sync_patterns(collection, service.iter_documents())
+        
+        assert counts == {"added": 19, "changed": 0, "removed": 0, "unchanged": 0}
+        assert service.skipped_sources == ["attack-pattern--t1001.json"]
+        assert not any(
+            isinstance(operation, DeleteMany) for call in collection.bulk_write.call_args_list for operation in call[0][0]
+        )
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_matches_unidentified_patterns_by_content(self, service):
+        """Test that patterns without an ATT&CK ID are kept apart and matched by content hash"""
+        kept, added = (
+            service.prepare_document({"id": "N/A", "name": name, "description": f"{name} description"})
+            for name in ("Kept", "Added")
+        )
+        collection = MagicMock()
+        collection.find.return_value = [
+            {"id": "N/A", "content_hash": kept["content_hash"]},
+            {"id": "N/A", "content_hash": "stale"}
+        ]
+        
+        counts = await service.sync_patterns(collection, async_items([kept, added]))
+        
+        assert counts == {"added": 1, "changed": 0, "removed": 1, "unchanged": 1}
+        upserts, deletions = collection.bulk_write.call_args_list
+        assert upserts[0][0] == [ReplaceOne({"id": "N/A", "content_hash": added["content_hash"]}, added, upsert=True)]
+        assert deletions[0][0] == [DeleteMany({"id": "N/A", "content_hash": {"$in": ["stale"]}})]
+    
+    @pytest.mark.asyncio
+    async def test_sync_patterns_batches_operations(self, service):
+        """Test that large change sets are split into bounded batches"""
+        service.WRITE_CHUNK_SIZE = 2
+        documents = self.make_documents(service, "A", "B", "C", "D", "E")
+        collection = MagicMock()
+        collection.find.return_value = []
+        
+        await service.sync_patterns(collection, async_items(documents))
+        
+        assert [len(c[0][0]) for c in collection.bulk_write.call_args_list] == [2, 2, 1]
+    
+    @pytest.mark.asyncio
+    async def test_ingest_data_rejects_unknown_mode(self, service):
+        """Test that an unknown ingestion mode is rejected"""
+        with pytest.raises(ValueError, match="Unknown ingestion mode"):
+            await service.ingest_data(mode="bogus")
+    
+    @pytest.mark.asyncio
+    async def test_ingest_data_materializes_stats_for_new_version(self, service):
+        """Test that a data change bumps the version and recomputes statistics and the technique graph for it"""
+        db = MagicMock()
+        with patch("app.services.get_sync_database", return_value=db), \
+                patch("app.services.bump_dataset_version", return_value=4) as bump, \
+                patch("app.services.materialize_stats") as materialize, \
+                patch("app.services.materialize_technique_graph") as materialize_graph, \
+                patch.object(service, "swap_in_patterns", AsyncMock(return_value=3)):
+            count = await service.ingest_data()
+        
+        assert count == 3
+        bump.assert_called_once_with(db)
+        materialize.assert_called_once_with(db, 4)
+        materialize_graph.assert_called_once_with(db, 4)
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_ingestion_keeps_stats(self, service):
+        """Test that statistics are not recomputed when nothing changed"""
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 5}
+        with patch("app.services.get_sync_database", return_value=MagicMock()), \
+                patch("app.services.bump_dataset_version") as bump, \
+                patch("app.services.materialize_stats") as materialize, \
+                patch("app.services.materialize_technique_graph") as materialize_graph, \
+                patch.object(service, "sync_patterns", AsyncMock(return_value=counts)):
+            await service.ingest_data(mode="incremental")
+        
+        bump.assert_not_called()
+        materialize.assert_not_called()
+        materialize_graph.assert_not_called()
+
+
+class TestSwapIngestion:
+    """Test cases for blue/green full refreshes"""
+    
+    @pytest.fixture
+    def service(self):
+        return MITREAttackService()
+    
+    @pytest.fixture
+    def documents(self, service):
+        return [
+            service.prepare_document({"id": "T1001", "name": "Alpha", "description": "Alpha description"}),
+            service.prepare_document({"id": "T1002", "name": "Beta", "description": "Beta description"})
+        ]
+    
+    @pytest.fixture
+    def db(self):
+        live, staging = MagicMock(), MagicMock()
+        live.count_documents.return_value = 2
+        staging.count_documents.return_value = 2
+        db = MagicMock()
+        db.__getitem__.side_effect = lambda name: staging if name == "attack_patterns_staging" else live
+        db.live, db.staging = live, staging
+        return db
+    
+    @pytest.mark.asyncio
+    async def test_swap_builds_indexes_before_rename(self, service, documents, db):
+        """Test that the staging collection is loaded, indexed and validated before the swap"""
+        count = await service.swap_in_patterns(db, async_items(documents))
+        
+        assert count == 2
+        call_names = [c[0] for c in db.staging.method_calls]
+        assert call_names == ["drop", "insert_many", "create_indexes", "count_documents", "rename"]
+        db.staging.rename.assert_called_once_with("attack_patterns", dropTarget=True)
+        db.live.count_documents.assert_called_once_with({})
+    
+    @pytest.mark.asyncio
+    async def test_swap_aborts_on_count_mismatch(self, service, documents, db):
+        """Test that the live collection is left untouched when validation fails"""
+        db.staging.count_documents.return_value = 1
+        
+        with pytest.raises(RuntimeError, match="expected 2"):
+            await service.swap_in_patterns(db, async_items(documents))
+        
+        db.staging.rename.assert_not_called()
+        assert db.staging.drop.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_swap_refuses_to_shrink_the_live_collection(self, service, documents, db):
+        """Test that a staged dataset much smaller than the live one is not swapped in"""
+        db.live.count_documents.return_value = 700
+        
+        with pytest.raises(RuntimeError, match="fewer than 90% of the 700 live ones"):
+            await service.swap_in_patterns(db, async_items(documents))
+        
+        db.staging.rename.assert_not_called()
+        
+        service.min_swap_fraction = 0
+        assert await service.swap_in_patterns(db, async_items(documents)) == 2
+    
+    @pytest.mark.asyncio
+    async def test_swap_refuses_streams_with_skipped_files(self, stix_server, db):
+        """Test that a file failing past its retries stops the swap before the live collection is touched"""
+        stix_server["failures"]["/attack-pattern--t1001.json"] = 10
+        service = MITREAttackService(index_url=stix_server["index_url"], max_retries=1, retry_backoff=0.01)
+        
+        with pytest.raises(RuntimeError, match="Skipped 1 source files"):
+            await service.swap_in_patterns(db, service.iter_documents())
+        
+        db.staging.rename.assert_not_called()
+        assert db.live.method_calls == []
+
+
 class TestAttackPatternService:
     """Test cases for AttackPatternService"""
     
@@ -167,3 +571,849 @@ class TestAttackPatternService:
         
         with pytest.raises(ValueError, match="Attack pattern with ID T9999 not found"):
             await service.get_pattern_by_id("T9999")
+
+
+class TestCursorPagination:
+    """Test cases for keyset (cursor) pagination"""
+    
+    @pytest.fixture
+    def collection(self):
+        collection = MagicMock()
+        collection.count_documents = AsyncMock(return_value=3)
+        collection.estimated_document_count = AsyncMock(return_value=3)
+        collection.find_one = AsyncMock(return_value={"_id": ObjectId()})
+        page = collection.find.return_value.sort.return_value
+        page.limit.return_value.to_list = AsyncMock(return_value=[{"id": "T1002"}])
+        page.skip.return_value.limit.return_value.to_list = AsyncMock(return_value=[{"id": "T1001"}])
+        return collection
+    
+    @pytest.fixture
+    def service(self, collection):
+        database = MagicMock()
+        database.attack_patterns = collection
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        return AttackPatternService(database)
+    
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes back to the ObjectId it was built from"""
+        object_id = ObjectId()
+        
+        assert decode_cursor(encode_cursor(object_id)) == (object_id, None)
+        assert decode_cursor(encode_cursor(object_id, 1.75)) == (object_id, 1.75)
+    
+    def test_invalid_cursor(self):
+        """Test that malformed cursors are rejected"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("not-a-cursor")
+    
+    def test_next_page_cursor(self):
+        """Test that a next cursor is only issued for full pages"""
+        patterns = [{"_id": ObjectId()}, {"_id": ObjectId()}]
+        
+        assert decode_cursor(next_page_cursor(patterns, limit=2)) == (patterns[-1]["_id"], None)
+        assert next_page_cursor(patterns, limit=3) is None
+        assert next_page_cursor([], limit=2) is None
+    
+    @pytest.mark.asyncio
+    async def test_get_all_patterns_seeks_past_cursor(self, service, collection):
+        """Test that cursor pages seek on _id instead of skipping"""
+        last_id = ObjectId()
+        
+        patterns, total = await service.get_all_patterns(limit=1, cursor=encode_cursor(last_id))
+        
+        assert patterns == [{"id": "T1002"}]
+        assert total == 3
+        collection.find.assert_called_once_with({"_id": {"$gt": last_id}}, None)
+        collection.find.return_value.sort.assert_called_once_with("_id", 1)
+        collection.find.return_value.sort.return_value.skip.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_get_all_patterns_offset_mode(self, service, collection):
+        """Test that offset pagination still works and is ordered by _id"""
+        patterns, _ = await service.get_all_patterns(limit=1, offset=1)
+        
+        assert patterns == [{"id": "T1001"}]
+        collection.find.assert_called_once_with({}, None)
+        collection.find.return_value.sort.return_value.skip.assert_called_once_with(1)
+
+
+@pytest.mark.usefixtures("mongo_search")
+class TestFacetSearch:
+    """Test cases for single-round-trip search aggregations"""
+    
+    @pytest.fixture
+    def database(self):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.attack_patterns.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"results": [{"id": "T1055", "_id": ObjectId(), "_score": 1.5}], "total": [{"count": 4}]}
+        ])
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_text_search_is_one_aggregation(self, service, database):
+        """Test that page and total come back from a single $facet aggregation ranked by text score"""
+        patterns, total = await service.search_patterns("injection", limit=1)
+        
+        assert [p["id"] for p in patterns] == ["T1055"]
+        assert total == 4
+        database.attack_patterns.aggregate.assert_called_once()
+        database.attack_patterns.find.assert_not_called()
+        database.attack_patterns.count_documents.assert_not_called()
+        pipeline = database.attack_patterns.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$match": {"$text": {"$search": "injection"}}}
+        assert pipeline[2] == {"$sort": {"_score": -1, "_id": 1}}
+        assert pipeline[-1]["$facet"]["results"] == [{"$skip": 0}, {"$limit": 1}]
+        assert pipeline[-1]["$facet"]["total"] == [{"$count": "count"}]
+        assert set(service.timings) == {"text_search"}
+    
+    @pytest.mark.asyncio
+    async def test_cached_total_skips_count_facet(self, service, database):
+        """Test that a cached total is reused instead of being recounted"""
+        await service.search_patterns("injection", limit=1)
+        
+        _, total = await service.search_patterns("injection", limit=1, offset=1)
+        
+        assert total == 4
+        assert "total" not in database.attack_patterns.aggregate.call_args[0][0][-1]["$facet"]
+    
+    @pytest.mark.asyncio
+    async def test_regex_fallback_when_text_finds_nothing(self, service, database):
+        """Test that regex search runs only when text search has no matches"""
+        database.attack_patterns.aggregate.return_value.to_list = AsyncMock(side_effect=[
+            [{"results": [], "total": []}],
+            [{"results": [{"id": "T1027", "_id": ObjectId()}], "total": [{"count": 1}]}]
+        ])
+        
+        patterns, total = await service.search_patterns("obfusc", limit=10)
+        
+        assert [p["id"] for p in patterns] == ["T1027"]
+        assert total == 1
+        regex_pipeline = database.attack_patterns.aggregate.call_args[0][0]
+        assert "$or" in regex_pipeline[0]["$match"]
+        assert regex_pipeline[1] == {"$sort": {"_id": 1}}
+        assert set(service.timings) == {"text_search", "regex_search"}
+    
+    @pytest.mark.asyncio
+    async def test_text_cursor_seeks_by_score(self, service, database):
+        """Test that text search cursors continue in relevance order"""
+        last_id = ObjectId()
+        
+        await service.search_patterns("injection", limit=1, cursor=encode_cursor(last_id, 1.5))
+        
+        results = database.attack_patterns.aggregate.call_args[0][0][-1]["$facet"]["results"]
+        assert results[0] == {"$match": {"$or": [
+            {"_score": {"$lt": 1.5}},
+            {"_score": 1.5, "_id": {"$gt": last_id}}
+        ]}}
+    
+    @pytest.mark.asyncio
+    async def test_total_opt_out_only_checks_existence(self, service, database):
+        """Test that include_total=False limits the count facet to an existence check"""
+        _, total = await service.search_patterns("injection", limit=1, include_total=False)
+        
+        assert total is None
+        facet = database.attack_patterns.aggregate.call_args[0][0][-1]["$facet"]
+        assert facet["total"] == [{"$limit": 1}, {"$count": "count"}]
+
+
+@pytest.mark.usefixtures("mongo_search")
+class TestCountCaching:
+    """Test cases for cached and approximate totals"""
+    
+    @pytest.fixture
+    def database(self):
+        database = MagicMock()
+        collection = database.attack_patterns
+        collection.count_documents = AsyncMock(return_value=7)
+        collection.estimated_document_count = AsyncMock(return_value=42)
+        collection.find_one = AsyncMock(return_value={"_id": ObjectId()})
+        collection.find.return_value.sort.return_value.skip.return_value.limit.return_value.to_list = AsyncMock(
+            return_value=[]
+        )
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_unfiltered_total_is_estimated(self, service, database):
+        """Test that the unfiltered total uses collection metadata"""
+        _, total = await service.get_all_patterns(limit=10)
+        
+        assert total == 42
+        database.attack_patterns.count_documents.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_filtered_count_is_cached(self, service, database):
+        """Test that repeated counts reuse the cached total"""
+        first = await service.count_patterns({"phase_name": "execution"})
+        second = await service.count_patterns({"phase_name": "execution"})
+        
+        assert first == second == 7
+        database.attack_patterns.count_documents.assert_called_once()
+        # The dataset version is checked once per interval, not per request
+        database.metadata.find_one.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_data_stamp_is_utc(self, service, database):
+        """Test that the ingestion time read back from MongoDB is timezone-aware UTC"""
+        database.metadata.find_one.return_value = {"version": 3, "updated_at": datetime(2024, 5, 1, 12, 0)}
+        
+        stamp = await service.get_data_stamp()
+        
+        assert stamp == {"version": 3, "updated_at": datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)}
+        assert await service.get_data_version() == 3
+        database.metadata.find_one.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_count_cache_is_keyed_by_dataset_version(self, service, database):
+        """Test that a new dataset version invalidates cached totals"""
+        await service.count_patterns({"phase_name": "execution"})
+        invalidate_read_caches()
+        database.metadata.find_one.return_value = {"version": 2}
+        database.attack_patterns.count_documents.return_value = 9
+        
+        total = await service.count_patterns({"phase_name": "execution"})
+        
+        assert total == 9
+        assert database.attack_patterns.count_documents.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_total_can_be_skipped(self, service, database):
+        """Test that clients can opt out of totals"""
+        _, total = await service.get_all_patterns(limit=10, include_total=False)
+        
+        assert total is None
+        database.attack_patterns.estimated_document_count.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_count_search_results(self, service, database):
+        """Test lazily requested search totals"""
+        assert await service.count_search_results("injection") == 7
+        assert await service.count_search_results("") == 42
+
+
+class TestIndexedSearch:
+    """Test cases for serving searches from the in-memory search index"""
+    
+    @pytest.fixture
+    def documents(self):
+        return [
+            {"_id": ObjectId(), "id": "T1055", "name": "Process Injection", "description": "Adversaries inject code"},
+            {"_id": ObjectId(), "id": "T1027", "name": "Obfuscated Files", "description": "Adversaries hide payloads"},
+        ]
+    
+    @pytest.fixture
+    def database(self, documents):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.attack_patterns.find.return_value.sort.return_value.to_list = AsyncMock(return_value=documents)
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_search_is_served_without_querying_mongodb(self, service, database):
+        """Test that the index is built once and then answers searches in memory"""
+        await service.search_patterns("injection", limit=10)
+        
+        patterns, total = await service.search_patterns("obfusc", limit=10)
+        
+        assert [p["id"] for p in patterns] == ["T1027"]
+        assert total == 1
+        database.attack_patterns.find.assert_called_once_with({})
+        database.attack_patterns.aggregate.assert_not_called()
+        assert set(service.timings) == {"index_search"}
+    
+    @pytest.mark.asyncio
+    async def test_index_is_rebuilt_for_a_new_dataset_version(self, service, database):
+        """Test that an ingestion (dataset version bump) rebuilds the index"""
+        await service.search_patterns("injection", limit=10)
+        invalidate_read_caches()
+        database.metadata.find_one.return_value = {"version": 2}
+        
+        index = await service.get_search_index()
+        
+        assert index.version == 2
+        assert database.attack_patterns.find.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_index_cursor_continues_in_rank_order(self, service):
+        """Test that next_cursor from an index page resumes after that page"""
+        first_page, _ = await service.search_patterns("adversaries", limit=1)
+        
+        second_page, _ = await service.search_patterns("adversaries", limit=1, cursor=next_page_cursor(first_page, 1))
+        
+        assert {first_page[0]["id"], second_page[0]["id"]} == {"T1055", "T1027"}
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_mongodb_when_index_cannot_be_built(self, service, database):
+        """Test that a failed index build degrades to MongoDB queries"""
+        database.attack_patterns.find.return_value.sort.return_value.to_list = AsyncMock(side_effect=Exception("boom"))
+        database.attack_patterns.aggregate.return_value.to_list = AsyncMock(return_value=[
+            {"results": [{"id": "T1055", "_id": ObjectId()}], "total": [{"count": 1}]}
+        ])
+        
+        patterns, total = await service.search_patterns("injection", limit=10)
+        
+        assert [p["id"] for p in patterns] == ["T1055"]
+        assert total == 1
+    
+    @pytest.mark.asyncio
+    async def test_count_search_results_uses_index(self, service, database):
+        """Test that lazily requested totals come from the index"""
+        assert await service.count_search_results("payloads") == 1
+        database.attack_patterns.count_documents.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_suggest_uses_index_even_when_search_does_not(self, service, monkeypatch):
+        """Test that typeahead is served from the index regardless of SEARCH_INDEX_ENABLED"""
+        monkeypatch.setattr("app.services.SEARCH_INDEX_ENABLED", False)
+        
+        suggestions = await service.suggest("obf")
+        
+        assert suggestions == [{"kind": "technique", "value": "Obfuscated Files", "external_id": None}]
+
+
+class TestFieldProjection:
+    """Test cases for pushing field projections down into queries"""
+    
+    @pytest.fixture
+    def database(self):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        collection = database.attack_patterns
+        collection.estimated_document_count = AsyncMock(return_value=1)
+        collection.find.return_value.sort.return_value.skip.return_value.limit.return_value.to_list = AsyncMock(
+            return_value=[{"_id": ObjectId(), "id": "T1055", "name": "Process Injection"}]
+        )
+        collection.find.return_value.sort.return_value.to_list = AsyncMock(return_value=[
+            {"_id": ObjectId(), "id": "T1055", "name": "Process Injection", "description": "Inject code"}
+        ])
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=[{"results": [], "total": []}])
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_list_projection_is_sent_to_mongodb(self, service, database):
+        """Test that only the requested fields are read from MongoDB"""
+        await service.get_all_patterns(limit=10, fields=["id", "name"])
+        
+        database.attack_patterns.find.assert_called_once_with({}, {"id": 1, "name": 1})
+    
+    @pytest.mark.asyncio
+    async def test_full_documents_without_fields(self, service, database):
+        """Test that no projection is applied by default"""
+        await service.get_all_patterns(limit=10)
+        
+        database.attack_patterns.find.assert_called_once_with({}, None)
+    
+    @pytest.mark.asyncio
+    async def test_aggregation_projects_results_and_keeps_score(self, service, database, monkeypatch):
+        """Test that MongoDB searches project inside the results facet"""
+        monkeypatch.setattr("app.services.SEARCH_INDEX_ENABLED", False)
+        
+        await service.search_patterns("injection", limit=10, fields=["id", "name"])
+        
+        text_pipeline = database.attack_patterns.aggregate.call_args_list[0][0][0]
+        assert text_pipeline[-1]["$facet"]["results"][-1] == {"$project": {"id": 1, "name": 1, "_score": 1}}
+        regex_pipeline = database.attack_patterns.aggregate.call_args_list[1][0][0]
+        assert regex_pipeline[-1]["$facet"]["results"][-1] == {"$project": {"id": 1, "name": 1}}
+    
+    @pytest.mark.asyncio
+    async def test_index_results_are_projected(self, service):
+        """Test that in-memory search results carry only the requested fields and cursor keys"""
+        patterns, _ = await service.search_patterns("inject", limit=10, fields=["id", "name"])
+        
+        assert set(patterns[0]) == {"_id", "_score", "id", "name"}
+    
+    @pytest.mark.asyncio
+    async def test_iter_patterns_streams_in_batches(self, service, database):
+        """Test that streaming reads the collection through a batched cursor"""
+        find_cursor = database.attack_patterns.find.return_value.sort.return_value.batch_size.return_value
+        find_cursor.__aiter__.return_value = [{"id": "T1001"}, {"id": "T1002"}]
+        
+        patterns = [pattern async for pattern in service.iter_patterns(["id"])]
+        
+        assert patterns == [{"id": "T1001"}, {"id": "T1002"}]
+        database.attack_patterns.find.assert_called_once_with({}, {"id": 1})
+        database.attack_patterns.find.return_value.sort.return_value.batch_size.assert_called_once_with(
+            AttackPatternService.STREAM_BATCH_SIZE
+        )
+
+
+class TestStats:
+    """Test cases for statistics served from the materialized document"""
+    
+    @pytest.fixture
+    def database(self):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 3})
+        database.stats.find_one = AsyncMock(return_value={
+            "_id": "attack_patterns", "version": 3, "total_patterns": 12,
+            "phase_distribution": [{"_id": "execution", "count": 12}]
+        })
+        database.attack_patterns.aggregate.return_value.to_list = AsyncMock(return_value=[{
+            "total": [{"count": 13}],
+            "phase_distribution": [{"_id": "execution", "count": 13}],
+            "flags": [{"_id": None, "subtechnique_count": 4, "deprecated_count": 1}]
+        }])
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_stats_are_a_single_point_read(self, service, database):
+        """Test that current materialized statistics are read once and then served from memory"""
+        first = await service.get_stats()
+        second = await service.get_stats()
+        
+        assert first == second
+        assert first["total_patterns"] == 12
+        assert "_id" not in first
+        database.stats.find_one.assert_called_once()
+        database.attack_patterns.aggregate.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_stale_stats_are_aggregated_once_per_version(self, service, database):
+        """Test the fallback when the materialized document predates the data"""
+        database.metadata.find_one.return_value = {"version": 4}
+        
+        stats = await service.get_stats()
+        await service.get_stats()
+        
+        assert stats["version"] == 4
+        assert stats["total_patterns"] == 13
+        assert stats["subtechnique_count"] == 4
+        assert stats["platform_distribution"] == []
+        database.attack_patterns.aggregate.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_are_coalesced(self, service, database, monkeypatch):
+        """Test that simultaneous requests share one version read and one statistics read"""
+        flights = SingleFlight()
+        monkeypatch.setattr("app.services._flights", flights)
+        
+        results = await asyncio.gather(*(AttackPatternService(database).get_stats() for _ in range(10)))
+        
+        assert all(stats is results[0] for stats in results)
+        database.metadata.find_one.assert_called_once()
+        database.stats.find_one.assert_called_once()
+        assert flights.metrics()["operations"] == {
+            "get_data_stamp": {"executed": 1, "coalesced": 9},
+            "get_stats": {"executed": 1, "coalesced": 9}
+        }
+    
+    @pytest.mark.asyncio
+    async def test_new_version_rereads_stats(self, service, database):
+        """Test that an ingestion invalidates the in-memory snapshot"""
+        await service.get_stats()
+        invalidate_read_caches()
+        database.metadata.find_one.return_value = {"version": 4}
+        database.stats.find_one.return_value = {"version": 4, "total_patterns": 20}
+        
+        stats = await service.get_stats()
+        
+        assert stats["total_patterns"] == 20
+        assert database.stats.find_one.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_breakdown_without_filters_is_the_materialized_stats(self, service, database):
+        """Test that an unfiltered breakdown costs no aggregation"""
+        stats = await service.get_stats_breakdown({"platform": None, "phase": []})
+        
+        assert stats["total_patterns"] == 12
+        database.attack_patterns.aggregate.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_filtered_breakdown_is_one_cached_aggregation(self, service, database):
+        """Test that every dimension comes from one $match + $facet aggregation, cached per filter"""
+        await service.get_stats_breakdown({"platform": ["Windows"], "subtechnique": True})
+        
+        stats = await service.get_stats_breakdown({"subtechnique": True, "platform": ["Windows"]})
+        
+        assert stats["total_patterns"] == 13
+        database.attack_patterns.aggregate.assert_called_once()
+        pipeline = database.attack_patterns.aggregate.call_args[0][0]
+        assert pipeline[0] == {"$match": {"x_mitre_platforms": "Windows", "x_mitre_is_subtechnique": True}}
+        assert set(pipeline[1]["$facet"]) >= {
+            "phase_distribution", "platform_distribution", "domain_distribution", "data_source_distribution"
+        }
+    
+    def test_stats_filter(self):
+        """Test mapping breakdown filters to document fields"""
+        assert stats_filter({"phase": ["execution", "persistence"], "deprecated": False}) == {
+            "kill_chain_phases.phase_name": {"$in": ["execution", "persistence"]},
+            "x_mitre_deprecated": False
+        }
+        with pytest.raises(ValueError, match="Unknown statistics filter"):
+            stats_filter({"color": "red"})
+
+
+class TestTechniqueGraph:
+    """Test cases for technique neighbors and the relationship graph"""
+    
+    @pytest.fixture
+    def documents(self):
+        return [
+            {"id": "T1055", "name": "Process Injection", "description": "Inject code into process memory",
+             "kill_chain_phases": [{"phase_name": "defense-evasion"}], "x_mitre_platforms": ["Windows"]},
+            {"id": "T1574", "name": "Hijack Execution Flow", "description": "Inject code into process loading",
+             "kill_chain_phases": [{"phase_name": "defense-evasion"}], "x_mitre_platforms": ["Windows", "Linux"]},
+            {"id": "T1566", "name": "Phishing", "description": "Send spearphishing email attachments",
+             "kill_chain_phases": [{"phase_name": "initial-access"}], "x_mitre_platforms": ["Linux"]},
+        ]
+    
+    @pytest.fixture
+    def database(self, documents):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 3})
+        database.technique_graph.find_one = AsyncMock(return_value=None)
+        database.attack_patterns.find.return_value.sort.return_value.to_list = AsyncMock(return_value=documents)
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_neighbors_are_a_point_read(self, service, database):
+        """Test that neighbors materialized for the current version are served as stored"""
+        neighbors = [{"id": "T1574", "score": 0.8}]
+        database.technique_graph.find_one.return_value = {"_id": "T1055", "version": 3, "neighbors": neighbors}
+        
+        result = await service.get_neighbors("T1055", k=5)
+        
+        assert result == neighbors
+        database.technique_graph.find_one.assert_called_once_with(
+            {"_id": "T1055"}, {"version": 1, "neighbors": {"$slice": 5}}
+        )
+        database.attack_patterns.find.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_stale_neighbors_are_scored_in_memory(self, service, database):
+        """Test the fallback when the stored neighbors predate the data"""
+        database.technique_graph.find_one.return_value = {"_id": "T1055", "version": 2, "neighbors": []}
+        
+        result = await service.get_neighbors("T1055", k=5)
+        
+        assert [neighbor["id"] for neighbor in result] == ["T1574"]
+        assert result[0]["phase"] > 0
+    
+    @pytest.mark.asyncio
+    async def test_unknown_pattern_has_no_neighbors(self, service):
+        """Test that neighbors of a missing pattern are reported as not found"""
+        with pytest.raises(ValueError, match="not found"):
+            await service.get_neighbors("T9999")
+    
+    @pytest.mark.asyncio
+    async def test_graph_reads_materialized_edges(self, service, database):
+        """Test that a complete stored graph is turned into edges above the threshold"""
+        database.metadata.find_one.side_effect = [{"version": 3}, {"_id": "technique_graph", "version": 3}]
+        database.technique_graph.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": "T1055", "neighbors": [{"id": "T1574", "type": "phase", "score": 0.6}]},
+            {"_id": "T1566", "neighbors": [{"id": "T1574", "type": "platform", "score": 0.1}]},
+        ])
+        
+        graph = await service.get_technique_graph(k=4, min_score=0.3)
+        
+        assert graph == {
+            "version": 3, "k": 4, "edges": [{"source": "T1055", "target": "T1574", "type": "phase", "strength": 0.6}]
+        }
+        database.technique_graph.find.assert_called_once_with({"version": 3}, {"neighbors": {"$slice": 4}})
+    
+    @pytest.mark.asyncio
+    async def test_graph_is_scored_when_not_materialized(self, service, database):
+        """Test that a missing graph is computed from the similarity model instead"""
+        database.metadata.find_one.side_effect = [{"version": 3}, None]
+        
+        graph = await service.get_technique_graph(k=2, min_score=0.0)
+        
+        assert {(edge["source"], edge["target"]) for edge in graph["edges"]} == {
+            ("T1055", "T1574"), ("T1574", "T1055"), ("T1574", "T1566"), ("T1566", "T1574")
+        }
+        database.technique_graph.find.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_similar_queries_are_answered_together(self, service, database):
+        """Test that IDs and texts share one similarity model and report unknown IDs"""
+        results = await service.find_similar(2, ids=["T1055", "T9999"], texts=["spearphishing email"])
+        
+        assert [(r["query"], r["kind"], r["found"]) for r in results] == [
+            ("T1055", "id", True), ("T9999", "id", False), ("spearphishing email", "text", True)
+        ]
+        assert results[0]["similar"][0]["id"] == "T1574"
+        assert results[2]["similar"][0]["id"] == "T1566"
+        assert "similar" in service.timings
+        database.attack_patterns.find.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_similar_to_unknown_pattern(self, service):
+        """Test that similar techniques of a missing pattern are reported as not found"""
+        with pytest.raises(ValueError, match="not found"):
+            await service.get_similar("T9999")
+
+
+class TestBulkLookup:
+    """Test cases for resolving many pattern IDs in one call"""
+    
+    @pytest.fixture
+    def documents(self):
+        return [
+            {"_id": ObjectId(), "id": "T1055", "name": "Process Injection", "description": "Inject code"},
+            {"_id": ObjectId(), "id": "T1055.001", "name": "DLL Injection", "description": "Inject a DLL"},
+        ]
+    
+    @pytest.fixture
+    def database(self, documents):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.attack_patterns.find.return_value.sort.return_value.to_list = AsyncMock(return_value=documents)
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return AttackPatternService(database)
+    
+    def test_ids_are_normalized(self):
+        """Test that case, whitespace and URL-style sub-technique IDs are accepted"""
+        assert normalize_pattern_id(" t1055/001 ") == "T1055.001"
+    
+    @pytest.mark.asyncio
+    async def test_lookup_uses_the_index_id_map(self, service, database):
+        """Test that IDs are resolved in memory, keyed as requested, with missing IDs reported"""
+        await service.get_patterns_by_ids(["T1055"])
+        
+        found, missing = await service.get_patterns_by_ids(["t1055/001", "T1055", "T9999"], fields=["id", "name"])
+        
+        assert found == {
+            "t1055/001": {"_id": found["t1055/001"]["_id"], "id": "T1055.001", "name": "DLL Injection"},
+            "T1055": {"_id": found["T1055"]["_id"], "id": "T1055", "name": "Process Injection"}
+        }
+        assert missing == ["T9999"]
+        database.attack_patterns.find.assert_called_once_with({})
+        assert set(service.timings) == {"index_lookup"}
+    
+    @pytest.mark.usefixtures("mongo_search")
+    @pytest.mark.asyncio
+    async def test_lookup_is_one_in_query_without_the_index(self, service, database):
+        """Test that every ID is resolved by a single $in query"""
+        found, missing = await service.get_patterns_by_ids(["T1055", "T1055.001", "T1055", "T9999"], fields=["name"])
+        
+        assert set(found) == {"T1055", "T1055.001"}
+        assert missing == ["T9999"]
+        database.attack_patterns.find.assert_called_once_with(
+            {"id": {"$in": ["T1055", "T1055.001", "T9999"]}}, {"id": 1, "name": 1}
+        )
+
+
+class TestResponseCaching:
+    """Test cases for reading service results through the response cache"""
+    
+    @pytest.fixture(autouse=True)
+    def response_cache(self, monkeypatch):
+        cache = ResponseCache(TTLCache(ttl=float("inf"), max_entries=16))
+        monkeypatch.setattr("app.services._response_cache", cache)
+        return cache
+    
+    @pytest.fixture
+    def database(self):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.attack_patterns.find_one = AsyncMock(return_value={"id": "T1055", "name": "Process Injection"})
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return CachedAttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_repeated_reads_skip_mongodb(self, service, database):
+        """Test that a repeated call is answered from the cache and reported in timings"""
+        await service.get_pattern_by_id("T1055")
+        
+        pattern = await service.get_pattern_by_id("T1055")
+        
+        assert pattern["name"] == "Process Injection"
+        database.attack_patterns.find_one.assert_called_once()
+        assert set(service.timings) == {"cache"}
+        assert response_cache_metrics()["operations"] == {"get_pattern_by_id": {"hits": 1, "misses": 1}}
+    
+    @pytest.mark.asyncio
+    async def test_coalesced_reads_report_their_wait(self, database, response_cache):
+        """Test that a request joining a read in flight reports a coalesced stage in Server-Timing"""
+        loaded = asyncio.Event()
+        
+        async def slow_find_one(*args, **kwargs):
+            await loaded.wait()
+            return {"id": "T1055", "name": "Process Injection"}
+        
+        database.attack_patterns.find_one = AsyncMock(side_effect=slow_find_one)
+        leader, follower = CachedAttackPatternService(database), CachedAttackPatternService(database)
+        reads = asyncio.gather(leader.get_pattern_by_id("T1055"), follower.get_pattern_by_id("T1055"))
+        while not response_cache.flights.coalesced:
+            await asyncio.sleep(0)
+        loaded.set()
+        
+        await reads
+        
+        database.attack_patterns.find_one.assert_called_once()
+        assert leader.timings == {}
+        assert server_timing_header(follower.timings).startswith("coalesced;dur=")
+    
+    @pytest.mark.asyncio
+    async def test_arguments_are_part_of_the_key(self, service, database):
+        """Test that different arguments are cached separately"""
+        await service.get_pattern_by_id("T1055")
+        await service.get_pattern_by_id("T1027")
+        
+        assert database.attack_patterns.find_one.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_new_dataset_version_misses(self, service, database, response_cache):
+        """Test that results cached for an older dataset version are not served"""
+        await service.get_pattern_by_id("T1055")
+        invalidate_read_caches()
+        database.metadata.find_one.return_value = {"version": 2}
+        
+        await service.get_pattern_by_id("T1055")
+        
+        assert database.attack_patterns.find_one.call_count == 2
+        assert response_cache.misses["get_pattern_by_id"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_not_found_is_not_cached(self, service, database):
+        """Test that a missing pattern is looked up again on the next request"""
+        database.attack_patterns.find_one.return_value = None
+        
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await service.get_pattern_by_id("T9999")
+        
+        assert database.attack_patterns.find_one.call_count == 2
+
+
+class TestReadReplicaService:
+    """Test cases for serving reads from the in-memory read replica"""
+    
+    @pytest.fixture
+    def documents(self):
+        return [
+            {
+                "_id": ObjectId(f"{n:024x}"), "id": f"T{1000 + n}", "name": f"Technique {n}",
+                "description": "Adversaries inject code" if n == 2 else "Adversaries hide payloads",
+                "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "execution"}],
+                "x_mitre_platforms": ["Windows"] if n % 2 else ["Linux"]
+            }
+            for n in range(1, 6)
+        ]
+    
+    @pytest.fixture
+    def database(self, documents):
+        database = MagicMock()
+        database.metadata.find_one = AsyncMock(return_value={"version": 1})
+        database.attack_patterns.find.return_value.sort.return_value.to_list = AsyncMock(
+            side_effect=lambda length: [dict(document) for document in documents]
+        )
+        return database
+    
+    @pytest.fixture
+    def service(self, database):
+        return ReplicaAttackPatternService(database)
+    
+    @pytest.mark.asyncio
+    async def test_reads_are_served_from_one_load(self, service, database):
+        """Test that list, get, lookup, search and statistics reads share one collection load"""
+        patterns, total = await service.get_all_patterns(limit=2, offset=1, fields=["name"])
+        pattern = await service.get_pattern_by_id("T1003")
+        found, missing = await service.get_patterns_by_ids(["t1004", "T9999"])
+        results, matches = await service.search_patterns("inject")
+        stats = await service.get_stats()
+        breakdown = await service.get_stats_breakdown({"platform": ["Linux"]})
+        
+        assert patterns == [
+            {"_id": ObjectId(f"{2:024x}"), "name": "Technique 2"}, {"_id": ObjectId(f"{3:024x}"), "name": "Technique 3"}
+        ]
+        assert total == 5
+        assert pattern["name"] == "Technique 3"
+        assert list(found) == ["t1004"] and missing == ["T9999"]
+        assert [result["id"] for result in results] == ["T1002"] and matches == 1
+        assert stats["total_patterns"] == 5
+        assert breakdown["total_patterns"] == 2
+        database.attack_patterns.find.assert_called_once_with({})
+        database.attack_patterns.aggregate.assert_not_called()
+        database.stats.find_one.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_the_replica(self, service, database):
+        """Test that warming up loads the replica and similarity model so the first reads do not"""
+        await service.warm_up()
+        
+        await service.search_patterns("inject")
+        await service.get_similar("T1002")
+        
+        assert _replicas.get(1) is not MISSING
+        assert database.attack_patterns.find.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_cursor_pages_and_streaming(self, service):
+        """Test keyset pagination and streaming from memory"""
+        first, _ = await service.get_all_patterns(limit=2, include_total=False)
+        
+        second, total = await service.get_all_patterns(limit=2, cursor=next_page_cursor(first, 2), include_total=False)
+        streamed = [pattern async for pattern in service.iter_patterns(["id"])]
+        
+        assert [pattern["id"] for pattern in second] == ["T1003", "T1004"]
+        assert total is None
+        assert [pattern["id"] for pattern in streamed] == ["T1001", "T1002", "T1003", "T1004", "T1005"]
+    
+    @pytest.mark.asyncio
+    async def test_missing_pattern(self, service):
+        """Test that an unknown ID is reported like the MongoDB path does"""
+        with pytest.raises(ValueError):
+            await service.get_pattern_by_id("T9999")
+    
+    @pytest.mark.asyncio
+    async def test_new_version_is_reloaded(self, service, database, documents, monkeypatch):
+        """Test that the replica is reloaded once the version check sees a new dataset version"""
+        await service.get_stats()
+        documents.pop()
+        database.metadata.find_one.return_value = {"version": 2}
+        # The version check interval elapsing
+        monkeypatch.setattr("app.services._version_cache", TTLCache(ttl=0))
+        
+        stats = await service.get_stats()
+        
+        assert stats["version"] == 2
+        assert stats["total_patterns"] == 4
+        assert database.attack_patterns.find.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_background_refresh(self, service, database, monkeypatch):
+        """Test that the poller loads a new version's replica without waiting for a request"""
+        await service.get_replica()
+        database.metadata.find_one.return_value = {"version": 2}
+        monkeypatch.setattr("app.services._version_cache", TTLCache(ttl=0))
+        
+        refresh = asyncio.create_task(keep_replica_fresh(service, interval=0))
+        deadline = time.monotonic() + 5
+        while _replicas.get(2) is MISSING and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        refresh.cancel()
+        
+        assert _replicas.get(2) is not MISSING
+        assert database.attack_patterns.find.call_count == 2
@@ -0,0 +1,142 @@
+"""
+Tests for technique similarity scoring
+"""
+import pytest
+from unittest.mock import MagicMock
+from pymongo import ReplaceOne
+from app.similarity import SimilarityModel, description_terms, materialize_technique_graph
+
+
+def make_technique(pattern_id, description, phases=("execution",), platforms=("Windows",)):
+    """A technique document with the fields the similarity model reads."""
+    return {
+        "id": pattern_id,
+        "name": f"Technique {pattern_id}",
+        "description": description,
+        "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": phase} for phase in phases],
+        "x_mitre_platforms": list(platforms)
+    }
+
+
+@pytest.fixture
+def techniques():
+    return [
+        make_technique("T1055", "Adversaries may inject code into processes to evade defenses.", ["defense-evasion"]),
+        make_technique("T1574", "Adversaries may inject code by hijacking how processes load libraries.", ["defense-evasion"]),
+        make_technique("T1566", "Adversaries may send phishing messages.", ["initial-access"], ["Linux", "macOS"]),
+        make_technique("T1059", "Adversaries may abuse command interpreters.", ["execution"], ["NA"]),
+    ]
+
+
+@pytest.fixture
+def model(techniques):
+    return SimilarityModel(techniques, version=2)
+
+
+class TestSimilarityModel:
+    """Test cases for scoring technique neighbors"""
+    
+    def test_description_terms_drop_stop_words(self):
+        """Test that filler words and short tokens do not count as shared keywords"""
+        assert description_terms("Adversaries may use it to inject code into T1055") == ["inject", "code", "t1055"]
+    
+    def test_tfidf_rows_are_unit_length(self, model):
+        """Test that a row's dot product with itself is its cosine similarity of 1"""
+        norms = model.tfidf.multiply(model.tfidf).sum(axis=1).A1
+        
+        assert list(norms) == pytest.approx([1.0] * 4, abs=1e-5)
+    
+    def test_neighbors_rank_by_combined_score(self, model):
+        """Test that shared phase, platform and keywords put the closest technique first"""
+        neighbors = dict(model.neighbors(k=2))
+        
+        closest = neighbors["T1055"][0]
+        assert closest["id"] == "T1574"
+        assert closest["phase"] == pytest.approx(0.3)
+        assert closest["platform"] == pytest.approx(0.2)
+        assert closest["keyword"] > 0
+        assert closest["score"] == pytest.approx(closest["phase"] + closest["platform"] + closest["keyword"], abs=1e-3)
+        assert closest["type"] == "phase"
+    
+    def test_technique_is_not_its_own_neighbor(self, model):
+        """Test that self-similarity is excluded"""
+        for pattern_id, neighbors in model.neighbors(k=4):
+            assert pattern_id not in [neighbor["id"] for neighbor in neighbors]
+    
+    def test_unrelated_techniques_are_not_neighbors(self, model):
+        """Test that placeholder platforms and a zero score produce no edges"""
+        neighbors = dict(model.neighbors(k=3))
+        
+        assert neighbors["T1059"] == []
+    
+    def test_neighbors_of_selected_techniques(self, model):
+        """Test scoring only some rows, skipping unknown IDs"""
+        neighbors = list(model.neighbors(k=1, ids=["T1574", "T9999"]))
+        
+        assert [(pattern_id, [n["id"] for n in found]) for pattern_id, found in neighbors] == [("T1574", ["T1055"])]
+    
+    def test_blocks_match_a_single_pass(self, techniques, monkeypatch):
+        """Test that scoring in row blocks gives the same neighbors as one block"""
+        expected = list(SimilarityModel(techniques).neighbors(k=2))
+        monkeypatch.setattr("app.similarity.BLOCK_SIZE", 1)
+        
+        assert list(SimilarityModel(techniques).neighbors(k=2)) == expected
+
+
+class TestSimilarDescriptions:
+    """Test cases for batched top-k description similarity"""
+    
+    def test_similar_to_technique(self, model):
+        """Test that the technique sharing the most weighted terms ranks first, excluding itself"""
+        similar, = model.similar(k=3, ids=["T1055"])
+        
+        assert similar[0]["id"] == "T1574"
+        assert "T1055" not in [match["id"] for match in similar]
+        assert all(0 < match["score"] <= 1 for match in similar)
+    
+    def test_similar_to_free_text(self, model):
+        """Test that free text is vectorized with the model's vocabulary and IDF"""
+        similar, = model.similar(k=1, texts=["phishing messages"])
+        
+        assert [match["id"] for match in similar] == ["T1566"]
+        assert similar[0]["score"] > 0.5
+    
+    def test_batch_keeps_query_order(self, model):
+        """Test that IDs, unknown IDs and texts answered in one product come back in order"""
+        results = model.similar(k=2, ids=["T1574", "T9999"], texts=["command interpreters", "no known words"])
+        
+        assert [[match["id"] for match in similar] for similar in results] == [
+            ["T1055"], [], ["T1059"], []
+        ]
+    
+    def test_batch_matches_single_queries(self, model):
+        """Test that batching does not change any query's answer"""
+        batched = model.similar(k=3, ids=["T1055", "T1566"], texts=["inject code"])
+        
+        single = [
+            model.similar(k=3, ids=["T1055"])[0],
+            model.similar(k=3, ids=["T1566"])[0],
+            model.similar(k=3, texts=["inject code"])[0]
+        ]
+        assert batched == single
+
+
+class TestMaterializeTechniqueGraph:
+    """Test cases for storing the graph at ingestion"""
+    
+    def test_graph_is_written_for_the_version(self, techniques):
+        """Test that every technique's neighbors are upserted and older entries removed"""
+        database = MagicMock()
+        database.attack_patterns.find.return_value.sort.return_value = iter(techniques)
+        
+        written = materialize_technique_graph(database, version=7, k=2)
+        
+        assert written == 4
+        operations = database.technique_graph.bulk_write.call_args[0][0]
+        assert all(isinstance(operation, ReplaceOne) for operation in operations)
+        assert operations[0]._filter == {"_id": "T1055"}
+        assert operations[0]._doc["version"] == 7
+        database.technique_graph.delete_many.assert_called_once_with({"version": {"$ne": 7}})
+        database.metadata.update_one.assert_called_once_with(
+            {"_id": "technique_graph"}, {"$set": {"version": 7, "techniques": 4}}, upsert=True
+        )
@@ -0,0 +1,177 @@
+"""
+Tests for local (offline) STIX ingestion sources
+"""
+import bson
+import json
+import logging
+import tarfile
+import pytest
+from app.services import MITREAttackService
+from app.sources import bundle_ranges, iter_local_objects, iter_range_objects
+from tests.conftest import make_stix_bundle
+
+
+@pytest.fixture
+def enterprise_bundle(tmp_path):
+    """A single multi-object bundle, shaped like enterprise-attack.json."""
+    objects = []
+    for number in range(1, 6):
+        objects.extend(make_stix_bundle(f"T{1000 + number}", f"Technique {number}")["objects"])
+    objects.append({"type": "relationship", "id": "relationship--1", "relationship_type": "uses"})
+    objects.append({"type": "x-mitre-tactic", "id": "x-mitre-tactic--1", "name": "Execution"})
+    path = tmp_path / "enterprise-attack.json"
+    path.write_text(json.dumps({"type": "bundle", "id": "bundle--1", "objects": objects}))
+    return path
+
+
+class TestLocalSources:
+    """Test cases for streaming STIX object iteration"""
+    
+    def test_bundle_streams_all_objects(self, enterprise_bundle):
+        """Test that every object in a bundle is yielded"""
+        objects = list(iter_local_objects(str(enterprise_bundle)))
+        
+        assert len(objects) == 7
+        assert objects[0]["name"] == "Technique 1"
+        assert objects[-1]["type"] == "x-mitre-tactic"
+    
+    def test_bundle_is_streamed_lazily(self, enterprise_bundle):
+        """Test that objects are produced one at a time"""
+        objects = iter_local_objects(str(enterprise_bundle))
+        
+        first = next(objects)
+        
+        assert first["type"] == "attack-pattern"
+    
+    def test_directory_source(self, stix_dir):
+        """Test reading a directory of per-technique files"""
+        objects = list(iter_local_objects(str(stix_dir)))
+        
+        assert len(objects) == 20
+    
+    def test_unreadable_files_are_recorded(self, stix_dir):
+        """Test that a file that does not parse is skipped and reported"""
+        (stix_dir / "attack-pattern--broken.json").write_text('{"objects": [')
+        skipped = []
+        
+        objects = list(iter_local_objects(str(stix_dir), skipped))
+        
+        assert len(objects) == 20
+        assert skipped == ["attack-pattern--broken.json"]
+    
+    def test_tarball_source(self, stix_dir, tmp_path):
+        """Test reading a gzipped tarball of per-technique files"""
+        archive_path = tmp_path / "attack-pattern.tar.gz"
+        with tarfile.open(archive_path, "w:gz") as archive:
+            archive.add(stix_dir, arcname="attack-pattern")
+        
+        objects = list(iter_local_objects(str(archive_path)))
+        
+        assert len(objects) == 20
+    
+    def test_bundle_ranges_hold_whole_objects(self, enterprise_bundle):
+        """Test that a bundle split into byte ranges parses back into the same objects"""
+        ranges = bundle_ranges(str(enterprise_bundle), 64)
+        
+        objects = [obj for start, end in ranges for obj in iter_range_objects(str(enterprise_bundle), start, end)]
+        
+        assert len(ranges) > 1
+        assert objects == list(iter_local_objects(str(enterprise_bundle)))
+    
+    def test_bundle_ranges_need_a_trailing_objects_array(self, tmp_path):
+        """Test that bundles with keys after their objects array are not split"""
+        path = tmp_path / "bundle.json"
+        path.write_text(json.dumps({"objects": [{"type": "x", "id": "x--1"}], "type": "bundle"}))
+        
+        assert bundle_ranges(str(path), 8) is None
+    
+    def test_missing_source(self, tmp_path):
+        """Test that a missing path is reported"""
+        with pytest.raises(FileNotFoundError):
+            iter_local_objects(str(tmp_path / "missing.json"))
+
+
+class TestOfflineIngestion:
+    """Test cases for MITREAttackService with a local source"""
+    
+    @pytest.mark.asyncio
+    async def test_fetch_from_bundle(self, enterprise_bundle):
+        """Test that only attack patterns are kept from a local bundle"""
+        service = MITREAttackService(source_path=str(enterprise_bundle))
+        
+        patterns = await service.fetch_attack_patterns()
+        
+        assert [p["id"] for p in patterns] == ["T1001", "T1002", "T1003", "T1004", "T1005"]
+        assert patterns[0]["kill_chain_phases"] == [{"phase_name": "execution"}]
+    
+    @pytest.mark.asyncio
+    async def test_parallel_transform_matches_sequential(self, enterprise_bundle):
+        """Test that sharding across worker processes yields the same documents in order"""
+        sequential = MITREAttackService(source_path=str(enterprise_bundle))
+        parallel = MITREAttackService(source_path=str(enterprise_bundle), transform_workers=2)
+        parallel.SHARD_BYTES = 64
+        
+        expected = [d async for d in sequential.iter_documents()]
+        result = [bson.decode(d.raw) async for d in parallel.iter_documents()]
+        
+        assert len(result) == 5
+        assert result == expected
+    
+    @pytest.mark.asyncio
+    async def test_parallel_transform_of_a_directory_records_skipped_files(self, stix_dir):
+        """Test that workers reading their own files report the ones that do not parse"""
+        (stix_dir / "attack-pattern--broken.json").write_text('{"objects": [')
+        sequential = MITREAttackService(source_path=str(stix_dir))
+        parallel = MITREAttackService(source_path=str(stix_dir), transform_workers=2)
+        parallel.SHARD_BYTES = 1024
+        
+        expected = [d async for d in sequential.iter_documents()]
+        result = [bson.decode(d.raw) async for d in parallel.iter_documents()]
+        
+        assert result == expected
+        assert parallel.skipped_sources == sequential.skipped_sources == ["attack-pattern--broken.json"]
+    
+    @pytest.mark.asyncio
+    async def test_parallel_transform_of_a_tarball(self, stix_dir, tmp_path):
+        """Test that tarball members are transformed by workers in archive order"""
+        archive_path = tmp_path / "attack-pattern.tar.gz"
+        with tarfile.open(archive_path, "w:gz") as archive:
+            archive.add(stix_dir, arcname="attack-pattern")
+        sequential = MITREAttackService(source_path=str(archive_path))
+        parallel = MITREAttackService(source_path=str(archive_path), transform_workers=2)
+        parallel.SHARD_BYTES = 1024
+        
+        expected = [d async for d in sequential.iter_documents()]
+        result = [bson.decode(d.raw) async for d in parallel.iter_documents()]
+        
+        assert len(result) == 20
+        assert result == expected
+    
+    @pytest.mark.asyncio
+    async def test_parallel_transform_recovers_from_a_misplaced_boundary(self, tmp_path, caplog):
+        """Test that a range split inside an object is read again as the rest of the bundle"""
+        objects = []
+        for number in range(1, 4):
+            objects.extend(make_stix_bundle(f"T{1000 + number}", f"Technique {number}")["objects"])
+        # Nested objects that look like STIX objects pass the boundary check
+        objects[0]["x_mitre_contents"] = [{"type": "note", "id": "note--1"}, {"type": "note", "id": "note--2"}]
+        path = tmp_path / "bundle.json"
+        path.write_text(json.dumps({"type": "bundle", "id": "bundle--1", "objects": objects}))
+        sequential = MITREAttackService(source_path=str(path))
+        parallel = MITREAttackService(source_path=str(path), transform_workers=2)
+        parallel.SHARD_BYTES = 16
+        
+        with caplog.at_level(logging.WARNING, logger="app.services"):
+            expected = [d async for d in sequential.iter_documents()]
+            result = [bson.decode(d.raw) async for d in parallel.iter_documents()]
+        
+        assert result == expected
+        assert "Could not split bundle.json" in caplog.text
+    
+    @pytest.mark.asyncio
+    async def test_fetch_from_missing_source_raises(self, tmp_path):
+        """Test that a bad local source fails instead of falling back to sample data"""
+        service = MITREAttackService(source_path=str(tmp_path / "missing.json"))
+        
+        with pytest.raises(FileNotFoundError):
+            await service.fetch_attack_patterns()
@@ -15,6 +15,7 @@ import {
   IconButton,
 } from '@mui/material';
 import { Close as CloseIcon, Security } from '@mui/icons-material';
+import { useGetSimilarTechniquesQuery } from '../services/api';
 import { AttackPattern } from '../types';
 import {
   useCybersecurityColors,
@@ -34,6 +35,10 @@ const AttackPatternDetailsModal: React.FC<AttackPatternDetailsModalProps> = ({
   pattern,
 }) => {
   const cybersecurityColors = useCybersecurityColors();
+  const { data: similarTechniques } = useGetSimilarTechniquesQuery(
+    { id: pattern?.id ?? '', k: 5 },
+    { skip: !open || !pattern }
+  );
 
   if (!pattern) return null;
 
@@ -219,6 +224,27 @@ const AttackPatternDetailsModal: React.FC<AttackPatternDetailsModalProps> = ({
               </Grid>
             )}
 
+          {/* Similar Techniques */}
+          {similarTechniques && similarTechniques.similar.length > 0 && (
+            <Grid item xs={12}>
+              <Paper elevation={1} sx={{ p: 2 }}>
+                <Typography variant='h6' gutterBottom color='primary'>
+                  Similar Techniques
+                </Typography>
+                <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 1 }}>
+                  {similarTechniques.similar.map(technique => (
+                    <Chip
+                      key={technique.id}
+                      label={`${technique.id} ${technique.name}`}
+                      variant='outlined'
+                      title={`${Math.round(technique.score * 100)}% similar`}
+                    />
+                  ))}
+                </Box>
+              </Paper>
+            </Grid>
+          )}
+
           {/* Metadata */}
           <Grid item xs={12}>
             <Paper elevation={1} sx={{ p: 2 }}>
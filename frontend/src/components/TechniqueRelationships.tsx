@@ -19,7 +19,8 @@ import {
 } from '@mui/material';
 import { AccountTree, Search } from '@mui/icons-material';
 import { motion } from 'framer-motion';
-import { AttackPattern } from '../types';
+import { useGetTechniqueGraphQuery } from '../services/api';
+import { AttackPattern, RelationshipType } from '../types';
 
 interface TechniqueRelationshipsProps {
   patterns: AttackPattern[];
@@ -40,7 +41,7 @@ interface RelationshipNode {
 interface RelationshipEdge {
   source: string;
   target: string;
-  type: 'phase' | 'platform' | 'keyword';
+  type: RelationshipType;
   strength: number;
 }
 
@@ -84,11 +85,16 @@ const TechniqueRelationships: React.FC<TechniqueRelationshipsProps> = ({
     }
   }, [searchQuery, patterns]);
 
+  // Similarity edges are precomputed on the server (top neighbors per technique)
+  const { data: techniqueGraph } = useGetTechniqueGraphQuery({
+    k: 10,
+    min_score: 0.3,
+  });
+
   // Generate relationship graph
   const generateRelationshipGraph = useMemo(() => {
     return (patterns: AttackPattern[]): RelationshipGraph => {
       const nodes: RelationshipNode[] = [];
-      const edges: RelationshipEdge[] = [];
 
       // Create nodes for each pattern
       patterns.forEach((pattern, index) => {
@@ -104,74 +110,15 @@ const TechniqueRelationships: React.FC<TechniqueRelationshipsProps> = ({
         nodes.push(node);
       });
 
-      // Create edges based on relationships
-      patterns.forEach(pattern1 => {
-        patterns.forEach(pattern2 => {
-          if (pattern1.id !== pattern2.id) {
-            const relationship = calculateRelationship(pattern1, pattern2);
-            if (relationship.strength > 0.3) {
-              edges.push({
-                source: pattern1.id,
-                target: pattern2.id,
-                type: relationship.type,
-                strength: relationship.strength,
-              });
-            }
-          }
-        });
-      });
+      // Keep the server's edges between the visible patterns
+      const visible = new Set(patterns.map(pattern => pattern.id));
+      const edges: RelationshipEdge[] = (techniqueGraph?.edges ?? []).filter(
+        edge => visible.has(edge.source) && visible.has(edge.target)
+      );
 
       return { nodes, edges };
     };
-  }, []);
-
-  // Calculate relationship strength between two patterns
-  const calculateRelationship = (
-    pattern1: AttackPattern,
-    pattern2: AttackPattern
-  ) => {
-    let strength = 0;
-    let type: 'phase' | 'platform' | 'keyword' = 'phase';
-
-    // Phase similarity
-    if (
-      pattern1.phase_name === pattern2.phase_name &&
-      pattern1.phase_name !== 'NA'
-    ) {
-      strength += 0.4;
-      type = 'phase';
-    }
-
-    // Platform similarity
-    const commonPlatforms = pattern1.x_mitre_platforms.filter(
-      platform =>
-        pattern2.x_mitre_platforms.includes(platform) && platform !== 'NA'
-    );
-    if (commonPlatforms.length > 0) {
-      strength +=
-        0.3 *
-        (commonPlatforms.length /
-          Math.max(
-            pattern1.x_mitre_platforms.length,
-            pattern2.x_mitre_platforms.length
-          ));
-      type = 'platform';
-    }
-
-    // Keyword similarity in description
-    const words1 = pattern1.description.toLowerCase().split(/\W+/);
-    const words2 = pattern2.description.toLowerCase().split(/\W+/);
-    const commonWords = words1.filter(
-      word => words2.includes(word) && word.length > 3
-    );
-    if (commonWords.length > 0) {
-      strength +=
-        0.2 * (commonWords.length / Math.max(words1.length, words2.length));
-      type = 'keyword';
-    }
-
-    return { strength, type };
-  };
+  }, [techniqueGraph]);
 
   // Get phase level for visualization
   const getPhaseLevel = (phase: string): number => {
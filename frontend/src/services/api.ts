@@ -1,9 +1,15 @@
 import { createApi, fetchBaseQuery } from '@reduxjs/toolkit/query/react';
 import {
   AttackPattern,
+  NeighborsResponse,
   SearchRequest,
   SearchResponse,
+  SimilarRequest,
+  SimilarResponse,
+  SimilarResult,
   StatsResponse,
+  SuggestResponse,
+  TechniqueGraphResponse,
 } from '../types';
 
 export const api = createApi({
@@ -16,11 +22,16 @@ export const api = createApi({
     // Get all attack patterns with pagination
     getAttackPatterns: builder.query<
       SearchResponse,
-      { limit?: number; offset?: number }
+      {
+        limit?: number;
+        offset?: number;
+        cursor?: string;
+        view?: 'summary' | 'full';
+      }
     >({
-      query: ({ limit = 50, offset = 0 }) => ({
+      query: ({ limit = 50, offset = 0, cursor, view = 'full' }) => ({
         url: 'attack-patterns',
-        params: { limit, offset },
+        params: cursor ? { limit, cursor, view } : { limit, offset, view },
       }),
       providesTags: ['AttackPattern'],
     }),
@@ -34,18 +45,97 @@ export const api = createApi({
       }),
     }),
 
+    // Typeahead suggestions (cheap enough to call on every keystroke)
+    getSuggestions: builder.query<
+      SuggestResponse,
+      { q: string; limit?: number }
+    >({
+      query: ({ q, limit = 10 }) => ({
+        url: 'attack-patterns/suggest',
+        params: { q, limit },
+      }),
+    }),
+
     // Get specific attack pattern by ID
     getAttackPattern: builder.query<AttackPattern, string>({
       query: id => `attack-patterns/${id}`,
       providesTags: (_result, _error, id) => [{ type: 'AttackPattern', id }],
     }),
 
+    // Get the techniques most similar to one technique
+    getNeighbors: builder.query<NeighborsResponse, { id: string; k?: number }>({
+      query: ({ id, k = 10 }) => ({
+        url: `attack-patterns/${id}/neighbors`,
+        params: { k },
+      }),
+      providesTags: ['AttackPattern'],
+    }),
+
+    // Get the techniques whose descriptions are most similar to one technique
+    getSimilarTechniques: builder.query<
+      SimilarResult,
+      { id: string; k?: number }
+    >({
+      query: ({ id, k = 10 }) => ({
+        url: `attack-patterns/${id}/similar`,
+        params: { k },
+      }),
+      providesTags: ['AttackPattern'],
+    }),
+
+    // Find similar techniques for several IDs and free texts in one request
+    findSimilarTechniques: builder.mutation<SimilarResponse, SimilarRequest>({
+      query: body => ({
+        url: 'attack-patterns/similar',
+        method: 'POST',
+        body,
+      }),
+    }),
+
+    // Get the precomputed technique relationship graph
+    getTechniqueGraph: builder.query<
+      TechniqueGraphResponse,
+      { k?: number; min_score?: number }
+    >({
+      query: ({ k = 10, min_score = 0.3 }) => ({
+        url: 'technique-graph',
+        params: { k, min_score },
+      }),
+      providesTags: ['AttackPattern'],
+    }),
+
     // Get statistics
     getStats: builder.query<StatsResponse, void>({
       query: () => 'stats',
       providesTags: ['Stats'],
     }),
 
+    // Get breakdowns for the patterns matching the filters (all dimensions in one request)
+    getStatsBreakdown: builder.query<
+      StatsResponse,
+      {
+        phase?: string[];
+        platform?: string[];
+        domain?: string[];
+        data_source?: string[];
+        subtechnique?: boolean;
+        deprecated?: boolean;
+      }
+    >({
+      query: filters => {
+        const params = new URLSearchParams();
+        Object.entries(filters).forEach(([name, value]) => {
+          if (Array.isArray(value)) {
+            value.forEach(item => params.append(name, item));
+          } else if (value !== undefined) {
+            params.append(name, String(value));
+          }
+        });
+        return `stats/breakdown?${params.toString()}`;
+      },
+      providesTags: ['Stats'],
+    }),
+
     // Get dashboard data (all patterns)
     getDashboardData: builder.query<SearchResponse, void>({
       query: () => 'dashboard-data',
@@ -62,8 +152,14 @@ export const api = createApi({
 export const {
   useGetAttackPatternsQuery,
   useSearchAttackPatternsMutation,
+  useGetSuggestionsQuery,
   useGetAttackPatternQuery,
+  useGetNeighborsQuery,
+  useGetSimilarTechniquesQuery,
+  useFindSimilarTechniquesMutation,
+  useGetTechniqueGraphQuery,
   useGetStatsQuery,
+  useGetStatsBreakdownQuery,
   useGetDashboardDataQuery,
   useGetHealthQuery,
 } = api;
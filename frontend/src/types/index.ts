@@ -22,6 +22,9 @@ export interface SearchRequest {
   query: string;
   limit?: number;
   offset?: number;
+  cursor?: string;
+  view?: 'summary' | 'full';
+  fields?: string[];
 }
 
 export interface SearchResponse {
@@ -29,6 +32,70 @@ export interface SearchResponse {
   total: number;
   limit: number;
   offset: number;
+  next_cursor?: string | null;
+}
+
+export interface Suggestion {
+  kind: 'technique' | 'platform' | 'phase';
+  value: string;
+  external_id?: string | null;
+}
+
+export interface SuggestResponse {
+  suggestions: Suggestion[];
+}
+
+export type RelationshipType = 'phase' | 'platform' | 'keyword';
+
+export interface Neighbor {
+  id: string;
+  name: string;
+  score: number;
+  type: RelationshipType;
+  phase: number;
+  platform: number;
+  keyword: number;
+}
+
+export interface NeighborsResponse {
+  id: string;
+  neighbors: Neighbor[];
+}
+
+export interface SimilarTechnique {
+  id: string;
+  name: string;
+  score: number;
+}
+
+export interface SimilarResult {
+  query: string;
+  kind: 'id' | 'text';
+  found: boolean;
+  similar: SimilarTechnique[];
+}
+
+export interface SimilarRequest {
+  ids?: string[];
+  texts?: string[];
+  k?: number;
+}
+
+export interface SimilarResponse {
+  results: SimilarResult[];
+}
+
+export interface TechniqueGraphEdge {
+  source: string;
+  target: string;
+  type: RelationshipType;
+  strength: number;
+}
+
+export interface TechniqueGraphResponse {
+  version: number;
+  k: number;
+  edges: TechniqueGraphEdge[];
 }
 
 export interface StatsResponse {
@@ -41,6 +108,23 @@ export interface StatsResponse {
     _id: string;
     count: number;
   }>;
+  domain_distribution?: Array<{
+    _id: string;
+    count: number;
+  }>;
+  data_source_distribution?: Array<{
+    _id: string;
+    count: number;
+  }>;
+  tactic_platform_matrix?: Array<{
+    tactic: string;
+    platform: string;
+    count: number;
+  }>;
+  subtechnique_count?: number;
+  deprecated_count?: number;
+  version?: number;
+  computed_at?: string;
 }
 
 export interface ApiError {